@@ -10,6 +10,7 @@ import android.widget.Button;
 import android.widget.EditText;
 import android.widget.TextView;
 
+import com.chaquo.python.PyObject;
 import com.chaquo.python.Python;
 import com.chaquo.python.android.AndroidPlatform;
 
@@ -29,6 +30,13 @@ public class MainActivity extends AppCompatActivity {
         if (! Python.isStarted()) {
             Python.start(new AndroidPlatform(this));
         }
+        // compile the phoneme rules now rather than on the first button press
+        new Thread(new Runnable() {
+            @Override
+            public void run() {
+                Python.getInstance().getModule("Phoneme").callAttr("warmup");
+            }
+        }).start();
         Button btn = findViewById(R.id.btn);
         Button btn2 = findViewById(R.id.btn2);
 
@@ -44,10 +52,26 @@ public class MainActivity extends AppCompatActivity {
         btn.setOnClickListener(new View.OnClickListener() {
             @Override
             public void onClick(View v) {
-                String txt = editText.getText().toString();
+                final String txt = editText.getText().toString();
                 py = Python.getInstance();
-                String pyStr = py.getModule("Phoneme").callAttr("breakdownWord",txt).toString();
-                textView.setText(pyStr);
+                // transcribe off the UI thread; a newer press supersedes this one,
+                // which then comes back as null and is dropped
+                new Thread(new Runnable() {
+                    @Override
+                    public void run() {
+                        PyObject phonemes = py.getModule("phoneme_async").callAttr("breakdownText", txt, "editText");
+                        if (phonemes == null) {
+                            return;
+                        }
+                        final String pyStr = phonemes.toString();
+                        runOnUiThread(new Runnable() {
+                            @Override
+                            public void run() {
+                                textView.setText(pyStr);
+                            }
+                        });
+                    }
+                }).start();
             }
         });
 
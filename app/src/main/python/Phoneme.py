@@ -25,7 +25,10 @@
 """functions to take a French word and return a list of phonemes
 """
 # from breakdowns.unicode_hammer import latin1_to_ascii as hammer
-from unicode_hammer import latin1_to_ascii as hammer
+from unicode_hammer import fold_to_latin1
+import phoneme_rules
+from phoneme_rules import letter_rules, load_rules
+from tokenizer import ELISION, SPOKEN, tokenize
 
 
 # Phoneme conversion dictionary: CMU on the left to Preston Blair on the right
@@ -105,417 +108,214 @@ phoneme_conversion = {
 }
 
 
-# lists containing different accented vowels
-accented_a = ['\N{LATIN SMALL LETTER A WITH ACUTE}', '\N{LATIN SMALL LETTER A WITH GRAVE}',
-              '\N{LATIN SMALL LETTER A WITH CIRCUMFLEX}', '\N{LATIN SMALL LETTER A WITH TILDE}',
-              '\N{LATIN SMALL LETTER A WITH DIAERESIS}', '\N{LATIN SMALL LETTER A WITH RING ABOVE}',
-              '\N{LATIN SMALL LETTER AE}']
-accented_e = ['\N{LATIN SMALL LETTER E WITH CIRCUMFLEX}', '\N{LATIN SMALL LETTER E WITH DIAERESIS}',
-              '\N{LATIN SMALL LETTER E WITH GRAVE}', '\N{LATIN SMALL LETTER E WITH ACUTE}',
-              '\N{LATIN SMALL LIGATURE OE}']
-accented_i = ['\N{LATIN SMALL LETTER I WITH ACUTE}', '\N{LATIN SMALL LETTER I WITH CIRCUMFLEX}',
-              '\N{LATIN SMALL LETTER I WITH GRAVE}', '\N{LATIN SMALL LETTER I WITH DIAERESIS}']
-accented_o = ['\N{LATIN SMALL LETTER O WITH CIRCUMFLEX}', '\N{LATIN SMALL LETTER O WITH DIAERESIS}',
-              '\N{LATIN SMALL LETTER O WITH STROKE}', '\N{LATIN SMALL LETTER O WITH GRAVE}',
-              '\N{LATIN SMALL LETTER O WITH ACUTE}', '\N{LATIN SMALL LETTER O WITH TILDE}']
-accented_u = ['\N{LATIN SMALL LETTER U WITH ACUTE}', '\N{LATIN SMALL LETTER U WITH GRAVE}',
-              '\N{LATIN SMALL LETTER U WITH CIRCUMFLEX}', '\N{LATIN SMALL LETTER U WITH DIAERESIS}']
+# pronunciation lexicon consulted before the rules, see use_lexicon()
+_lexicon = None
+# whether use_lexicon() opened _lexicon from its path, and so closes it
+_lexicon_opened = False
+
+
+def use_lexicon(lexicon):
+    """look words up in a compiled lexicon before applying the rules
+
+    lexicon is a lexicon.Lexicon or the path of a file written by
+    lexicon.build(); None stops using it. A lexicon opened here from its
+    path is closed once replaced, one passed in is left to the caller.
+    Results already held by a phoneme_cache.PhonemeCache are not
+    refreshed, clear it if needed.
+    """
+    global _lexicon, _lexicon_opened
+    opened = isinstance(lexicon, str)
+    if opened:
+        from lexicon import Lexicon
+        lexicon = Lexicon(lexicon)
+    previous = _lexicon if _lexicon_opened and _lexicon is not lexicon else None
+    _lexicon_opened = opened or (_lexicon_opened and _lexicon is lexicon)
+    _lexicon = lexicon
+    if previous is not None:
+        previous.close()
+
+
+def warmup(snapshot=None, background=False):
+    """do the work otherwise left to the first breakdownWord call
+
+    The letter rules are compiled (or read from snapshot, see
+    phoneme_rules.save_snapshot) and the accent tables built. With
+    background set this runs in a daemon thread, which is returned.
+    """
+    if background:
+        from threading import Thread
+        thread = Thread(target=warmup, args=(snapshot,), name='Phoneme.warmup', daemon=True)
+        thread.start()
+        return thread
+    load_rules(snapshot)
+    breakdownWord('\u0113t\xe9')
+    return None
 
 
 def breakdownWord(word, recursive=False):
-    word = word.lower()
+    # recursive is no longer used: accented letters are handled by the rules
+    if not letter_rules:
+        load_rules()
+    word = fold_to_latin1(word.lower())
+    if _lexicon is not None:
+        listed = _lexicon.lookup(word)
+        if listed is not None:
+            return list(listed)
+    return _apply_rules(word, letter_rules, phoneme_rules.split_graphemes)
+
+
+def apply_rules(word, rules, split_graphemes):
+    """breakdownWord on other compiled rules, such as the counting ones of rule_stats"""
+    word = fold_to_latin1(word.lower())
+    if _lexicon is not None:
+        listed = _lexicon.lookup(word)
+        if listed is not None:
+            return list(listed)
+    return _apply_rules(word, rules, split_graphemes)
+
+
+def _apply_rules(word, rules, split_graphemes):
+    n = len(word)
     phonemes = []
-    simple_convert = {
-        'j': 'JH',
-        'k': 'K',
-        'q': 'K',
-        'v': 'V',
-        '\N{LATIN SMALL LETTER C WITH CEDILLA}': 'S'  # 
-    }
-    easy_consonants = list(simple_convert.keys())
-    pos = 0
+    last = None
     previous = ' '
-    for letter in word:
-        if letter == len(word) > pos + 1 and word[pos + 1]:
-            phonemes.append({letter})
-        elif letter in ['b', 'd', 'g', 'p', 'x'] and pos + 1 == len(word):  # silent at end of words
-            pass
-        elif letter in ['a', accented_a]:
-            if (len(word) > pos + 2 and word[pos + 1] in ['i', accented_i]) and word[pos + 2] != 'l':  # ai
-                phonemes.append('EH0')
-            elif len(word) > pos + 1 and word[pos + 1] in ['u', accented_u]:  # au
-                phonemes.append('AO0')
-            else:
-                phonemes.append('AE0')
-        elif letter in ['e', accented_e]:
-            if pos + 1 == len(word) and len(word) == 2:  # takes care of words like 'je'
-                phonemes.append('EH0')
-            elif previous == 'u' and pos + 1 == len(word) and len(word) == 3 and word[pos - 2] == 'q':  # que
-                phonemes.append('EH0')
-            elif pos + 1 == len(word) and len(word) > 2:  # takes care of words like 'parle'
-                pass
-            elif previous == 'l' and word[pos + 1] == 's' and len(word) == 5 and word[pos - 2] == 'l':  # elles
-                pass
-            elif len(word) > pos + 2 and word[pos + 1] == 'a' and word[pos + 2] == 'u':
-                pass
-            elif previous in ['o', accented_o]:
-                pass
-            elif word[0] == letter and (
-                    len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and word[pos + 2] in ['m',
-                                                                                              'n']) and (
-                    word != 'ennemmi'):
-                phonemes.append('AE0')
-            elif previous != 'i' and (len(word) == pos + 2 and word[pos + 1] in ['m', 'n']) or (
-                    len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and word[pos + 2] in ['b', 'c', 'd',
-                                                                                              'f',
-                                                                                              'g', 'j', 'k',
-                                                                                              'l',
-                                                                                              'p', 'q', 'r',
-                                                                                              's',
-                                                                                              't', 'v', 'w',
-                                                                                              'x',
-                                                                                              'z']):
-                phonemes.append('AE0')
-            elif previous == 'f' and len(word) > pos + 3 and word[pos + 1] == 'm' and word[pos + 2] == 'm' and word[
-                pos + 3] == 'e':
-                phonemes.append('AE0')
-            elif previous == 'u' and word[pos - 2] == 'q' and pos == len(word):
-                pass
-            else:
-                phonemes.append('EH0')
-        elif letter in ['i', accented_i]:
-            if previous in ['e', accented_e] and ((len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and word[
-                pos + 2] in ['b', 'c', 'd', 'f', 'g', 'j', 'k', 'l', 'm', 'n', 'p', 'q', 'r', 's', 't', 'v', 'w',
-                             'x', 'z']) or (len(word) == pos + 2)):
-                pass
-            elif previous in ['f', 't', 'v', 's'] and word[-1] == 'n' and len(word) > 1 and letter == word[-2]:
-                phonemes.append('EH0')
-            elif len(word) > pos + 2 and word[pos + 1] == 'm' and word[pos + 2] in ['b', 'p']:
-                phonemes.append('EH0')
-            elif len(word) > pos + 2 and word[pos + 1] == 'n' and word[pos + 2] in ['c', 'd', 'f', 'g', 'j', 'l', 'q',
-                                                                                    's', 't', 'v']:
-                phonemes.append('EH0')
-                phonemes.append('NG')
-            elif previous in ['a', accented_a] and len(word) > pos + 1 and word[pos + 1] != 'l':
-                phonemes.append('EH0')
-            elif previous in ['o', accented_o] and len(word) == pos + 2 and word[pos + 1] == 'n':
-                phonemes.append('EH0')
-            elif previous in ['o', accented_o] and len(word) > pos + 2 and word[pos + 1] == 'n' and word[pos + 2] in [
-                'b', 'c', 'd', 'f', 'g', 'j', 'k', 'l', 'm', 'n', 'p', 'q', 'r', 's', 't', 'v', 'w', 'x', 'z']:
-                phonemes.append('EH0')
-            elif previous in ['o', accented_o] and not (len(word) > pos + 2 and word[pos + 1] == 'n' and (
-                    word[pos + 2] in ['b', 'c', 'd', 'f', 'g', 'j', 'k', 'l', 'm', 'n', 'p', 'q', 'r', 's', 't',
-                                      'v',
-                                      'w', 'x', 'z'] or pos + 2 == len(word))):
-                phonemes.append('AE0')
-            else:
-                phonemes.append('IH0')
-        elif letter in ['o', accented_o]:
-            if previous == 'm' and len(word) > pos + 6 and word[pos + 1] == 'n' and word[pos + 2] == 's' and word[
-                pos + 3] == 'i' and word[pos + 4] == 'e' and word[pos + 5] == 'u' and word[pos + 6] == 'r':
-                phonemes.append('EH0')  # monsieur
-            elif len(word) > pos + 1 and word[pos + 1] == 'y':
-                phonemes.append('W')
-                phonemes.append('AE0')
-            elif len(word) > pos + 2 and word[pos + 1] == 'i' and word[pos + 2] in ['m', 'n']:
-                phonemes.append('W')
-                phonemes.append('EH0')
-            elif len(word) > pos + 2 and word[pos + 1] == 'u' and word[pos + 2] in ['i', accented_i]:  # stress vowel
-                phonemes.append('W')
-            elif len(word) > pos + 1 and word[pos + 1] in ['i', accented_i]:
-                phonemes.append('W')
-            elif len(word) > pos + 1 and word[pos + 1] in ['u', accented_u]:
-                phonemes.append('UW0')
-            elif len(word) > pos + 1 and word[pos + 1] in ['e', accented_e]:
-                phonemes.append('EH0')
-            else:
-                phonemes.append('AO0')
-        elif letter in ['u', accented_u]:
-            if previous == 'l' and len(word) > pos + 3 and word[pos + 1] == 'n' and word[pos + 2] == 'd' and word[
-                pos + 3] == 'i':
-                phonemes.append('EH0')  # lundi
-            elif previous == 'o' and len(word) > pos + 1 and word[pos + 1] in ['i', accented_i]:
-                pass
-            elif previous in ['b', 'c', 'd', 'f', 'h', 'j', 'k', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'w', 'x',
-                              'z'] and len(word) > pos + 1 and word[pos + 1] == 'i':
-                phonemes.append('W')
-            elif (len(word) == pos + 2 and word[pos + 1] in ['m', 'n']) or (
-                    len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and word[pos + 2] in ['b', 'c', 'd',
-                                                                                              'f',
-                                                                                              'g', 'j', 'k',
-                                                                                              'l',
-                                                                                              'p', 'q', 'r',
-                                                                                              's',
-                                                                                              't', 'v', 'w',
-                                                                                              'x',
-                                                                                              'z']):
-                phonemes.append('EH0')
-            elif previous in ['a', accented_a]:
-                phonemes.append('AO0')
-            elif previous in ['g', 'q']:
-                pass
-            elif previous in ['o', accented_o]:
-                phonemes.append('UW0')
-            elif len(word) > pos + 1 and word[pos + 1] in ['a', accented_a]:
-                phonemes.append('AE0')
-            elif len(word) > pos + 1 and word[pos + 1] in ['e', accented_e]:
-                phonemes.append('EH0')
-            elif previous == 'g' and len(word) > pos + 1 and word[pos + 1] in ['e', accented_e]:
-                phonemes.append('JH')
-            else:
-                phonemes.append('UW0')
-        elif letter == 'y':
-            if letter == word[0]:
-                phonemes.append('Y')
-            elif previous in ['a', 'e', 'i', 'o', 'u', accented_a, accented_e, accented_i, accented_o,
-                              accented_u] and len(word) > pos + 1 and word[pos + 1] in ['a', 'e', 'i', 'o', 'u',
-                                                                                        accented_a, accented_e,
-                                                                                        accented_i, accented_o,
-                                                                                        accented_u]:
-                phonemes.append('Y')
-            elif len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and len(word) == pos + 2:
-                phonemes.append('EH0')
-            elif len(word) > pos + 2 and word[pos + 1] in ['m', 'n'] and word[pos + 2] in ['b', 'c', 'd', 'f', 'g', 'j',
-                                                                                           'k', 'l', 'p', 'q', 'r', 's',
-                                                                                           't', 'v', 'w', 'x', 'z']:
-                phonemes.append('EH0')
-            else:
-                phonemes.append('IH0')
-        elif letter == 'b':
-            if len(word) > pos + 1 and word[pos + 1] in ['s', 't']:
-                phonemes.append('P')
-            else:
-                phonemes.append('B')
-        elif letter == 'c':
-            if len(word) > pos + 2 and word[pos + 1] == 'q' and word[pos + 2] == 'u':
-                pass
-            elif word[pos - 2] == 'p' and previous in ['e', accented_e] and len(word) == pos + 2 and word[
-                pos + 1] == 't':  # takes care of words like 'respect'
-                pass
-            elif previous == 's' and len(word) > pos + 1 and word[pos + 1] in ['e', 'i', 'y', accented_e, accented_i]:
-                pass
-            elif len(word) > pos + 1 and word[pos + 1] == word[-1] and word[-1] in ['e', accented_e]:
-                phonemes.append('Z')
-            elif len(word) > pos + 1 and (
-                    word[pos + 1] in ['a', 'o', 'u', 'l', accented_a, accented_o, accented_u] or word[
-                pos + 1] in ['b',
-                             'c',
-                             'd',
-                             'f',
-                             'g',
-                             'j',
-                             'k',
-                             'l',
-                             'm',
-                             'n',
-                             'p',
-                             'q',
-                             'r',
-                             's',
-                             't',
-                             'v',
-                             'w',
-                             'x',
-                             'z']):
-                phonemes.append('K')
-            elif len(word) > pos + 1 and word[pos + 1] in ['e', 'i', 'y', accented_e, accented_i]:
-                phonemes.append('S')
-            elif previous == 'n' and len(word) == pos + 1:
-                pass
-            else:
-                pass
-        elif letter == 'd':
-            if len(word) > pos + 1 and word[pos + 1] in ['-', '_']:
-                phonemes.append('T')
-            elif len(word) > pos + 1 and word[pos + 1] in ['s', 't']:
-                pass
-            else:
-                phonemes.append('D')
-        elif letter == 'f':
-            if len(word) > pos + 1 and word[pos + 1] in ['-', '_']:
-                phonemes.append('V')
-            else:
-                phonemes.append('F')
-        elif letter == 'g':
-            if previous == 'n':
-                phonemes.append('NG')
-            elif len(word) > pos + 1 and word[pos + 1] in ['e', 'i', 'y', accented_e, accented_i]:
-                phonemes.append('JH')
-            elif len(word) > pos + 1 and word[pos + 1] in ['s', 't']:
-                pass
-            else:
-                phonemes.append('G')
-        elif letter == 'h':
-            if previous == 'c' and len(word) > pos + 1 and word[pos + 1] == 'r':
-                phonemes.append('K')
-            elif previous == 'c' and len(word) > pos + 1 and word[pos + 1] != 'r':
-                phonemes.append('SH')
-            else:
-                pass
-        elif letter == 'l':
-            if word[pos - 2] in ['m', 'v', 'h', 'k'] and previous == 'i' and word[pos - 3] not in ['a',
-                                                                                                   '']:  # mil*, vil*
-                phonemes.append('L')
-            elif word[pos - 3] in ['m', 'v'] and word[pos - 2] == 'i' and previous == 'l' and word[pos - 4] not in ['a',
-                                                                                                                    '']:  # mill* ,vill*
-                phonemes.append('L')
-            elif word[pos - 3] == 'q' and word[pos - 2] == 'u' and previous == 'i':  # tranquil*
-                phonemes.append('L')
-            elif word[pos - 3] == 'u' and word[pos - 2] == 'i' and previous == 'l' and word[
-                pos - 4] == 'q':  # tranquill*
-                phonemes.append('L')
-            elif ((previous == 'i' or (previous == 'i' and len(word) > pos + 1 and word[pos + 1] == letter) or (
-                    previous == 'i' and len(word) > pos + 2 and word[pos + 1] == letter and word[
-                pos + 2] == 'e'))):
-                phonemes.append('Y')
-            elif ((word[pos - 2] == 'i' and previous == letter) or (
-                    word[pos - 2] == 'i' and previous == letter and len(word) > pos + 1 and word[
-                pos + 1] == 'e')):  # il, ill,ille
-                phonemes.append('Y')
-            else:
-                phonemes.append('L')
-        elif letter == 'm':
-            if previous == 'a' and len(word) > pos + 1 and word[pos + 1] == 'n':
-                pass
-            elif letter == word[-1] and word[-2] == 'i' and word[-3] == 'a':
-                phonemes.append('NG')
-            elif previous in ['a', 'e', 'i', 'o', 'u'] and (len(word) == pos + 1 or (
-                    len(word) > pos + 1 and word[pos + 1] in ['b', 'c', 'd', 'f', 'g', 'j', 'k', 'l', 'p', 'q',
-                                                              'r',
-                                                              's', 't', 'v', 'w', 'x', 'z'])):
-                phonemes.append('NG')
-            else:
-                phonemes.append('M')
-        elif letter == 'n':
-            if previous == 'o' and len(word) > pos + 5 and word[pos + 1] == 's' and word[pos + 2] == 'i' and word[
-                pos + 3] == 'e' and word[pos + 4] == 'u' and word[pos + 5] == 'r':
-                pass
-            elif previous in ['a', 'e', 'i', 'o', 'u', accented_a, accented_e, accented_i, accented_o, accented_u] and (
-                    len(word) == pos + 1 or (
-                    len(word) > pos + 1 and word[pos + 1] in ['b', 'c', 'd', 'f', 'g', 'j', 'k', 'l',
-                                                              'n', 'p', 'q',
-                                                              'r', 's', 't', 'v', 'w', 'x',
-                                                              'z'])):  # n was forcefully added
-                phonemes.append('NG')
-            else:
-                phonemes.append('N')
-        elif letter == 'p':
-            if len(word) > pos + 1 and word[pos + 1] in ['-', '_']:
-                phonemes.append('P')
-            elif previous == 'm' and len(word) > pos + 1 and word[pos + 1] == 't':  # mpt
-                pass
-            elif len(word) > pos + 1 and word[pos + 1] == 'h':  # ph
-                phonemes.append('F')
-            else:
-                phonemes.append('P')
-        elif letter == 'r':
-            if word[pos - 2] == 'e' and previous == 'u':
-                phonemes.append('R')
-            elif pos + 1 == len(word):
-                pass
-            else:
-                phonemes.append('R')
-        elif letter == 's':
-            if pos + 1 == len(word) and not ((word[pos - 3] == 'i' and word[pos - 2] == 'l' and previous == 'i') or (
-                    word[pos - 3] in ['e', accented_e, 't'] and word[
-                pos - 2] == 'l' and previous == 'a') or (
-                                                     word[pos - 3] == 'f' and word[pos - 2] == 'i' and previous == 'l') or word == 'lis'):
-                pass
-            elif len(word) > pos + 2 and word[pos + 1] == 'c' and word[pos + 2] == 'h':
-                pass
-            elif previous in ['d', 't']:
-                pass
-            elif previous == 'e' and pos + 2 == len(word) and len(word) == 3 and word[pos + 1] == 't':  # est
-                pass
-            elif previous in ['a', 'e', 'i', 'o', 'u', accented_a, accented_e, accented_i, accented_o,
-                              accented_u] and len(word) > pos + 1 and word[pos + 1] in ['a', 'e', 'i', 'o', 'u',
-                                                                                        accented_a, accented_e,
-                                                                                        accented_i, accented_o,
-                                                                                        accented_u]:
-                phonemes.append('Z')
-            else:
-                phonemes.append('S')
-        elif letter == 't':
-            if pos + 1 == len(word) and previous not in ['i', 'c', accented_i] and word != 'gadget' or word[
-                pos - 2] in ['a', accented_a]:
-                pass
-            elif len(word) > pos + 1 and word[pos + 1] == 's':
-                pass
-            elif previous in ['d', 'g']:
-                pass
-            elif word[pos - 3] == 'p' and word[pos - 2] == 'e' and previous == 'c' and len(word) == pos + 1:
-                pass
-            elif len(word) > pos + 1 and word[pos + 1] in ['-', '_']:
-                phonemes.append('T')
-            elif len(word) > pos + 3 and word[pos + 1] == 'i' and word[pos + 2] == 'o' and word[pos + 3] == 'n' or len(
-                    word) > pos + 5 and word[pos + 1] == 'i' and word[pos + 2] == 'e' and word[pos + 3] == 'n' and word[
-                pos + 4] == 'c' and word[pos + 5] == 'e':
-                phonemes.append('S')  # takes care of words ending with 'ience'
-            else:
-                phonemes.append('T')
-        elif letter == 'w':
-            if len(word) > pos + 4 and word[1:] == 'agon':
-                phonemes.append('V')  # wagon
-            else:
-                phonemes.append('W')
-        elif letter == 'x':
-            if previous == 'u' and pos == len(word):
-                pass
-            elif len(word) > pos + 1 and word[pos + 1] in ['-', '_']:
-                phonemes.append('Z')
-            elif (len(word) > pos + 1 and word[pos + 1] in ['b', 'c', 'd', 'f', 'g', 'j', 'k', 'l', 'm', 'n', 'p', 'q',
-                                                            'r', 's', 't', 'v', 'w', 'x', 'y', 'z']) or (
-                    word[pos - 2] == 't' and previous != 'a'):
-                phonemes.append('K')
-                phonemes.append('S')
-            elif len(word) > pos + 1 and word[pos + 1] in ['a', 'e', 'h', 'i', 'o', 'u', accented_a, accented_e,
-                                                           accented_i, accented_o, accented_u] and (
-                    word[pos - 2] != 't' and previous not in ['a', accented_a]):
-                phonemes.append('Z')
-            else:
-                phonemes.append('K')
-                phonemes.append('S')
-        elif letter == 'y':
-            if previous == 'a':  # ay
-                phonemes.append('EH0')
-            else:
-                phonemes.append('IH0')
-        elif letter == 'z':
-            if word[-1] == letter and word[:-1] == 'berlio':
-                phonemes.append('Z')
-            elif word[-1] == letter and len(word) > 1:
-                pass
-            else:
-                phonemes.append('Z')
-        elif letter in easy_consonants:
-            phonemes.append(simple_convert[letter])
-        elif letter == ' ':
-            phonemes.append(".")
-        elif len(hammer(letter)) == 1:
-            if not recursive:
-                phon = breakdownWord(hammer(letter[0]), True)
-                if phon:
-                    phonemes.append(phon[0])
-                    # ~ else:
-                    # ~ print "not handled", letter, word
-        pos += 1
-        previous = letter
-    # return " ".join(phonemes)
-    # return phonemes
-    temp_phonemes = []
-    previous_phoneme = " "
-    for phoneme in phonemes:
-        if phoneme != previous_phoneme:
-            temp_phonemes.append(phoneme)
-        previous_phoneme = phoneme
-    return temp_phonemes
+    pos = 0
+    # a word of WORDS, or a single grapheme, is looked up whole
+    graphemes = (word,) if word in rules else split_graphemes(word)
+    for grapheme in graphemes:
+        rule = rules.get(grapheme)
+        if rule is not None:
+            for phoneme in rule(word, pos, n, previous):
+                # repeated phonemes are only emitted once
+                if phoneme != last:
+                    phonemes.append(phoneme)
+                    last = phoneme
+        pos += len(grapheme)
+        previous = grapheme[-1]
+    return phonemes
 
 
 def convertPhonemes(word):
-    converted = []
-    phonemesList = breakdownWord(word)
-    for phoneme in phonemesList:
-        converted.append(phoneme_conversion[phoneme])
+    return [phoneme_conversion[phoneme] for phoneme in breakdownWord(word)]
+
+
+def breakdownWords(words, convert=False, cache=None):
+    """breakdownWord for every word of an iterable, in one list
+
+    With convert set the phonemes are converted like convertPhonemes does.
+    Given a phoneme_cache.PhonemeCache, words are looked up in it first and
+    the results are tuples.
+    """
+    if cache is not None:
+        lookup = cache.convertPhonemes if convert else cache.breakdownWord
+        return [lookup(word) for word in words]
+    breakdown = breakdownWord
+    if not convert:
+        return [breakdown(word) for word in words]
+    conversion = phoneme_conversion
+    return [[conversion[phoneme] for phoneme in breakdown(word)] for word in words]
+
+
+def iter_words(text_stream, chunk_size=65536):
+    """split a file-like object (or an iterable of strings) into words
+
+    Only chunk_size characters are read at a time, a word cut by the end
+    of a chunk is carried over to the next one.
+    """
+    if hasattr(text_stream, 'read'):
+        chunks = iter(lambda: text_stream.read(chunk_size), '')
+    else:
+        chunks = text_stream
+    tail = ''
+    for chunk in chunks:
+        words = (tail + chunk).split()
+        if not words:
+            tail = ''
+            continue
+        if chunk[-1:].isspace():
+            tail = ''
+        else:
+            tail = words.pop()
+        yield from words
+    if tail:
+        yield tail
+
+
+def iter_breakdown(text_stream, convert=False, chunk_size=65536, cache=None):
+    """yield (word, phonemes) for each whitespace separated word of a text stream
+
+    The stream is read lazily, so memory use does not grow with its size.
+    With convert set the phonemes are converted like convertPhonemes does;
+    cache is used like in breakdownWords.
+    """
+    if cache is not None:
+        lookup = cache.convertPhonemes if convert else cache.breakdownWord
+        for word in iter_words(text_stream, chunk_size):
+            yield word, lookup(word)
+        return
+    breakdown = breakdownWord
+    conversion = phoneme_conversion
+    for word in iter_words(text_stream, chunk_size):
+        phonemes = breakdown(word)
+        if convert:
+            phonemes = [conversion[phoneme] for phoneme in phonemes]
+        yield word, phonemes
+
+
+def iter_text(text, convert=False):
+    """yield (token, phonemes) for every token of a text
+
+    text is a string, a file-like object or an iterable of strings, split
+    by tokenizer.tokenize(); each word, compound or elision is broken down
+    on its own, punctuation and numbers get no phonemes. With convert set
+    the phonemes are converted like convertPhonemes does.
+    """
+    conversion = phoneme_conversion
+    for token in tokenize(text):
+        if token.kind not in SPOKEN:
+            yield token, []
+            continue
+        phonemes = breakdownWord(token.text)
+        if convert:
+            phonemes = [conversion[phoneme] for phoneme in phonemes]
+        yield token, phonemes
+
+
+def breakdownText(text):
+    """phonemes of a whole sentence, with a rest ('.') between its words
+
+    Unlike breakdownWord on the whole sentence, every word is broken down
+    on its own. An elision (l', qu'...) runs into the word after it.
+    """
+    return joinPhonemes(iter_text(text))
+
+
+def joinPhonemes(transcribed):
+    """the phonemes of (token, phonemes) pairs as breakdownText puts them together"""
+    phonemes = []
+    last = None
+    rest = False
+    for token, spoken in transcribed:
+        if not spoken:
+            continue
+        if rest:
+            phonemes.append('.')
+            last = '.'
+        for phoneme in spoken:
+            if phoneme != last:
+                phonemes.append(phoneme)
+                last = phoneme
+        rest = token.kind != ELISION
+    return phonemes
+
 
-    return converted
+if __name__ == '__main__':
+    import os
+    import sys
 
+    if sys.argv[1:2] != ['transcribe']:
+        sys.exit('usage: python -m Phoneme transcribe [options] INPUT...')
+    # transcribe is a desktop tool, not part of the app
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'tools'))
+    from transcribe import main
+    sys.exit(main(sys.argv[2:]))
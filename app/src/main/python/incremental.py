@@ -0,0 +1,227 @@
+"""incremental transcription of a text being edited
+
+    session = TranscriptionSession('le chat dort')
+    diff = session.edit(3, 4, 'chien')     # 'le chien dort'
+    diff.index                             # 1, the token number where the change is
+    diff.removed                           # [(Token('word', 'chat', 3, 7), ['SH', 'AE0'])]
+    diff.added                             # [(Token('word', 'chien', 3, 8), [...])]
+    diff.shift                             # 1, how far the tokens after it moved
+
+A session holds a text and its tokens (see tokenizer.tokenize) with their
+phonemes, as Phoneme.iter_text gives them. An edit replaces deleted
+characters at offset by inserted ones; since no token spans whitespace,
+only the whitespace separated runs of characters the edit touches are
+tokenized and broken down again. The TokenDiff returned lists the tokens
+taken out and those put in their place, leaving out any which came back
+unchanged.
+
+The cost of an edit hardly grows with the length of the text: the text
+is kept in chunks of about CHUNK_SIZE characters, and neither the chunk
+offsets nor the token offsets after an edit are rewritten one by one,
+see _Offsets. What is left is moving the list entries of the later
+tokens along when an edit changes the number of tokens.
+"""
+import re
+from collections import namedtuple
+
+from Phoneme import breakdownWord, phoneme_conversion
+from tokenizer import SPOKEN, Token, tokenize
+
+# removed and added are lists of (Token, phonemes), removed with the offsets
+# from before the edit; the tokens after them moved by shift characters
+TokenDiff = namedtuple('TokenDiff', 'index removed added shift')
+
+CHUNK_SIZE = 4096
+
+# characters read at a time looking for the whitespace around an edit
+_SCAN = 64
+_RUN_HEAD = re.compile(r'\S*')
+_RUN_TAIL = re.compile(r'\S*\Z')
+
+
+class _Offsets(object):
+    """ascending offsets which an edit moves from some index on
+
+    The values from pivot on are stored shift too low. An edit settles the
+    values between the old pivot and its own place and leaves the rest to
+    the new shift, so edits close to each other cost little however many
+    values follow them.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.pivot = 0
+        self.shift = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        return value + self.shift if index >= self.pivot else value
+
+    def first_from(self, offset):
+        """index of the first value at offset or after it"""
+        low, high = 0, len(self.values)
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle] < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def replace(self, first, last, values, shift):
+        """put values in place of first:last and move the values after them by shift"""
+        stored = self.values
+        if self.shift:
+            if last > self.pivot:
+                for index in range(self.pivot, last):
+                    stored[index] += self.shift
+            else:
+                for index in range(last, self.pivot):
+                    stored[index] -= self.shift
+        stored[first:last] = values
+        self.pivot = first + len(values)
+        # nothing left to shift after an edit at the end
+        self.shift = self.shift + shift if self.pivot < len(stored) else 0
+
+
+class TranscriptionSession(object):
+    """text with the phonemes of its tokens, kept up to date through edits"""
+
+    def __init__(self, text='', convert=False):
+        self.convert = convert
+        self._chunks = []
+        self._chunk_starts = _Offsets()
+        self._length = 0
+        # the start and the (kind, text, phonemes) of every token
+        self._starts = _Offsets()
+        self._tokens = []
+        if text:
+            self.edit(0, 0, text)
+
+    @property
+    def text(self):
+        return ''.join(self._chunks)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __iter__(self):
+        """(Token, phonemes) of every token in order"""
+        for index in range(len(self._tokens)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._tokens)
+        if not 0 <= index < len(self._tokens):
+            raise IndexError('token index out of range')
+        return self._token(index), self._tokens[index][2]
+
+    def _token(self, index):
+        start = self._starts[index]
+        kind, text, _ = self._tokens[index]
+        return Token(kind, text, start, start + len(text))
+
+    def _chunk_at(self, offset):
+        """index of the chunk holding offset, the last one for the end of the text"""
+        return max(self._chunk_starts.first_from(offset + 1) - 1, 0)
+
+    def _slice(self, low, high):
+        """self.text[low:high], for high at most the length of the text"""
+        if low >= high:
+            return ''
+        index = self._chunk_at(low)
+        start = self._chunk_starts[index]
+        pieces = []
+        while start < high:
+            chunk = self._chunks[index]
+            pieces.append(chunk[max(low - start, 0):high - start])
+            start += len(chunk)
+            index += 1
+        return ''.join(pieces)
+
+    def _run_start(self, offset):
+        """start of the run of non-whitespace characters ending at offset"""
+        while offset:
+            low = max(offset - _SCAN, 0)
+            run = _RUN_TAIL.search(self._slice(low, offset)).start()
+            if run or not low:
+                return low + run
+            offset = low
+        return offset
+
+    def _run_end(self, offset):
+        """end of the run of non-whitespace characters starting at offset"""
+        while offset < self._length:
+            window = self._slice(offset, min(offset + _SCAN, self._length))
+            run = _RUN_HEAD.match(window).end()
+            offset += run
+            if run < len(window):
+                break
+        return offset
+
+    def _replace_text(self, offset, deleted, inserted):
+        if self._chunks:
+            first = self._chunk_at(offset)
+            last = self._chunk_at(offset + deleted) + 1
+            base = self._chunk_starts[first]
+            text = (self._chunks[first][:offset - base] + inserted
+                    + self._chunks[last - 1][offset + deleted - self._chunk_starts[last - 1]:])
+        else:
+            first = last = base = 0
+            text = inserted
+        if len(text) > 2 * CHUNK_SIZE:
+            pieces = [text[start:start + CHUNK_SIZE] for start in range(0, len(text), CHUNK_SIZE)]
+        else:
+            pieces = [text] if text else []
+        starts = []
+        for piece in pieces:
+            starts.append(base)
+            base += len(piece)
+        self._chunks[first:last] = pieces
+        self._chunk_starts.replace(first, last, starts, len(inserted) - deleted)
+        self._length += len(inserted) - deleted
+
+    def _transcribe(self, token):
+        if token.kind not in SPOKEN:
+            return []
+        phonemes = breakdownWord(token.text)
+        if self.convert:
+            return [phoneme_conversion[phoneme] for phoneme in phonemes]
+        return phonemes
+
+    def edit(self, offset, deleted, inserted):
+        """replace deleted characters at offset by inserted, returning a TokenDiff"""
+        if offset < 0 or deleted < 0 or offset + deleted > self._length:
+            raise ValueError('edit of %d characters at %d is outside a text of %d'
+                             % (deleted, offset, self._length))
+        low = self._run_start(offset)
+        high = self._run_end(offset + deleted)
+        first = self._starts.first_from(low)
+        last = self._starts.first_from(high)
+        shift = len(inserted) - deleted
+        window = self._slice(low, offset) + inserted + self._slice(offset + deleted, high)
+        self._replace_text(offset, deleted, inserted)
+        new = [token._replace(start=token.start + low, end=token.end + low) for token in tokenize(window)]
+
+        # tokens which come back unchanged are left alone
+        kept = 0
+        while kept < len(new) and first < last and new[kept] == self._token(first):
+            first += 1
+            kept += 1
+        new = new[kept:]
+        while new and first < last:
+            token = self._token(last - 1)
+            if new[-1] != token._replace(start=token.start + shift, end=token.end + shift):
+                break
+            last -= 1
+            new.pop()
+
+        removed = [self[index] for index in range(first, last)]
+        added = [(token, self._transcribe(token)) for token in new]
+        self._starts.replace(first, last, [token.start for token in new], shift)
+        self._tokens[first:last] = [(token.kind, token.text, phonemes) for token, phonemes in added]
+        return TokenDiff(first, removed, added, shift)
@@ -0,0 +1,154 @@
+"""compiled pronunciation lexicon, consulted by Phoneme.breakdownWord before its rules
+
+A lexicon starts out as a tab separated text file, one word per line
+followed by its CMU phonemes separated by spaces:
+
+    monsieur	M EH0 S IH0 EH0 UW0 R
+    wagon	V AE0 G AO0 NG
+
+build() compiles it into a binary file holding the entries and a hash
+table over them, and Lexicon opens that file with mmap and looks words up
+in that table, so even a very large lexicon loads instantly, costs next to
+no resident memory and is shared between processes using the same file.
+
+File layout (little endian):
+
+    header   magic b'PHLX', version (u16), unused (u16), entry count (u32),
+             slot count (u32, a power of two at least twice the entry count)
+    slots    one u32 per slot: the file offset of an entry or 0 when empty;
+             a word goes in the first free slot from crc32(word) % slot count
+    entries  word length (u8), utf-8 word, phonemes length (u8), ascii
+             phonemes; sorted by word
+
+To compile a lexicon:
+
+    python lexicon.py words.tsv words.lex
+"""
+import mmap
+import struct
+from zlib import crc32
+
+from unicode_hammer import fold_to_latin1
+
+_MAGIC = b'PHLX'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHII')
+_OFFSET = struct.Struct('<I')
+
+
+def _read_tsv(tsv_path):
+    """{word: phonemes string} from a lexicon source file, checking each line"""
+    from Phoneme import phoneme_conversion
+    entries = {}
+    with open(tsv_path, encoding='utf-8') as source:
+        for number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            word, tab, phonemes = line.partition('\t')
+            phonemes = phonemes.split()
+            if not tab or not word.strip() or not phonemes:
+                raise ValueError('%s:%d: expected a word, a tab and its phonemes, got %r'
+                                 % (tsv_path, number, line))
+            for phoneme in phonemes:
+                if phoneme not in phoneme_conversion:
+                    raise ValueError('%s:%d: unknown phoneme %r' % (tsv_path, number, phoneme))
+            # a word listed twice keeps its last pronunciation
+            entries[fold_to_latin1(word.strip().lower())] = ' '.join(phonemes)
+    return entries
+
+
+def build(tsv_path, lexicon_path):
+    """compile the lexicon source tsv_path into lexicon_path, returning the entry count"""
+    entries = []
+    for word, phonemes in _read_tsv(tsv_path).items():
+        key = word.encode('utf-8')
+        value = phonemes.encode('ascii')
+        if len(key) > 255 or len(value) > 255:
+            raise ValueError('lexicon entry too long: %r' % word)
+        entries.append((key, value))
+    entries.sort()
+    slot_count = 1
+    while slot_count < 2 * len(entries):
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = [0] * slot_count
+    offset = _HEADER.size + _OFFSET.size * slot_count
+    for key, value in entries:
+        slot = crc32(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = offset
+        offset += 2 + len(key) + len(value)
+    with open(lexicon_path, 'wb') as out:
+        out.write(_HEADER.pack(_MAGIC, _VERSION, 0, len(entries), slot_count))
+        out.write(struct.pack('<%dI' % slot_count, *slots))
+        for key, value in entries:
+            out.write(bytes((len(key),)) + key + bytes((len(value),)) + value)
+    return len(entries)
+
+
+class Lexicon(object):
+    """read-only view of a compiled lexicon file, mapped into memory"""
+
+    def __init__(self, lexicon_path):
+        self.path = lexicon_path
+        with open(lexicon_path, 'rb') as source:
+            self._data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count, slot_count = _HEADER.unpack_from(self._data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._data.close()
+            raise ValueError('%s is not a version %d lexicon' % (lexicon_path, _VERSION))
+        self._mask = slot_count - 1
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        return self.lookup(fold_to_latin1(word.lower())) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._data.close()
+
+    def lookup(self, word):
+        """tuple of the phonemes of word, or None when it is not listed
+
+        word is taken as it is, already lowered and folded like
+        breakdownWord does it; `in` folds the word it is given first.
+        """
+        key = word.encode('utf-8')
+        data = self._data
+        mask = self._mask
+        slot = crc32(key) & mask
+        while True:
+            offset = _OFFSET.unpack_from(data, _HEADER.size + _OFFSET.size * slot)[0]
+            if not offset:
+                return None
+            end = offset + 1 + data[offset]
+            if data[offset + 1:end] == key:
+                return tuple(data[end + 1:end + 1 + data[end]].decode('ascii').split())
+            slot = (slot + 1) & mask
+
+    def __iter__(self):
+        """(word, phonemes) for every entry, in sorted order"""
+        data = self._data
+        offset = _HEADER.size + _OFFSET.size * (self._mask + 1)
+        for _ in range(self._count):
+            end = offset + 1 + data[offset]
+            word = data[offset + 1:end].decode('utf-8')
+            offset = end + 1 + data[end]
+            yield word, tuple(data[end + 1:offset].decode('ascii').split())
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit('usage: python lexicon.py words.tsv words.lex')
+    print('%d entries written to %s' % (build(sys.argv[1], sys.argv[2]), sys.argv[2]))
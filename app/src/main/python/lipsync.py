@@ -0,0 +1,253 @@
+"""timed viseme output for Papagayo-NG and MOHO
+
+A transcript is a text (a string or a file-like object), a transcribed
+text (anything with an iter_text() like Phoneme's, such as a
+phoneme_columns.ColumnReader), or an iterable of (word, start, end)
+tuples with times in seconds, such as an aligner gives; strings may be
+mixed into the tuples for stretches of untimed text, and TimedWords
+(such as phoneme_align gives, with the start of every viseme) into
+either. Each word's visemes (like convertPhonemes) are spread evenly
+over the word's duration unless their starts are known. Untimed words
+follow the previous word, with phoneme_seconds per viseme and a pause
+after punctuation.
+
+    for frame, viseme in iter_frames('Bonjour, le monde.', fps=24):
+        ...                         # (0, 'MBP'), (2, 'O'), (4, 'etc') ...
+    write_moho('hello.dat', 'Bonjour, le monde.')
+    write_pgo('hello.pgo', [('bonjour', 0.5, 1.1), ('monde', 1.3, 1.8)],
+              sound_path='hello.wav')
+
+iter_frames() yields (frame, viseme) only where the mouth changes, with
+'rest' between words that do not touch and after the last one. It and the
+writers go through the transcript lazily, so a whole script exports in
+constant memory; write_pgo() spools the phrases to a temporary file since
+their count comes first in the file.
+
+    python lipsync.py script.txt script.dat --fps 24
+    python lipsync.py --timed aligned.txt aligned.pgo --sound aligned.wav
+    python lipsync.py script.phc script.dat     # a phoneme_columns file
+    python lipsync.py script.txt script.pgo --sound script.wav --align
+
+The last two need phoneme_columns and phoneme_align, which are not part
+of the app and live in tools/ at the top of the repository; run from
+the source tree, the command line puts it on the path.
+"""
+import shutil
+import tempfile
+from collections import namedtuple
+
+from Phoneme import convertPhonemes, iter_text
+from tokenizer import APOSTROPHES, PUNCTUATION, SPOKEN
+
+REST = 'rest'
+FPS = 24
+PHONEME_SECONDS = 0.08
+PAUSE_SECONDS = 0.25
+
+# start and end in seconds; starts, when known, the time each viseme starts at
+TimedWord = namedtuple('TimedWord', 'text start end visemes starts')
+# namedtuple(defaults=) is Python 3.7 and up
+TimedWord.__new__.__defaults__ = (None,)
+# start and end (exclusive) in frames, keys a list of (frame, viseme)
+WordFrames = namedtuple('WordFrames', 'text start end keys')
+
+
+def _is_text(transcript):
+    return isinstance(transcript, str) or hasattr(transcript, 'read') or hasattr(transcript, 'iter_text')
+
+
+def iter_timed_words(transcript, phoneme_seconds=PHONEME_SECONDS, pause=PAUSE_SECONDS):
+    """yield a TimedWord for every word of a transcript, see the module docstring"""
+    if _is_text(transcript):
+        transcript = (transcript,)
+    clock = 0.0
+    for item in transcript:
+        if not _is_text(item) and len(item) > 3:
+            # a TimedWord, visemes and all
+            item = TimedWord(*item)
+            yield item
+            clock = item.end
+            continue
+        if not _is_text(item):
+            word, start, end = item
+            if end < start:
+                raise ValueError('%r ends before it starts' % (word,))
+            yield TimedWord(word, start, end, convertPhonemes(word))
+            clock = end
+            continue
+        pairs = item.iter_text(convert=True) if hasattr(item, 'iter_text') else iter_text(item, convert=True)
+        for token, visemes in pairs:
+            if token.kind == PUNCTUATION:
+                clock += pause
+            elif token.kind in SPOKEN:
+                end = clock + phoneme_seconds * max(len(visemes), 1)
+                yield TimedWord(token.text, clock, end, visemes)
+                clock = end
+
+
+def iter_word_frames(transcript, fps=FPS, phoneme_seconds=PHONEME_SECONDS, pause=PAUSE_SECONDS):
+    """yield a WordFrames for every word of a transcript, at fps frames per second
+
+    Every word lasts at least one frame and starts no earlier than the
+    previous one ends. Its visemes are keyed at their starts when the
+    word has them (see phoneme_align), otherwise at even steps across it,
+    so in a word shorter than its visemes several may share a frame.
+    """
+    previous_end = 0
+    for word in iter_timed_words(transcript, phoneme_seconds, pause):
+        start = max(int(round(word.start * fps)), previous_end)
+        end = max(int(round(word.end * fps)), start + 1)
+        count = len(word.visemes)
+        length = end - start
+        if word.starts is not None:
+            keys = [(min(max(int(round(seconds * fps)), start), end - 1), viseme)
+                    for seconds, viseme in zip(word.starts, word.visemes)]
+        else:
+            keys = [(start + index * length // count, viseme) for index, viseme in enumerate(word.visemes)]
+        yield WordFrames(word.text, start, end, keys)
+        previous_end = end
+
+
+def iter_frames(transcript, fps=FPS, phoneme_seconds=PHONEME_SECONDS, pause=PAUSE_SECONDS):
+    """yield (frame, viseme) at every frame where the viseme changes
+
+    The first pair is at frame 0 and the last one is a 'rest'. When
+    several visemes fall on one frame the first of them is shown.
+    """
+    last_frame = -1
+    last = None
+    end = 0
+    for word in iter_word_frames(transcript, fps, phoneme_seconds, pause):
+        keys = word.keys or [(word.start, REST)]
+        if word.start > end:
+            keys.insert(0, (end, REST))
+        for frame, viseme in keys:
+            if frame > last_frame and viseme != last:
+                yield frame, viseme
+                last_frame = frame
+                last = viseme
+        end = word.end
+    if last != REST:
+        yield end, REST
+
+
+def _open(out):
+    if hasattr(out, 'write'):
+        return out, False
+    return open(out, 'w', encoding='utf-8', newline='\n'), True
+
+
+def write_moho(out, transcript, fps=FPS, phoneme_seconds=PHONEME_SECONDS, pause=PAUSE_SECONDS):
+    """write a MOHO switch data file (.dat) to a path or file-like object"""
+    out, owned = _open(out)
+    try:
+        out.write('MohoSwitch1\n')
+        for frame, viseme in iter_frames(transcript, fps, phoneme_seconds, pause):
+            # MOHO counts frames from 1
+            out.write('%d %s\n' % (frame + 1, viseme))
+    finally:
+        if owned:
+            out.close()
+
+
+def _write_phrase(spool, words):
+    text = ''
+    for word in words:
+        if text and text[-1] not in APOSTROPHES:
+            text += ' '
+        text += word.text
+    spool.write('\t\t%s\n\t\t%d\n\t\t%d\n\t\t%d\n' % (text, words[0].start, words[-1].end - 1, len(words)))
+    for word in words:
+        spool.write('\t\t\t%s %d %d %d\n' % (word.text, word.start, word.end - 1, len(word.keys)))
+        for frame, viseme in word.keys:
+            spool.write('\t\t\t\t%d %s\n' % (frame, viseme))
+    return text
+
+
+def write_pgo(out, transcript, fps=FPS, sound_path='', duration=None, voice='Voice 1',
+              phoneme_seconds=PHONEME_SECONDS, pause=PAUSE_SECONDS):
+    """write a Papagayo-NG project (.pgo) with one voice to a path or file-like object
+
+    Words that touch make up a phrase, a gap between two words starts a
+    new one. duration is the length of the sound in seconds, by default
+    it ends with the last word.
+    """
+    phrase_count = 0
+    end = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as phrases, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as voice_text:
+        phrase = []
+        for word in iter_word_frames(transcript, fps, phoneme_seconds, pause):
+            if phrase and word.start > end:
+                voice_text.write(('|' if phrase_count else '') + _write_phrase(phrases, phrase))
+                phrase_count += 1
+                phrase = []
+            phrase.append(word)
+            end = word.end
+        if phrase:
+            voice_text.write(('|' if phrase_count else '') + _write_phrase(phrases, phrase))
+            phrase_count += 1
+        frames = end if duration is None else max(int(round(duration * fps)), end)
+        out, owned = _open(out)
+        try:
+            out.write('lipsync version 1\n%s\n%d\n%d\n1\n' % (sound_path, fps, frames))
+            out.write('\t%s\n\t' % voice)
+            voice_text.seek(0)
+            shutil.copyfileobj(voice_text, out)
+            out.write('\n\t%d\n' % phrase_count)
+            phrases.seek(0)
+            shutil.copyfileobj(phrases, out)
+        finally:
+            if owned:
+                out.close()
+
+
+def read_timed(source):
+    """yield (word, start, end) from lines 'word start end' of a file-like object"""
+    for line in source:
+        fields = line.split()
+        if fields:
+            yield fields[0], float(fields[1]), float(fields[2])
+
+
+def _write(args, transcript):
+    if args.align:
+        from phoneme_align import align_wav
+
+        transcript = align_wav(args.sound, transcript)
+    if args.output.endswith('.pgo'):
+        write_pgo(args.output, transcript, args.fps, sound_path=args.sound)
+    else:
+        write_moho(args.output, transcript, args.fps)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='export timed visemes for Papagayo-NG (.pgo) or MOHO (.dat)')
+    parser.add_argument('input', help="transcript text, a .phc column file, or with --timed lines of 'word start end'")
+    parser.add_argument('output', help='.pgo or .dat file to write')
+    parser.add_argument('--timed', action='store_true', help='the input holds word times in seconds')
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--sound', default='', help='sound file named in a .pgo')
+    parser.add_argument('--align', action='store_true', help='time the words against the --sound WAV file')
+    args = parser.parse_args(argv)
+    if args.align and (args.timed or not args.sound):
+        parser.error('--align needs --sound and no --timed')
+    if args.input.endswith('.phc'):
+        from phoneme_columns import ColumnReader
+
+        with ColumnReader(args.input) as transcript:
+            _write(args, transcript)
+        return 0
+    with open(args.input, encoding='utf-8') as source:
+        _write(args, read_timed(source) if args.timed else source)
+    return 0
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'tools'))
+    sys.exit(main())
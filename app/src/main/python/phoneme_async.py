@@ -0,0 +1,222 @@
+"""transcription off the calling thread, with cancellation and deadlines
+
+    transcriber = Transcriber()                     # or Transcriber(processes=True)
+    future = transcriber.submit(text, key='editor', deadline=0.5)
+    future.result()                                 # [(Token, phonemes), ...] like iter_text
+    pairs = await transcriber.convert_async(text)   # the same, with visemes
+
+    breakdownText(text, key='editor')   # Phoneme.breakdownText, None once superseded
+
+submit() returns at once with a concurrent.futures.Future. The text is cut
+at whitespace into pieces of about chunk_size characters (no token spans
+whitespace), which go to the executor one after the other, so work that
+is no longer wanted stops at the end of the piece being transcribed
+instead of running to the end of a long paste:
+
+- cancelling the future drops the pieces not yet done;
+- a call with the same key as a pending one cancels that one, so only
+  the last keystroke of a burst is transcribed through;
+- past its deadline (in seconds, for the whole call) the future fails
+  with concurrent.futures.TimeoutError once the piece under way is done,
+  and a piece that only reaches a worker after it is skipped there.
+
+The executor is a ThreadPoolExecutor of one thread by default, which
+keeps the caller free while the GIL keeps more threads from helping;
+with processes set it is a ProcessPoolExecutor, each worker compiling
+the rules once, or any executor can be handed in (and is then left
+open by close()). breakdown_async and convert_async wrap submit() for
+asyncio, cancelling the work when the awaiting task is cancelled.
+"""
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as DeadlineError
+
+from Phoneme import iter_text, joinPhonemes
+
+# characters of text transcribed between two looks at cancellation and deadline
+CHUNK_SIZE = 4096
+
+_SPACE = re.compile(r'\s')
+
+
+def _pieces(text, size):
+    """(start, piece) of text cut at the first whitespace after every size characters"""
+    start = 0
+    while start < len(text):
+        space = _SPACE.search(text, start + size)
+        end = space.end() if space else len(text)
+        yield start, text[start:end]
+        start = end
+
+
+def transcribe_piece(text, start, convert=False, expires=None):
+    """list(iter_text(text, convert)) with offsets from start, None past expires (a time.time())"""
+    if expires is not None and time.time() > expires:
+        return None
+    return [(token._replace(start=token.start + start, end=token.end + start), phonemes)
+            for token, phonemes in iter_text(text, convert)]
+
+
+def _settle(future, settle, value):
+    """set a result or error unless the future was cancelled meanwhile"""
+    if future.done():
+        return
+    try:
+        settle(value)
+    except Exception:
+        # InvalidStateError from Python 3.8, when cancelled since the look above
+        pass
+
+
+class _Job(object):
+    __slots__ = ('future', 'pieces', 'convert', 'expires', 'results', 'chunk')
+
+    def __init__(self, future, pieces, convert, expires):
+        self.future = future
+        self.pieces = pieces
+        self.convert = convert
+        self.expires = expires
+        self.results = []
+        self.chunk = None
+
+
+class Transcriber(object):
+    """iter_text of whole texts in an executor, see the module docstring"""
+
+    def __init__(self, executor=None, processes=False, workers=None, deadline=None, chunk_size=CHUNK_SIZE):
+        self._owned = executor is None
+        if executor is None:
+            executor = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers or 1)
+        self.executor = executor
+        # seconds a call may take when it gives no deadline of its own, None for no limit
+        self.deadline = deadline
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._pending = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """cancel the pending calls, and shut down the executor if it was made here"""
+        with self._lock:
+            pending = list(self._pending)
+        # each call cancels its piece waiting in the executor, by hand since
+        # shutdown(cancel_futures=True) is Python 3.9 and up
+        for future in pending:
+            future.cancel()
+        if self._owned:
+            self.executor.shutdown(wait=False)
+
+    def submit(self, text, convert=False, key=None, deadline=None):
+        """Future of list(iter_text(text, convert))
+
+        key names what the call is for: a pending call with the same key is
+        cancelled. deadline is in seconds from now, self.deadline if None.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        future = Future()
+        job = _Job(future, _pieces(text, self.chunk_size), convert,
+                   None if deadline is None else time.time() + deadline)
+        older = None
+        with self._lock:
+            self._pending.add(future)
+            if key is not None:
+                older = self._latest.get(key)
+                self._latest[key] = future
+        if older is not None:
+            older.cancel()
+        future.add_done_callback(lambda done: self._forget(key, done))
+        future.add_done_callback(lambda done: done.cancelled() and job.chunk is not None and job.chunk.cancel())
+        self._step(job)
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            self._pending.discard(future)
+            if key is not None and self._latest.get(key) is future:
+                del self._latest[key]
+
+    def _step(self, job, chunk=None):
+        """take in the piece just done and send the next one"""
+        future = job.future
+        if chunk is not None:
+            if chunk.cancelled():
+                return
+            error = chunk.exception()
+            if error is not None:
+                _settle(future, future.set_exception, error)
+                return
+            result = chunk.result()
+            if result is not None:
+                job.results.extend(result)
+        if future.done():
+            return
+        if job.expires is not None and time.time() > job.expires:
+            _settle(future, future.set_exception, DeadlineError('transcription deadline passed'))
+            return
+        piece = next(job.pieces, None)
+        if piece is None:
+            _settle(future, future.set_result, job.results)
+            return
+        try:
+            job.chunk = self.executor.submit(transcribe_piece, piece[1], piece[0], job.convert, job.expires)
+        except RuntimeError as error:
+            # the executor was shut down
+            _settle(future, future.set_exception, error)
+            return
+        if future.cancelled():
+            job.chunk.cancel()
+        job.chunk.add_done_callback(lambda done: self._step(job, done))
+
+    async def breakdown_async(self, text, key=None, deadline=None):
+        """list(iter_text(text)), transcribed in the executor"""
+        return await asyncio.wrap_future(self.submit(text, False, key, deadline))
+
+    async def convert_async(self, text, key=None, deadline=None):
+        """list(iter_text(text, convert=True)), transcribed in the executor"""
+        return await asyncio.wrap_future(self.submit(text, True, key, deadline))
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_transcriber():
+    """the Transcriber of the module functions, made on first use"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Transcriber()
+        return _default
+
+
+def submit(text, convert=False, key=None, deadline=None):
+    return default_transcriber().submit(text, convert, key, deadline)
+
+
+async def breakdown_async(text, key=None, deadline=None):
+    return await default_transcriber().breakdown_async(text, key, deadline)
+
+
+async def convert_async(text, key=None, deadline=None):
+    return await default_transcriber().convert_async(text, key, deadline)
+
+
+def breakdownText(text, key=None, deadline=None):
+    """Phoneme.breakdownText by the default Transcriber, waiting for it
+
+    Returns None when a later call with the same key superseded this one,
+    so a caller on a worker thread can just drop the result.
+    """
+    try:
+        return joinPhonemes(submit(text, key=key, deadline=deadline).result())
+    except CancelledError:
+        return None
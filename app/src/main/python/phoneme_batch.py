@@ -0,0 +1,343 @@
+"""breakdownWord over a whole batch of words at once, with NumPy
+
+    batch = breakdownBatch(words)     # a phoneme_codes.CodedWords
+    batch[0]                          # ['B', 'AO0', 'NG', 'JH', 'UW0']
+    batch.codes, batch.offsets        # every phoneme ID, where each word starts
+
+The words are turned into one array of one byte character codes, laid
+end to end, and every character gets a bit mask of the letter sets of
+the rules it is in (VOWELS, NASAL_CLOSERS, 'eiy'...). The rules of a
+letter are then applied to all of its places in the batch at once: each
+term of a condition is one NumPy operation over them, and each rule takes
+the places where it holds and no rule above it did. The phonemes found go
+through the same dropping of repeats as breakdownWord, into one array of
+phoneme IDs and the offset where each word starts.
+
+The result is that of breakdownWord, word for word; benchmarks/bench_batch.py
+checks this and shows how large a batch must be to gain anything. Words
+the lexicon knows go through breakdownWord itself, and so does a batch
+smaller than min_batch, or any batch when NumPy is not installed (codes
+and offsets are then arrays, not NumPy arrays).
+"""
+import Phoneme
+from Phoneme import breakdownWord
+from phoneme_codes import PHONEME_IDS, CodedWords, encodeWords
+from phoneme_rules import (CLASSES, RULES, _LENGTH_TERM, _OFFSET_TERM, _SEQUENCE_TERM, _WORD_TERM,
+                           load_rules)
+from unicode_hammer import _not_ascii, fold_to_latin1
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this many words a batch costs more than breakdownWord on each
+MIN_BATCH = 1000
+# words worked on at a time
+CHUNK_SIZE = 65536
+
+# phoneme ID slot left empty in the table of what the rules give
+_NONE = 255
+
+# characters with no code of their own: the C1 controls, and anything
+# above Latin-1 the rules do not name
+_OTHER = 0x80
+
+_program = None
+
+
+def _letter_codes(rules):
+    """{character: code} for the characters above Latin-1 that the rules name"""
+    named = set(rules)
+    for letter_rules in rules.values():
+        for condition, _ in letter_rules:
+            named.update(condition)
+    for letters in CLASSES.values():
+        named.update(letters)
+    wide = sorted(letter for letter in named if ord(letter) > 0xff)
+    return {letter: _OTHER + 1 + index for index, letter in enumerate(wide)}
+
+
+def _compile_term(term, code_of, mask):
+    """one term of a condition as a tuple, see _compile"""
+    if term == 'end':
+        return ('end',)
+    match = _OFFSET_TERM.match(term)
+    if match:
+        where, op, letters = match.groups()
+        negate = op == '!'
+        if where == 'prev':
+            return ('prev', mask(letters), negate)
+        if where[0] == '#':
+            return ('at', int(where[1:]), mask(letters), negate)
+        if where[0] == '+':
+            return ('right', int(where), mask(letters), negate)
+        return ('left', -int(where), mask(letters), negate)
+    match = _SEQUENCE_TERM.match(term)
+    if match:
+        return ('text', int(match.group(1)), tuple(code_of(letter) for letter in match.group(2)))
+    match = _LENGTH_TERM.match(term)
+    if match:
+        what, op, count = match.groups()
+        return ('rest' if what == 'rest' else 'len' + op, int(count))
+    match = _WORD_TERM.match(term)
+    if match:
+        return ('word', tuple(code_of(letter) for letter in match.group(2)), match.group(1) == '!')
+    raise ValueError('unknown rule term %r' % term)
+
+
+def _compile(rules):
+    """the rules as terms over codes, with the tables they use
+
+    A term is a tuple whose first item says what it looks at: 'end',
+    'prev', 'right' or 'left' K places, 'at' an absolute index, 'text'
+    spelled K places on, 'rest', 'len=', 'len>', or 'word'.
+    """
+    remap = _letter_codes(rules)
+
+    def code_of(letter):
+        return remap.get(letter, ord(letter))
+
+    masks = {}
+
+    def mask(letters):
+        letters = frozenset(code_of(letter) for letter in CLASSES.get(letters, letters))
+        if letters not in masks:
+            masks[letters] = len(masks)
+        return 1 << masks[letters]
+
+    outcomes = {(): 0}
+    programs = []
+    for letter, letter_rules in sorted(rules.items()):
+        compiled = []
+        for condition, phonemes in letter_rules:
+            alternatives = []
+            for alternative in condition.split('|'):
+                alternatives.append([_compile_term(term, code_of, mask) for term in alternative.split()])
+            if phonemes is not None:
+                phonemes = outcomes.setdefault(tuple(phonemes.split()), len(outcomes))
+            compiled.append((alternatives, phonemes))
+        programs.append((code_of(letter), compiled))
+    if len(masks) > 64:
+        raise ValueError('the rules use %d letter sets, at most 64 fit a mask' % len(masks))
+
+    bits = numpy.zeros(256, numpy.uint64)
+    for codes, bit in masks.items():
+        for code in codes:
+            bits[code] |= numpy.uint64(1 << bit)
+
+    # letters given the same phonemes wherever they are: the ones with a
+    # single unconditional rule, and the accented ones (see accented_rules)
+    fixed = numpy.zeros(256, numpy.uint8)
+    varying = []
+    for code, compiled in programs:
+        alternatives, phonemes = compiled[0]
+        if alternatives == [[]] and phonemes is not None:
+            fixed[code] = phonemes
+        else:
+            varying.append((code, compiled))
+    for letter, rule in load_rules().items():
+        if len(letter) == 1 and letter not in rules and ord(letter) <= 0xff:
+            fixed[ord(letter)] = outcomes.setdefault(tuple(rule(letter, 0, 1, ' ')), len(outcomes))
+
+    table = numpy.full((len(outcomes), max(map(len, outcomes))), _NONE, numpy.uint8)
+    for phonemes, outcome in outcomes.items():
+        table[outcome, :len(phonemes)] = [PHONEME_IDS[phoneme] for phoneme in phonemes]
+    return {
+        'remap': remap,
+        'space': bits[ord(' ')],
+        'bits': bits,
+        'fixed': fixed,
+        'letters': varying,
+        'outcomes': table,
+    }
+
+
+def _term(term, cell, col, n, codes, bits, space):
+    """bool array: whether term holds at each of the cells
+
+    Neighbours are read at indices clipped to codes; where that matters
+    the letter does not exist and the term is false anyway.
+    """
+    kind = term[0]
+    last = len(codes) - 1
+    if kind == 'end':
+        return col + 1 == n
+    if kind == 'rest':
+        return n == col + term[1] + 1
+    if kind == 'len=':
+        return n == term[1]
+    if kind == 'len>':
+        return n > term[1]
+    if kind == 'text':
+        _, offset, text = term
+        holds = col + offset + len(text) <= n
+        for index, code in enumerate(text):
+            holds &= codes[(cell + offset + index).clip(0, last)] == code
+        return holds
+    if kind == 'word':
+        _, text, negate = term
+        holds = n == len(text)
+        start = cell - col
+        for index, code in enumerate(text):
+            holds &= codes[(start + index).clip(0, last)] == code
+        return holds != negate
+    if kind == 'prev':
+        found = numpy.where(col > 0, bits[(cell - 1).clip(0, last)], space)
+        exists = True
+    elif kind == 'right':
+        found = bits[(cell + term[1]).clip(0, last)]
+        exists = col + term[1] < n
+    elif kind == 'left':
+        # past the start of the word it wraps around to its end
+        found = bits[(cell - term[1] + (col < term[1]) * n).clip(0, last)]
+        exists = col - term[1] >= -n
+    else:
+        index = term[1]
+        start = cell - col
+        if index >= 0:
+            found = bits[(start + index).clip(0, last)]
+            exists = n > index
+        else:
+            found = bits[(start + n + index).clip(0, last)]
+            exists = n >= -index
+    holds = (found & numpy.uint64(term[-2])) != 0
+    return exists & (holds != term[-1])
+
+
+def _condition(alternatives, cell, col, n, codes, bits, space):
+    """bool array: whether any alternative holds at each of the cells"""
+    result = None
+    for terms in alternatives:
+        holds = numpy.ones(len(cell), bool)
+        for term in terms:
+            holds &= _term(term, cell, col, n, codes, bits, space)
+        result = holds if result is None else result | holds
+    return result
+
+
+def _breakdown_chunk(codes, lengths, program):
+    """(phoneme IDs, count per word) of words, as their codes one after the other and their lengths"""
+    if not len(codes):
+        return numpy.zeros(0, numpy.uint8), numpy.zeros(len(lengths), numpy.int64)
+    rows = numpy.repeat(numpy.arange(len(lengths)), lengths)
+    columns = numpy.arange(len(codes)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    sizes = lengths[rows]
+    bits = program['bits'][codes]
+    space = program['space']
+
+    chosen = program['fixed'][codes]
+    order = numpy.argsort(codes, kind='stable')
+    bounds = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(codes, minlength=256))))
+    for code, rules in program['letters']:
+        cell = order[bounds[code]:bounds[code + 1]]
+        col = columns[cell]
+        n = sizes[cell]
+        skip = None
+        for alternatives, outcome in rules:
+            if not len(cell):
+                break
+            holds = _condition(alternatives, cell, col, n, codes, bits, space)
+            if outcome is None:
+                # an exception to the rule after it
+                skip = holds
+                continue
+            if skip is not None:
+                holds &= ~skip
+                skip = None
+            chosen[cell[holds]] = outcome
+            left = ~holds
+            cell, col, n = cell[left], col[left], n[left]
+
+    phonemes = program['outcomes'][chosen]
+    emitted = phonemes != _NONE
+    values = phonemes[emitted]
+    rows = rows[numpy.flatnonzero(emitted.ravel()) // phonemes.shape[1]]
+    # repeated phonemes are only emitted once
+    kept = numpy.ones(len(values), bool)
+    kept[1:] = (values[1:] != values[:-1]) | (rows[1:] != rows[:-1])
+    return values[kept], numpy.bincount(rows[kept], minlength=len(lengths))
+
+
+def _fold(words):
+    """fold_to_latin1 of every word lowered, only looking at the non-ASCII ones"""
+    folded = '\n'.join(words).lower().split('\n')
+    if len(folded) != len(words):
+        # a word holds the separator
+        return [fold_to_latin1(word.lower()) for word in words]
+    accented = [index for index, word in enumerate(folded) if _not_ascii.search(word)]
+    if accented:
+        refolded = fold_to_latin1('\n'.join(folded[index] for index in accented)).split('\n')
+        for index, word in zip(accented, refolded):
+            folded[index] = word
+    return folded
+
+
+def _codes(text, remap):
+    """uint8 array of the code of every character of text"""
+    if _not_ascii.search(text) is None:
+        return numpy.frombuffer(text.encode('ascii'), numpy.uint8)
+    wide = numpy.frombuffer(text.encode('utf-32-le'), numpy.uint32)
+    codes = numpy.where(wide <= 0xff, wide, _OTHER).astype(numpy.uint8)
+    codes[(wide >= 0x80) & (wide < 0xa0)] = _OTHER
+    for letter, code in remap.items():
+        codes[wide == ord(letter)] = code
+    return codes
+
+
+def breakdownBatch(words, convert=False, min_batch=MIN_BATCH, chunk_size=CHUNK_SIZE):
+    """CodedWords of breakdownWord for every word of a sequence
+
+    With convert set the result holds visemes, like convertPhonemes.
+    """
+    global _program
+    if numpy is None or len(words) < min_batch:
+        batch = encodeWords(words)
+        if numpy is not None:
+            batch = CodedWords(numpy.frombuffer(batch.codes, numpy.uint8),
+                               numpy.frombuffer(batch.offsets, numpy.uint32).astype(numpy.int64))
+        return batch.to_visemes() if convert else batch
+    if _program is None:
+        _program = _compile(RULES)
+
+    folded = _fold(words)
+    lexicon = Phoneme._lexicon
+    alone = []
+    if lexicon is not None:
+        alone = [index for index, word in enumerate(folded) if lexicon.lookup(word) is not None]
+    if alone:
+        taken = set(alone)
+        batched = [index for index in range(len(folded)) if index not in taken]
+        folded = [folded[index] for index in batched]
+
+    lengths = numpy.fromiter(map(len, folded), numpy.int64, len(folded))
+    codes = _codes(''.join(folded), _program['remap'])
+    ends = numpy.cumsum(lengths)
+    pieces = []
+    counts = []
+    for first in range(0, len(folded), chunk_size):
+        last = min(first + chunk_size, len(folded))
+        start = ends[first - 1] if first else 0
+        values, chunk_counts = _breakdown_chunk(codes[start:ends[last - 1]], lengths[first:last], _program)
+        pieces.append(values)
+        counts.append(chunk_counts)
+    values = numpy.concatenate(pieces) if pieces else numpy.zeros(0, numpy.uint8)
+    counts = numpy.concatenate(counts) if counts else numpy.zeros(0, numpy.int64)
+
+    if alone:
+        spelled = [numpy.array([PHONEME_IDS[phoneme] for phoneme in breakdownWord(words[index])], numpy.uint8)
+                   for index in alone]
+        every = numpy.zeros(len(words), numpy.int64)
+        every[batched] = counts
+        every[alone] = [len(codes) for codes in spelled]
+        offsets = numpy.concatenate(([0], numpy.cumsum(every)))
+        merged = numpy.empty(offsets[-1], numpy.uint8)
+        moved = numpy.repeat(offsets[batched] - numpy.concatenate(([0], numpy.cumsum(counts)[:-1])), counts)
+        merged[numpy.arange(len(values)) + moved] = values
+        for index, codes in zip(alone, spelled):
+            merged[offsets[index]:offsets[index + 1]] = codes
+        values = merged
+    else:
+        offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+    batch = CodedWords(values, offsets)
+    return batch.to_visemes() if convert else batch
@@ -0,0 +1,85 @@
+"""bounded LRU cache in front of Phoneme.breakdownWord and convertPhonemes
+
+French text repeats the same few words (de, le, la, et, les...) over and
+over; a PhonemeCache remembers the phonemes of the most recently used
+words so they are only worked out once:
+
+    cache = PhonemeCache(capacity=10000)
+    cache.breakdownWord('Les')      # ('L', 'EH0')
+    cache.stats()                   # {'hits': 0, 'misses': 1, ...}
+
+Results are tuples so they can be shared between callers safely.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+import Phoneme
+from unicode_hammer import fold_to_latin1
+
+# output targets, part of the cache key next to the word lowered and folded
+# like breakdownWord does it, so 'Élève' and 'e\u0301le\u0300ve' share an entry
+CMU = 'cmu'
+PRESTON_BLAIR = 'preston_blair'
+
+
+class PhonemeCache(object):
+    """least recently used cache of word -> phonemes, holding at most capacity words"""
+
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError('cache capacity must be at least 1, got %r' % (capacity,))
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, word, target):
+        key = (target, fold_to_latin1(word.lower()))
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        phonemes = Phoneme.breakdownWord(key[1])
+        if target == PRESTON_BLAIR:
+            conversion = Phoneme.phoneme_conversion
+            phonemes = [conversion[phoneme] for phoneme in phonemes]
+        result = tuple(phonemes)
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def breakdownWord(self, word):
+        """Phoneme.breakdownWord(word) as a tuple"""
+        return self._lookup(word, CMU)
+
+    def convertPhonemes(self, word):
+        """Phoneme.convertPhonemes(word) as a tuple"""
+        return self._lookup(word, PRESTON_BLAIR)
+
+    def stats(self):
+        """snapshot of the hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'capacity': self.capacity,
+            }
+
+    def clear(self):
+        """forget every cached word and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
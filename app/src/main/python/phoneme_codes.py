@@ -0,0 +1,135 @@
+"""phonemes and visemes as small integer IDs, packed into arrays
+
+Every CMU phoneme of Phoneme.phoneme_conversion and every Preston Blair
+viseme gets a one byte ID (its index in PHONEMES or VISEMES), so the
+phonemes of a word fit in an array('B') and those of a whole batch of
+words in a single CodedWords: one array of IDs plus the offset where each
+word starts, instead of a list of lists of strings.
+
+    batch = encodeWords(['bonjour', 'monde'])
+    batch[0]                # ['B', 'AO0', 'NG', 'JH', 'UW0']
+    batch.codes             # array('B', [...]), 9 bytes for both words
+    batch.to_visemes()[1]   # ['MBP', 'O', 'etc', 'etc']
+
+Converting phonemes to visemes is a lookup of every ID in VISEME_OF,
+done for a whole batch at once by bytes.translate(), or by numpy.take()
+when the codes are a NumPy array. Indexing a CodedWords gives back the
+strings, so it can stand in for the lists breakdownWords returns.
+"""
+from array import array
+
+from Phoneme import breakdownWord, phoneme_conversion
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PHONEMES = tuple(sorted(phoneme_conversion))
+VISEMES = tuple(sorted(set(phoneme_conversion.values())))
+PHONEME_IDS = {phoneme: code for code, phoneme in enumerate(PHONEMES)}
+VISEME_IDS = {viseme: code for code, viseme in enumerate(VISEMES)}
+
+# viseme ID of each phoneme ID, padded to 256 entries for bytes.translate()
+VISEME_OF = bytes(VISEME_IDS[phoneme_conversion[phoneme]] for phoneme in PHONEMES).ljust(256, b'\0')
+_VISEME_OF_ARRAY = numpy.frombuffer(VISEME_OF, dtype=numpy.uint8) if numpy is not None else None
+
+
+def encode(phonemes, ids=PHONEME_IDS):
+    """array('B') of the IDs of a sequence of phonemes (or visemes, with ids=VISEME_IDS)"""
+    return array('B', [ids[phoneme] for phoneme in phonemes])
+
+
+def decode(codes, names=PHONEMES):
+    """list of the phonemes (or visemes, with names=VISEMES) of a sequence of IDs"""
+    return [names[code] for code in codes]
+
+
+def phonemeCodes(word):
+    """breakdownWord as an array('B') of phoneme IDs"""
+    return array('B', [PHONEME_IDS[phoneme] for phoneme in breakdownWord(word)])
+
+
+def visemeCodes(codes):
+    """viseme IDs of phoneme IDs, in the same kind of container
+
+    codes is an array('B'), bytes, bytearray or NumPy array; a NumPy array
+    is converted with numpy.take, anything else with bytes.translate.
+    """
+    if numpy is not None and isinstance(codes, numpy.ndarray):
+        return numpy.take(_VISEME_OF_ARRAY, codes)
+    visemes = bytes(codes).translate(VISEME_OF)
+    if isinstance(codes, array):
+        return array('B', visemes)
+    if isinstance(codes, bytearray):
+        return bytearray(visemes)
+    return visemes
+
+
+class CodedWords(object):
+    """the phonemes (or visemes) of many words, packed
+
+    codes holds the IDs of every word one after the other and word i has
+    codes[offsets[i]:offsets[i + 1]]. names turns IDs back into strings:
+    PHONEMES or VISEMES.
+    """
+
+    def __init__(self, codes=None, offsets=None, names=PHONEMES):
+        self.codes = array('B') if codes is None else codes
+        self.offsets = array('I', [0]) if offsets is None else offsets
+        self.names = names
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """strings of word index"""
+        return decode(self.word_codes(index), self.names)
+
+    def __iter__(self):
+        names = self.names
+        codes = self.codes
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield [names[code] for code in codes[offsets[index]:offsets[index + 1]]]
+
+    def word_codes(self, index):
+        """IDs of word index, as a slice of codes"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('word index out of range')
+        return self.codes[self.offsets[index]:self.offsets[index + 1]]
+
+    def append(self, codes):
+        """add the IDs of one more word"""
+        self.codes.extend(codes)
+        self.offsets.append(len(self.codes))
+
+    def nbytes(self):
+        """memory taken by the IDs and offsets"""
+        return (len(self.codes) * self.codes.itemsize
+                + len(self.offsets) * self.offsets.itemsize)
+
+    def to_visemes(self):
+        """CodedWords of the visemes of these phonemes, sharing the offsets"""
+        if self.names is not PHONEMES:
+            raise ValueError('only phonemes can be converted to visemes')
+        return CodedWords(visemeCodes(self.codes), self.offsets, VISEMES)
+
+
+def encodeWords(words, convert=False):
+    """CodedWords of breakdownWord for every word of an iterable
+
+    With convert set the result holds visemes, like convertPhonemes.
+    """
+    ids = PHONEME_IDS
+    codes = array('B')
+    offsets = array('I', [0])
+    extend = codes.extend
+    append = offsets.append
+    for word in words:
+        extend([ids[phoneme] for phoneme in breakdownWord(word)])
+        append(len(codes))
+    batch = CodedWords(codes, offsets)
+    return batch.to_visemes() if convert else batch
@@ -0,0 +1,655 @@
+"""letter rules used by Phoneme.breakdownWord, declared as data
+
+Each letter maps to an ordered list of (condition, phonemes) pairs; the
+first pair whose condition holds gives the CMU phonemes emitted for that
+letter (an empty string means the letter is silent).
+
+A condition is a space separated list of terms which must all hold;
+alternatives are separated with ' | '. An empty condition always holds.
+
+    prev:SET   the previous letter is in SET (a space before the first letter)
+    prev!SET   the previous letter is not in SET
+    +K:SET     the letter K places to the right exists and is in SET
+    +K!SET     the letter K places to the right exists and is not in SET
+    -K:SET     the letter K places to the left is in SET, see below
+    -K!SET     the letter K places to the left is not in SET, see below
+    +K=TEXT    the letters starting K places to the right spell TEXT
+    #I:SET     the letter at absolute index I (may be negative) is in SET
+    end        this is the last letter of the word
+    rest=N     exactly N letters follow this one
+    len=N      the word is exactly N letters long
+    len>N      the word is longer than N letters
+    word=TEXT  the whole word is TEXT
+    word!TEXT  the whole word is not TEXT
+
+SET is either a run of literal letters or one of the upper case class
+names below. Left context wraps around to the end of the word like the
+negative indexing the original if/elif cascade relied on (so 'x' at
+position 1 sees the last letter as -2), but stops matching instead of
+raising once it runs past the word altogether.
+
+The table is compiled into one small function per letter, with every SET
+turned into a frozenset constant, see compile_rules(). Accented letters
+get their own entries too, see accented_rules().
+
+Letters which go together, listed in GRAPHEMES ('eau', 'ain', 'tion',
+'ch'...), get one function for the lot: it gives what the functions of
+its letters give in turn, but as it knows those letters, every condition
+they settle is decided when it is compiled. breakdownWord splits a word
+into graphemes in one scan, the longest one first (see
+grapheme_splitter()), and the words of WORDS are looked up whole. Which
+graphemes are listed thus only changes the speed, never the phonemes.
+
+All this happens on first use, or ahead of it with load_rules(), which
+can also read the compiled functions back from a snapshot written by
+save_snapshot().
+"""
+import marshal
+import os
+import re
+import sys
+from threading import Lock
+from zlib import crc32
+
+from unicode_hammer import latin1_to_ascii
+
+
+# character classes usable by name in the conditions below
+CLASSES = {
+    'VOWELS': 'aeiou',
+    'CONSONANTS': 'bcdfgjklmnpqrstvwxz',
+    # consonants which, following a vowel and m or n, make the vowel nasal
+    'NASAL_CLOSERS': 'bcdfgjklpqrstvwxz',
+}
+
+
+RULES = {
+    'a': [
+        ('+1:i +2!l', 'EH0'),  # ai
+        ('+1:u', 'AO0'),  # au
+        ('', 'AE0'),
+    ],
+    'e': [
+        ('end len=2', 'EH0'),  # takes care of words like 'je'
+        ('prev:u end len=3 -2:q', 'EH0'),  # que
+        ('end len>2', ''),  # takes care of words like 'parle'
+        ('prev:l +1:s len=5 -2:l', ''),  # elles
+        ('+1=au', ''),
+        ('prev:o', ''),
+        ('#0:e +1:mn +2:mn word!ennemmi', 'AE0'),
+        ('prev!i rest=1 +1:mn | +1:mn +2:NASAL_CLOSERS', 'AE0'),
+        ('prev:f +1=mme', 'AE0'),
+        ('', 'EH0'),
+    ],
+    'i': [
+        ('prev:e +1:mn +2:CONSONANTS | prev:e rest=1', ''),
+        ('prev:ftvs #-1:n #-2:i', 'EH0'),
+        ('+1:m +2:bp', 'EH0'),
+        ('+1:n +2:cdfgjlqstv', 'EH0 NG'),
+        ('prev:a +1!l', 'EH0'),
+        ('prev:o rest=1 +1:n', 'EH0'),
+        ('prev:o +1:n +2:CONSONANTS', 'EH0'),
+        ('prev:o', 'AE0'),
+        ('', 'IH0'),
+    ],
+    'o': [
+        ('prev:m +1=nsieur', 'EH0'),  # monsieur
+        ('+1:y', 'W AE0'),
+        ('+1:i +2:mn', 'W EH0'),
+        ('+1:u +2:i', 'W'),  # stress vowel
+        ('+1:i', 'W'),
+        ('+1:u', 'UW0'),
+        ('+1:e', 'EH0'),
+        ('', 'AO0'),
+    ],
+    'u': [
+        ('prev:l +1=ndi', 'EH0'),  # lundi
+        ('prev:o +1:i', ''),
+        ('prev:bcdfhjklmnprstvwxz +1:i', 'W'),
+        ('rest=1 +1:mn | +1:mn +2:NASAL_CLOSERS', 'EH0'),
+        ('prev:a', 'AO0'),
+        ('prev:gq', ''),
+        ('prev:o', 'UW0'),
+        ('+1:a', 'AE0'),
+        ('+1:e', 'EH0'),
+        ('', 'UW0'),
+    ],
+    'y': [
+        ('#0:y', 'Y'),
+        ('prev:VOWELS +1:VOWELS', 'Y'),
+        ('+1:mn +2:NASAL_CLOSERS', 'EH0'),
+        ('', 'IH0'),
+    ],
+    'b': [
+        ('end', ''),  # silent at end of words
+        ('+1:st', 'P'),
+        ('', 'B'),
+    ],
+    'c': [
+        ("+1:'\N{RIGHT SINGLE QUOTATION MARK}", 'S'),  # c', elided ce
+        ('+1=qu', ''),
+        ('-2:p prev:e rest=1 +1:t', ''),  # takes care of words like 'respect'
+        ('prev:s +1:eiy', ''),
+        ('+1:e #-1:e', 'Z'),
+        ('+1:aou | +1:CONSONANTS', 'K'),
+        ('+1:eiy', 'S'),
+        ('', ''),
+    ],
+    'd': [
+        ('end', ''),  # silent at end of words
+        ('+1:-_', 'T'),
+        ('+1:st', ''),
+        ('', 'D'),
+    ],
+    'f': [
+        ('+1:-_', 'V'),
+        ('', 'F'),
+    ],
+    'g': [
+        ('end', ''),  # silent at end of words
+        ('prev:n', 'NG'),
+        ('+1:eiy', 'JH'),
+        ('+1:st', ''),
+        ('', 'G'),
+    ],
+    'h': [
+        ('prev:c +1:r', 'K'),
+        ('prev:c +1!r', 'SH'),
+        ('', ''),
+    ],
+    'l': [
+        ('-2:mvhk prev:i -3!a', 'L'),  # mil*, vil*
+        ('-3:mv -2:i prev:l -4!a', 'L'),  # mill* ,vill*
+        ('-3:q -2:u prev:i', 'L'),  # tranquil*
+        ('-3:u -2:i prev:l -4:q', 'L'),  # tranquill*
+        ('prev:i', 'Y'),
+        ('-2:i prev:l', 'Y'),  # il, ill,ille
+        ('', 'L'),
+    ],
+    'm': [
+        ('prev:a +1:n', ''),
+        ('#-1:m #-2:i #-3:a', 'NG'),
+        ('prev:VOWELS end | prev:VOWELS +1:NASAL_CLOSERS', 'NG'),
+        ('', 'M'),
+    ],
+    'n': [
+        ('prev:o +1=sieur', ''),
+        ('prev:VOWELS end | prev:VOWELS +1:NASAL_CLOSERS | prev:VOWELS +1:n', 'NG'),
+        ('', 'N'),
+    ],
+    'p': [
+        ('end', ''),  # silent at end of words
+        ('+1:-_', 'P'),
+        ('prev:m +1:t', ''),  # mpt
+        ('+1:h', 'F'),  # ph
+        ('', 'P'),
+    ],
+    'r': [
+        ('-2:e prev:u', 'R'),
+        ('end', ''),
+        ('', 'R'),
+    ],
+    's': [
+        # a final s is silent, except after 'ili', 'ela', 'tla' and 'fil'
+        ('end -3:i -2:l prev:i | end -3:et -2:l prev:a | end -3:f -2:i prev:l | word=lis', None),
+        ('end', ''),
+        ('+1=ch', ''),
+        ('prev:dt', ''),
+        ('prev:e rest=1 len=3 +1:t', ''),  # est
+        ('prev:VOWELS +1:VOWELS', 'Z'),
+        ('', 'S'),
+    ],
+    't': [
+        ('end prev!ic word!gadget | -2:a', ''),
+        ('+1:s', ''),
+        ('prev:dg', ''),
+        ('-3:p -2:e prev:c end', ''),
+        ('+1:-_', 'T'),
+        ('+1=ion | +1=ience', 'S'),  # takes care of words ending with 'ience'
+        ('', 'T'),
+    ],
+    'w': [
+        ('word=wagon', 'V'),  # wagon
+        ('', 'W'),
+    ],
+    'x': [
+        ('end', ''),  # silent at end of words
+        ('+1:-_', 'Z'),
+        ('+1:CONSONANTS | +1:y | -2:t prev!a', 'K S'),
+        ('+1:aehiou -2!t prev!a', 'Z'),
+        ('', 'K S'),
+    ],
+    'z': [
+        ('word=berlioz', 'Z'),
+        ('#-1:z len>1', ''),
+        ('', 'Z'),
+    ],
+    'j': [('', 'JH')],
+    'k': [('', 'K')],
+    'q': [('', 'K')],
+    'v': [('', 'V')],
+    '\N{LATIN SMALL LETTER C WITH CEDILLA}': [('', 'S')],
+    ' ': [('', '.')],
+}
+
+
+# letter sequences split off as one unit and compiled into one function,
+# which knows the letters inside it and so skips every rule they settle;
+# adding one only makes words holding it faster, never different
+GRAPHEMES = (
+    'eau', 'au', 'ai', 'ain', 'ei', 'ein', 'eu', 'oi', 'oin', 'ou', 'ui',
+    'an', 'en', 'in', 'on', 'un', 'am', 'em', 'im', 'om',
+    'ch', 'ph', 'gn', 'qu', 'gu', 'ill', 'ss', 'll', 'tt', 'nn', 'mm', 'rr', 'pp',
+    'tion', 'ience', 'es', 'er', 'ez', 'et', 'ent', 'le', 're', 'de', 'te', 'ne', 'se', 'ce', 'me',
+)
+
+# words the rules single out, worked out whole once instead of letter by letter
+WORDS = ('monsieur', 'lundi', 'wagon', 'berlioz', 'gadget', 'ennemmi', 'lis')
+
+
+_OFFSET_TERM = re.compile(r'^(prev|[+-]\d+|#-?\d+)([:!])(.+)$')
+_SEQUENCE_TERM = re.compile(r'^\+(\d+)=(.+)$')
+_LENGTH_TERM = re.compile(r'^(rest|len)([=>])(\d+)$')
+_WORD_TERM = re.compile(r'^word([=!])(.+)$')
+
+# right context offsets read into a local once per letter ('' past the end)
+# since nearly every rule looks at them
+_HOISTED = (1, 2)
+
+# part of the key of a snapshot, bump it when the generated code changes
+_SNAPSHOT_VERSION = 2
+
+
+def _membership(subject, negate, letters, constants, missing=False):
+    """source testing whether subject is (or is not) one of letters
+
+    With missing set, subject is '' when the letter does not exist, which
+    must not count as "not one of letters".
+    """
+    letters = CLASSES.get(letters, letters)
+    if len(letters) == 1 and not (negate and missing):
+        return '%s %s %r' % (subject, '!=' if negate else '==', letters)
+    letters = frozenset(letters)
+    if negate and missing:
+        letters |= {''}
+    name = '_set_%d' % len(constants)
+    constants[name] = letters
+    return '%s %s %s' % (subject, 'not in' if negate else 'in', name)
+
+
+def _known(letter, negate, letters):
+    """whether a letter known when compiling is (or is not) one of letters"""
+    return (letter in CLASSES.get(letters, letters)) != negate
+
+
+def _term_source(term, constants, grapheme, index):
+    """translate one condition term to a python expression
+
+    The term is one of the letter grapheme[index], for a grapheme found at
+    word[pos]. Terms which only look at letters of the grapheme are
+    settled here and come back as True or False.
+    """
+    size = len(grapheme)
+    if term == 'end':
+        if index < size - 1:
+            return False
+        return 'pos + %d == n' % (index + 1)
+    match = _OFFSET_TERM.match(term)
+    if match:
+        where, op, letters = match.groups()
+        negate = op == '!'
+        if where == 'prev':
+            if index:
+                return _known(grapheme[index - 1], negate, letters)
+            return _membership('previous', negate, letters, constants)
+        if where[0] == '#':
+            absolute = int(where[1:])
+            guard = 'n > %d' % absolute if absolute >= 0 else 'n >= %d' % -absolute
+            return '%s and %s' % (guard, _membership('word[%d]' % absolute, negate, letters, constants))
+        # from here on offsets count from the start of the grapheme
+        offset = index + int(where)
+        if 0 <= offset < size:
+            return _known(grapheme[offset], negate, letters)
+        if offset - size + 1 in _HOISTED:
+            return _membership('after%d' % offset, negate, letters, constants, missing=True)
+        if offset > 0:
+            return 'n > pos + %d and %s' % (
+                offset, _membership('word[pos + %d]' % offset, negate, letters, constants))
+        return 'n + pos >= %d and %s' % (
+            -offset, _membership('word[pos - %d]' % -offset, negate, letters, constants))
+    match = _SEQUENCE_TERM.match(term)
+    if match:
+        offset = index + int(match.group(1))
+        text = match.group(2)
+        inside = grapheme[offset:offset + len(text)]
+        if inside != text[:len(inside)]:
+            return False
+        if len(inside) == len(text):
+            return True
+        return 'word.startswith(%r, pos + %d)' % (text[len(inside):], offset + len(inside))
+    match = _LENGTH_TERM.match(term)
+    if match:
+        what, op, count = match.groups()
+        count = int(count)
+        if what == 'rest':
+            if count < size - 1 - index:
+                return False
+            return 'n == pos + %d' % (index + count + 1)
+        # the word holds at least the grapheme
+        if count < size:
+            return op == '>'
+        return 'n %s %d' % ('==' if op == '=' else '>', count)
+    match = _WORD_TERM.match(term)
+    if match:
+        return 'word %s %r' % ('==' if match.group(1) == '=' else '!=', match.group(2))
+    raise ValueError('unknown rule term %r' % term)
+
+
+def _condition_source(condition, constants, grapheme, index):
+    """python expression of a condition, or True or False when settled already"""
+    alternatives = []
+    for alternative in condition.split('|'):
+        terms = []
+        for term in alternative.split():
+            source = _term_source(term, constants, grapheme, index)
+            if source is False:
+                break
+            if source is not True:
+                terms.append(source)
+        else:
+            if not terms:
+                return True
+            alternatives.append(' and '.join(terms))
+    if not alternatives:
+        return False
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return ' or '.join('(%s)' % alternative for alternative in alternatives)
+
+
+def _branches(rules, constants, grapheme, index):
+    """[(rule number, source, phonemes, label)] of the rules of grapheme[index] which may apply
+
+    A rule whose phonemes are None is an exception to the rule right
+    after it: when it holds, that rule is skipped and the letter falls
+    through to the ones below. The source of the last branch is True.
+    """
+    branches = []
+    skip = False
+    for number, (condition, phonemes) in enumerate(rules):
+        if phonemes is None:
+            skip = _condition_source(condition, constants, grapheme, index)
+            continue
+        source = _condition_source(condition, constants, grapheme, index)
+        if skip is True:
+            source = False
+        elif skip is not False and source is not False:
+            source = 'not (%s)' % skip if source is True else 'not (%s) and (%s)' % (skip, source)
+        skip = False
+        if source is False:
+            continue
+        label = '%s -> %s' % (condition or '(always)', phonemes or '(silent)')
+        branches.append((number, source, tuple(phonemes.split()), label))
+        if source is True:
+            return branches
+    branches.append((len(rules), True, (), '(no rule) -> (silent)'))
+    return branches
+
+
+def _counter(indent, letter, number, label, instrument):
+    """lines counting a hit of rule number of letter in instrument (see rule_stats.RuleStats)"""
+    key = (letter, number)
+    rule = instrument.numbers.get(key)
+    if rule is None:
+        rule = instrument.numbers[key] = len(instrument.labels)
+        instrument.labels.append((letter, label))
+        instrument.hits.append(0)
+    return ['%s_hits[%d] += 1' % (indent, rule), '%s_last[0] = %d' % (indent, rule)]
+
+
+def _hoist(lines, size):
+    """read the letters right after a grapheme of size letters into locals, where used"""
+    body = '\n'.join(lines[1:])
+    for offset in reversed(_HOISTED):
+        local = 'after%d' % (size - 1 + offset)
+        if local in body:
+            lines.insert(1, "    %s = word[pos + %d] if n > pos + %d else ''"
+                         % (local, size - 1 + offset, size - 1 + offset))
+    return '\n'.join(lines)
+
+
+def _letter_source(letter, name, rules, constants, instrument=None):
+    """source of the function applying one letter's rules
+
+    With an instrument (see rule_stats.RuleStats) every rule also counts
+    its hits in instrument.hits and leaves its number in instrument.last.
+    """
+    lines = ['def %s(word, pos, n, previous):' % name]
+    for number, source, result, label in _branches(rules, constants, letter, 0):
+        indent = '    '
+        if source is not True:
+            lines.append('    if %s:' % source)
+            indent = '        '
+        if instrument is not None:
+            lines.extend(_counter(indent, letter, number, label, instrument))
+        lines.append('%sreturn %r' % (indent, result))
+    return _hoist(lines, 1)
+
+
+def _grapheme_source(grapheme, name, rules, constants, instrument=None):
+    """source of the function applying the rules of every letter of a grapheme in turn
+
+    It returns what the functions of its letters would return one after
+    the other, with whatever the letters of the grapheme settle worked
+    out here once and for all.
+    """
+    lines = ['def %s(word, pos, n, previous):' % name]
+    parts = []
+    for index, letter in enumerate(grapheme):
+        branches = _branches(rules[letter], constants, grapheme, index)
+        if len(branches) == 1:
+            number, _, result, label = branches[0]
+            if instrument is not None:
+                lines.extend(_counter('    ', letter, number, label, instrument))
+            parts.append(result)
+            continue
+        local = 'phonemes%d' % index
+        for position, (number, source, result, label) in enumerate(branches):
+            if source is True:
+                lines.append('    else:')
+            else:
+                lines.append('    %s %s:' % ('elif' if position else 'if', source))
+            if instrument is not None:
+                lines.extend(_counter('        ', letter, number, label, instrument))
+            lines.append('        %s = %r' % (local, result))
+        parts.append(local)
+    # neighbouring constant parts are joined here rather than on every call
+    terms = []
+    for part in parts:
+        if isinstance(part, tuple) and terms and isinstance(terms[-1], tuple):
+            terms[-1] += part
+        elif part != ():
+            terms.append(part)
+    lines.append('    return %s' % (' + '.join(repr(term) if isinstance(term, tuple) else term
+                                             for term in terms) or '()'))
+    return _hoist(lines, len(grapheme))
+
+
+def _compile_code(rules, graphemes, instrument=None):
+    """(code object, constants, {letter or grapheme: function name}) of a rule table"""
+    constants = {}
+    sources = []
+    names = {}
+    for index, (letter, letter_rules) in enumerate(sorted(rules.items())):
+        names[letter] = '_letter_%d' % index
+        sources.append(_letter_source(letter, names[letter], letter_rules, constants, instrument))
+    for index, grapheme in enumerate(graphemes):
+        if len(grapheme) < 2 or not all(letter in rules for letter in grapheme):
+            raise ValueError('%r is not a grapheme of letters with rules' % (grapheme,))
+        names[grapheme] = '_grapheme_%d' % index
+        sources.append(_grapheme_source(grapheme, names[grapheme], rules, constants, instrument))
+    source = '\n\n\n'.join(sources) + '\n'
+    return compile(source, '<phoneme_rules>', 'exec'), constants, names
+
+
+def _functions(code, constants, names, instrument=None):
+    namespace = dict(constants)
+    if instrument is not None:
+        namespace['_hits'] = instrument.hits
+        namespace['_last'] = instrument.last
+    exec(code, namespace)
+    return {letter: namespace[name] for letter, name in names.items()}
+
+
+def compile_rules(rules=None, instrument=None, graphemes=None):
+    """compile a rule table into {letter or grapheme: function(word, pos, n, previous)}
+
+    Each function returns the tuple of phonemes emitted for the letter (or
+    the letters of the grapheme) at word[pos], n being len(word).
+    graphemes defaults to GRAPHEMES for the default rules, to none for
+    others. instrument is for rule_stats only.
+    """
+    if graphemes is None:
+        graphemes = GRAPHEMES if rules is None else ()
+    if rules is None:
+        rules = RULES
+    code, constants, names = _compile_code(rules, graphemes, instrument)
+    return _functions(code, constants, names, instrument)
+
+
+def accented_rules(rules, instrument=None):
+    """{letter: function} for the accented Latin-1 letters missing from rules
+
+    Accented letters take no part in any context above; each one is simply
+    pronounced like the first phoneme of its unaccented letter on its own
+    (e acute like 'e', so EH0). Letters which do not fold to a single
+    letter, like the oe ligature, are left out and stay silent.
+    """
+    accented = {}
+    for code in range(0xe0, 0x100):
+        letter = chr(code)
+        plain = latin1_to_ascii(letter)
+        if letter in rules or len(plain) != 1 or plain not in rules:
+            continue
+        phonemes = rules[plain](plain, 0, 1, ' ')[:1]
+        if instrument is None:
+            accented[letter] = lambda word, pos, n, previous, phonemes=phonemes: phonemes
+            continue
+        rule = len(instrument.labels)
+        instrument.labels.append((letter, 'like %s -> %s' % (plain, ' '.join(phonemes) or '(silent)')))
+        instrument.hits.append(0)
+
+        def counted(word, pos, n, previous, phonemes=phonemes, rule=rule,
+                    hits=instrument.hits, last=instrument.last):
+            hits[rule] += 1
+            last[0] = rule
+            return phonemes
+        accented[letter] = counted
+    return accented
+
+
+def word_rules(rules, words=WORDS, instrument=None):
+    """{word: function} giving for each of words what the letter rules do
+
+    The phonemes are worked out here once, so the function only returns
+    them; with an instrument they are worked out on every call instead,
+    for the letter rules to count their hits.
+    """
+    functions = {}
+    for word in words:
+        def spelled(word, pos, n, previous, rules=rules):
+            phonemes = ()
+            previous = ' '
+            for position, letter in enumerate(word):
+                rule = rules.get(letter)
+                if rule is not None:
+                    phonemes += rule(word, position, n, previous)
+                previous = letter
+            return phonemes
+        if instrument is None:
+            phonemes = spelled(word, 0, len(word), ' ')
+            spelled = lambda word, pos, n, previous, phonemes=phonemes: phonemes  # noqa: E731
+        functions[word] = spelled
+    return functions
+
+
+def _trie_pattern(node):
+    """regular expression matching the longest path from node of a trie of dicts"""
+    branches = [re.escape(letter) + _trie_pattern(child) for letter, child in sorted(node.items()) if letter]
+    if not branches:
+        return ''
+    pattern = '|'.join(branches)
+    if '' in node:
+        return '(?:%s)?' % pattern
+    return pattern if len(branches) == 1 else '(?:%s)' % pattern
+
+
+def grapheme_splitter(graphemes=GRAPHEMES):
+    """function splitting a word into a list of graphemes and single characters
+
+    The graphemes go into a trie, and the trie into one regular expression
+    taking the longest grapheme at each place in a single scan of the word.
+    """
+    trie = {}
+    for grapheme in graphemes:
+        node = trie
+        for letter in grapheme:
+            node = node.setdefault(letter, {})
+        node[''] = {}
+    pattern = _trie_pattern(trie)
+    return re.compile(pattern + '|.' if pattern else '.', re.DOTALL).findall
+
+
+def _snapshot_key():
+    """what a snapshot was made from: the rules and the Python bytecode version"""
+    rules = repr((sorted(RULES.items()), sorted(CLASSES.items()), GRAPHEMES, _SNAPSHOT_VERSION))
+    return sys.implementation.cache_tag, crc32(rules.encode('utf-8'))
+
+
+def save_snapshot(path):
+    """write the compiled rules to path, for load_rules() to read back"""
+    code, constants, names = _compile_code(RULES, GRAPHEMES)
+    data = marshal.dumps((_snapshot_key(), code, constants, names))
+    with open(path + '.tmp', 'wb') as out:
+        out.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _read_snapshot(path):
+    """compiled rules from a snapshot, or None when it is missing or stale"""
+    try:
+        with open(path, 'rb') as source:
+            key, code, constants, names = marshal.loads(source.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if key != _snapshot_key():
+        return None
+    return _functions(code, constants, names)
+
+
+def load_rules(snapshot=None):
+    """fill letter_rules if still empty and return it
+
+    The rules are compiled on first use rather than at import. Given the
+    path of a file written by save_snapshot(), they are read from there
+    instead, unless it was made from other rules or another Python
+    version, in which case they are compiled as usual.
+    """
+    global split_graphemes
+    with _load_lock:
+        if not letter_rules:
+            rules = _read_snapshot(snapshot) if snapshot is not None else None
+            if rules is None:
+                rules = compile_rules()
+            rules.update(accented_rules(rules))
+            rules.update(word_rules(rules))
+            split_graphemes = grapheme_splitter()
+            letter_rules.update(rules)
+    return letter_rules
+
+
+# {letter, grapheme or word: function} and the function splitting words
+# into graphemes, both set by load_rules()
+letter_rules = {}
+split_graphemes = None
+_load_lock = Lock()
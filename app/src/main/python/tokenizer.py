@@ -0,0 +1,87 @@
+"""split French text into tokens for Phoneme.breakdownWord
+
+    >>> list(tokenize("L'arc-en-ciel, c'est beau."))
+    [Token(kind='elision', text="L'", start=0, end=2),
+     Token(kind='compound', text='arc-en-ciel', start=2, end=13),
+     Token(kind='punctuation', text=',', start=13, end=14),
+     Token(kind='elision', text="c'", start=15, end=17),
+     Token(kind='word', text='est', start=17, end=20),
+     Token(kind='word', text='beau', start=21, end=25),
+     Token(kind='punctuation', text='.', start=25, end=26)]
+
+start and end are character offsets into the whole text. Elided words
+(l', d', qu', jusqu'...) are tokens of their own, words with an apostrophe
+inside which are not elisions (aujourd'hui) are kept whole, and hyphenated
+compounds are single 'compound' tokens since the rules pronounce a letter
+before a hyphen differently (peut-etre).
+
+tokenize() also takes a file-like object or an iterable of strings and
+reads it lazily, so long texts go through in bounded memory.
+"""
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', 'kind text start end')
+
+WORD = 'word'
+COMPOUND = 'compound'
+ELISION = 'elision'
+NUMBER = 'number'
+PUNCTUATION = 'punctuation'
+
+# tokens which are pronounced, see Phoneme.iter_text()
+SPOKEN = frozenset((WORD, COMPOUND, ELISION))
+
+APOSTROPHES = "'\N{RIGHT SINGLE QUOTATION MARK}"
+HYPHENS = '-\N{HYPHEN}'
+
+# a letter, or an accent left decomposed (NFD)
+_LETTER = r'(?:[^\W\d_]|[\u0300-\u036f])'
+_TOKEN = re.compile(
+    r'(?P<word>{letter}+(?:[{joiners}]{letter}+)*)'
+    r'|(?P<number>\d+(?:[.,]\d+)*)'
+    r'|(?P<punctuation>[^\w\s]|_)'.format(letter=_LETTER, joiners=re.escape(APOSTROPHES + HYPHENS)))
+_ELISION = re.compile(r'(?:jusqu|lorsqu|puisqu|quoiqu|qu|[cdjlmnst])[{}]'.format(APOSTROPHES), re.IGNORECASE)
+_LAST_SPACE = re.compile(r'\s(?=\S*\Z)')
+
+
+def _tokens(text, offset):
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'word':
+            # peel off leading elisions: qu'il, l'arc-en-ciel
+            elision = _ELISION.match(text, start, end)
+            while elision is not None and elision.end() < end:
+                yield Token(ELISION, elision.group(), offset + start, offset + elision.end())
+                start = elision.end()
+                elision = _ELISION.match(text, start, end)
+            word = text[start:end]
+            kind = COMPOUND if any(hyphen in word for hyphen in HYPHENS) else WORD
+            yield Token(kind, word, offset + start, offset + end)
+        else:
+            yield Token(kind, match.group(), offset + start, offset + end)
+
+
+def tokenize(text, chunk_size=65536):
+    """yield the Tokens of a string, file-like object or iterable of strings"""
+    if isinstance(text, str):
+        yield from _tokens(text, 0)
+        return
+    if hasattr(text, 'read'):
+        chunks = iter(lambda: text.read(chunk_size), '')
+    else:
+        chunks = text
+    buffer = ''
+    offset = 0
+    for chunk in chunks:
+        buffer += chunk
+        # no token spans whitespace, so everything up to the last space is complete
+        space = _LAST_SPACE.search(buffer)
+        if space is None:
+            continue
+        cut = space.end()
+        yield from _tokens(buffer[:cut], offset)
+        buffer = buffer[cut:]
+        offset += cut
+    yield from _tokens(buffer, offset)
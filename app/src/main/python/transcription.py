@@ -0,0 +1,135 @@
+"""a transcribed text as parallel arrays, with spans pointing back into it
+
+    transcription = Transcription("L'arc-en-ciel, c'est beau.")
+    len(transcription)              # 7 tokens
+    span = transcription[1]         # Span('compound', 2, 13)
+    span.text                       # 'arc-en-ciel', sliced from the text when asked
+    span.phonemes                   # ['AE0', 'R', 'EH0', 'N', 'S', 'IH0', 'EH0', 'L']
+    span.codes                      # memoryview of its phoneme IDs, no copy
+    transcription.index_at(16)      # 3, the token holding character 16
+
+A Transcription keeps the text once and, for each token (see
+tokenizer.tokenize), its kind in one byte, its start and end offsets and
+where its phoneme IDs start (see phoneme_codes), each in one array for
+all the tokens; the phoneme IDs of every token follow each other in a
+single array('B'). That is some 13 bytes a token plus one a phoneme,
+where a Token, its text and a list of phoneme strings take over 300.
+
+A Span is made when a token is asked for and holds no copy of anything:
+the text it slices, its offsets, and a view on its phoneme IDs. Both
+classes use __slots__, so a Span costs no instance dictionary either.
+"""
+from array import array
+from bisect import bisect_right
+
+from Phoneme import breakdownWord
+from phoneme_codes import PHONEME_IDS, PHONEMES, VISEME_OF, VISEMES, CodedWords
+from tokenizer import COMPOUND, ELISION, NUMBER, PUNCTUATION, SPOKEN, WORD, Token, tokenize
+
+# the kind of a token is its index in KINDS
+KINDS = (WORD, COMPOUND, ELISION, NUMBER, PUNCTUATION)
+_KIND_IDS = {kind: index for index, kind in enumerate(KINDS)}
+
+
+class Span(object):
+    """one token of a Transcription: where it is in the text and its phoneme IDs"""
+
+    __slots__ = ('source', 'kind', 'start', 'end', 'codes')
+
+    def __init__(self, source, kind, start, end, codes):
+        self.source = source
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.codes = codes
+
+    def __repr__(self):
+        return 'Span(%r, %d, %d)' % (self.kind, self.start, self.end)
+
+    def __eq__(self, other):
+        if not isinstance(other, Span):
+            return NotImplemented
+        return ((self.kind, self.start, self.end, self.text, bytes(self.codes))
+                == (other.kind, other.start, other.end, other.text, bytes(other.codes)))
+
+    def __hash__(self):
+        return hash((self.kind, self.start, self.end))
+
+    @property
+    def text(self):
+        return self.source[self.start:self.end]
+
+    @property
+    def phonemes(self):
+        return [PHONEMES[code] for code in self.codes]
+
+    @property
+    def visemes(self):
+        return [VISEMES[VISEME_OF[code]] for code in self.codes]
+
+    def token(self):
+        """the tokenizer.Token of this span"""
+        return Token(self.kind, self.text, self.start, self.end)
+
+
+class Transcription(object):
+    """the tokens of a text and their phonemes, see the module docstring"""
+
+    __slots__ = ('source', 'kinds', 'starts', 'ends', 'offsets', 'codes', '_view')
+
+    def __init__(self, text):
+        self.source = text
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.offsets = array('I', [0])
+        self.codes = array('B')
+        # phoneme IDs of every distinct token text met, worked out once
+        known = {}
+        for token in tokenize(text):
+            self.kinds.append(_KIND_IDS[token.kind])
+            self.starts.append(token.start)
+            self.ends.append(token.end)
+            if token.kind in SPOKEN:
+                codes = known.get(token.text)
+                if codes is None:
+                    codes = known[token.text] = bytes(PHONEME_IDS[phoneme] for phoneme in breakdownWord(token.text))
+                self.codes.frombytes(codes)
+            self.offsets.append(len(self.codes))
+        # views keep codes from being resized, so there is one made once built
+        self._view = memoryview(self.codes)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError('token index out of range')
+        return Span(self.source, KINDS[self.kinds[index]], self.starts[index], self.ends[index],
+                    self._view[self.offsets[index]:self.offsets[index + 1]])
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self[index]
+
+    def index_at(self, offset):
+        """index of the token holding character offset of the text, or None"""
+        index = bisect_right(self.starts, offset) - 1
+        if index >= 0 and offset < self.ends[index]:
+            return index
+        return None
+
+    def coded(self):
+        """phoneme_codes.CodedWords of the phonemes of every token
+
+        It holds copies of the arrays: the spans' views keep codes from
+        being resized, while the copies can be appended to.
+        """
+        return CodedWords(self.codes[:], self.offsets[:])
+
+    def nbytes(self):
+        """memory taken by the arrays, the text left out"""
+        return sum(len(values) * values.itemsize
+                   for values in (self.kinds, self.starts, self.ends, self.offsets, self.codes))
@@ -46,6 +46,56 @@ Free Software Foundation GPL-compatible list: http://www.fsf.org/licenses/licens
 """
 
 
+import re
+import unicodedata
+
+_xlate = {0xc0: 'A', 0xc1: 'A', 0xc2: 'A', 0xc3: 'A', 0xc4: 'A', 0xc5: 'A',
+          0xc6: 'Ae', 0xc7: 'C',
+          0xc8: 'E', 0xc9: 'E', 0xca: 'E', 0xcb: 'E',
+          0xcc: 'I', 0xcd: 'I', 0xce: 'I', 0xcf: 'I',
+          0xd0: 'Th', 0xd1: 'N',
+          0xd2: 'O', 0xd3: 'O', 0xd4: 'O', 0xd5: 'O', 0xd6: 'O', 0xd8: 'O', 0x152: 'Oe',
+          0xd9: 'U', 0xda: 'U', 0xdb: 'U', 0xdc: 'U',
+          0xdd: 'Y', 0xde: 'th', 0xdf: 'ss',
+          0xe0: 'a', 0xe1: 'a', 0xe2: 'a', 0xe3: 'a', 0xe4: 'a', 0xe5: 'a',
+          0xe6: 'ae', 0xe7: 'c',
+          0xe8: 'e', 0xe9: 'e', 0xea: 'e', 0xeb: 'e',
+          0xec: 'i', 0xed: 'i', 0xee: 'i', 0xef: 'i',
+          0xf0: 'th', 0xf1: 'n',
+          0xf2: 'o', 0xf3: 'o', 0xf4: 'o', 0xf5: 'o', 0xf6: 'o', 0xf8: 'o', 0x153: 'oe',
+          0xf9: 'u', 0xfa: 'u', 0xfb: 'u', 0xfc: 'u',
+          0xfd: 'y', 0xfe: 'th', 0xff: 'y',
+          0xa1: '!', 0xa2: '{cent}', 0xa3: '{pound}', 0xa4: '{currency}',
+          0xa5: '{yen}', 0xa6: '|', 0xa7: '{section}', 0xa8: '{umlaut}',
+          0xa9: '{C}', 0xaa: '{^a}', 0xab: '<<', 0xac: '{not}',
+          0xad: '-', 0xae: '{R}', 0xaf: '_', 0xb0: '{degrees}',
+          0xb1: '{+/-}', 0xb2: '{^2}', 0xb3: '{^3}', 0xb4: "'",
+          0xb5: '{micro}', 0xb6: '{paragraph}', 0xb7: '*', 0xb8: '{cedilla}',
+          0xb9: '{^1}', 0xba: '{^o}', 0xbb: '>>',
+          0xbc: '{1/4}', 0xbd: '{1/2}', 0xbe: '{3/4}', 0xbf: '?',
+          0xd7: '*', 0xf7: '/'
+          }
+
+
+# code points below which a deleted character is remembered by the table
+_REMEMBERED = 0x3000
+
+
+# str.translate table for latin1_to_ascii: ASCII maps to itself, the
+# characters above are replaced and any other character is deleted; those
+# of the alphabetic scripts are remembered the first time they are seen,
+# so the table stays bounded whatever the text
+class _Latin1Table(dict):
+    def __missing__(self, code):
+        if code < _REMEMBERED:
+            self[code] = None
+        return None
+
+
+_latin1_table = _Latin1Table((code, code) for code in range(0x80))
+_latin1_table.update(_xlate)
+
+
 def latin1_to_ascii(unicrap):
     """This takes a UNICODE string and replaces Latin-1 characters with
         something equivalent in 7-bit ASCII. It returns a plain ASCII string.
@@ -56,42 +106,51 @@ def latin1_to_ascii(unicrap):
         to unaccented equivalents. Most symbol characters are converted to
         something meaningful. Anything not converted is deleted.
     """
-    xlate = {0xc0: 'A', 0xc1: 'A', 0xc2: 'A', 0xc3: 'A', 0xc4: 'A', 0xc5: 'A',
-             0xc6: 'Ae', 0xc7: 'C',
-             0xc8: 'E', 0xc9: 'E', 0xca: 'E', 0xcb: 'E',
-             0xcc: 'I', 0xcd: 'I', 0xce: 'I', 0xcf: 'I',
-             0xd0: 'Th', 0xd1: 'N',
-             0xd2: 'O', 0xd3: 'O', 0xd4: 'O', 0xd5: 'O', 0xd6: 'O', 0xd8: 'O', 0x152: 'Oe',
-             0xd9: 'U', 0xda: 'U', 0xdb: 'U', 0xdc: 'U',
-             0xdd: 'Y', 0xde: 'th', 0xdf: 'ss',
-             0xe0: 'a', 0xe1: 'a', 0xe2: 'a', 0xe3: 'a', 0xe4: 'a', 0xe5: 'a',
-             0xe6: 'ae', 0xe7: 'c',
-             0xe8: 'e', 0xe9: 'e', 0xea: 'e', 0xeb: 'e',
-             0xec: 'i', 0xed: 'i', 0xee: 'i', 0xef: 'i',
-             0xf0: 'th', 0xf1: 'n',
-             0xf2: 'o', 0xf3: 'o', 0xf4: 'o', 0xf5: 'o', 0xf6: 'o', 0xf8: 'o', 0x153: 'oe',
-             0xf9: 'u', 0xfa: 'u', 0xfb: 'u', 0xfc: 'u',
-             0xfd: 'y', 0xfe: 'th', 0xff: 'y',
-             0xa1: '!', 0xa2: '{cent}', 0xa3: '{pound}', 0xa4: '{currency}',
-             0xa5: '{yen}', 0xa6: '|', 0xa7: '{section}', 0xa8: '{umlaut}',
-             0xa9: '{C}', 0xaa: '{^a}', 0xab: '<<', 0xac: '{not}',
-             0xad: '-', 0xae: '{R}', 0xaf: '_', 0xb0: '{degrees}',
-             0xb1: '{+/-}', 0xb2: '{^2}', 0xb3: '{^3}', 0xb4: "'",
-             0xb5: '{micro}', 0xb6: '{paragraph}', 0xb7: '*', 0xb8: '{cedilla}',
-             0xb9: '{^1}', 0xba: '{^o}', 0xbb: '>>',
-             0xbc: '{1/4}', 0xbd: '{1/2}', 0xbe: '{3/4}', 0xbf: '?',
-             0xd7: '*', 0xf7: '/'
-             }
-
-    r = ''
-    for i in unicrap:
-        if ord(i) in xlate:
-            r += xlate[ord(i)]
-        elif ord(i) >= 0x80:
-            pass
-        else:
-            r += str(i)
-    return r
+    return unicrap.translate(_latin1_table)
+
+
+def _fold_table():
+    """str.translate table for fold_to_latin1, built from unicodedata"""
+    latin1_letters = {}
+    for code in range(0xe0, 0x100):
+        decomposition = unicodedata.decomposition(chr(code)).split()
+        if len(decomposition) == 2:
+            latin1_letters.setdefault(chr(int(decomposition[0], 16)), chr(code))
+    table = {}
+    for code in range(0x100, 0x180):
+        letter = chr(code)
+        decomposition = unicodedata.decomposition(letter).split()
+        if letter.islower() and len(decomposition) == 2 and not decomposition[0].startswith('<'):
+            base = chr(int(decomposition[0], 16))
+            table[code] = latin1_letters.get(base, base)
+    # combining accents left over once the text is composed
+    for code in range(0x300, 0x370):
+        table[code] = None
+    return table
+
+
+# built on the first text which is not plain ASCII
+_fold = None
+# str.isascii() is Python 3.7 and up
+_not_ascii = re.compile('[^\x00-\x7f]')
+# Latin-1 text is already composed and the fold table leaves it alone
+_not_latin1 = re.compile('[^\x00-\xff]')
+
+
+def fold_to_latin1(text):
+    """This takes lower case text and brings its accented letters back to
+        the Latin-1 ones. Decomposed accents (NFD) are composed first, and
+        a Latin Extended-A letter becomes the Latin-1 letter sharing its
+        base letter, or that bare base letter when there is none (e with
+        macron gives e with grave, s with caron gives s). Accents which do
+        not compose with their letter are dropped.
+    """
+    global _fold
+    if _not_latin1.search(text) is None:
+        return text
+    if _fold is None:
+        _fold = _fold_table()
+    return unicodedata.normalize('NFC', text).translate(_fold)
 
 
 if __name__ == '__main__':
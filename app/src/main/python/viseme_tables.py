@@ -0,0 +1,204 @@
+"""viseme sets besides Preston Blair, loaded from table files, converted to all at once
+
+    tables = load_tables(['preston_blair', 'reduced6', 'fleming_dobbs', 'studio.tsv'])
+    convertTargets('bonjour', tables)
+    # {'preston_blair': ['MBP', 'O', 'etc', 'etc', 'U'], 'reduced6': [...], ...}
+    encodeTargets(words, tables)    # {name: CodedWords}, all sharing one offsets array
+
+Phoneme.phoneme_conversion maps the CMU phonemes to the Preston Blair
+visemes. A table file maps them to another set of mouths, one viseme per
+line followed by a tab and the phonemes it stands for, separated by
+spaces. A vowel without its stress digit stands for all three stresses,
+and '*' for every phoneme no other line names:
+
+    # reduced6.tsv
+    MBP	B M P
+    AI	AA AE AH AY EH ER EY E21 IH IY
+    etc	*
+
+The tables shipped are in the visemes directory next to this module and
+are loaded by name; any other file by its path. A table compiles into a
+VisemeTable: its visemes and the viseme ID of every phoneme ID (see
+phoneme_codes) in a 256 byte index, like VISEME_OF for Preston Blair.
+Phonemes no line names and names which are not phonemes are all
+reported in one ValueError when the table is loaded, not as a KeyError
+in the middle of a batch.
+
+Converting to several tables breaks every word down once, into phoneme
+IDs, and each target is then one bytes.translate() of those IDs through
+its index (numpy.take() for a NumPy array), which costs next to nothing
+beside the breakdown.
+"""
+import os
+from array import array
+from collections import OrderedDict
+
+from Phoneme import phoneme_conversion
+from phoneme_codes import PHONEME_IDS, PHONEMES, CodedWords, encodeWords, phonemeCodes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TABLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'visemes')
+TABLE_SUFFIX = '.tsv'
+# the table of Phoneme.phoneme_conversion, which has no file
+PRESTON_BLAIR = 'preston_blair'
+# what load_tables() loads by default
+TARGETS = (PRESTON_BLAIR, 'reduced6', 'fleming_dobbs')
+# the right hand side standing for every phoneme not named elsewhere
+OTHERS = '*'
+
+_STRESSES = '012'
+_loaded = {}
+
+
+class VisemeTable(object):
+    """a set of visemes and the viseme ID of every phoneme ID
+
+    index is 256 bytes long, for bytes.translate(); byte i is the viseme
+    ID of phoneme ID i, that is its index in visemes.
+    """
+
+    def __init__(self, name, visemes, index):
+        self.name = name
+        self.visemes = visemes
+        self.index = index
+
+    def __repr__(self):
+        return 'VisemeTable(%r, %d visemes)' % (self.name, len(self.visemes))
+
+    def convert(self, codes):
+        """viseme IDs of phoneme IDs, as bytes"""
+        return bytes(codes).translate(self.index)
+
+    def decode(self, codes):
+        """the visemes of phoneme IDs"""
+        visemes = self.visemes
+        return [visemes[code] for code in bytes(codes).translate(self.index)]
+
+
+def _expand(name):
+    """the phonemes a name in a table file stands for, none if it is not a phoneme"""
+    if name in PHONEME_IDS:
+        return [name]
+    return [name + stress for stress in _STRESSES if name + stress in PHONEME_IDS]
+
+
+def read_table(path):
+    """{phoneme: viseme} of a table file, see the module docstring"""
+    mapping = {}
+    others = None
+    errors = []
+    with open(path, encoding='utf-8') as source:
+        for number, line in enumerate(source, 1):
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            viseme, _, names = line.partition('\t')
+            viseme = viseme.strip()
+            if not viseme or not names.split():
+                errors.append('%s:%d: expected a viseme, a tab and phonemes' % (path, number))
+                continue
+            for name in names.split():
+                if name == OTHERS:
+                    others = viseme
+                    continue
+                phonemes = _expand(name)
+                if not phonemes:
+                    errors.append('%s:%d: unknown phoneme %r' % (path, number, name))
+                for phoneme in phonemes:
+                    if phoneme in mapping and mapping[phoneme] != viseme:
+                        errors.append('%s:%d: %s is already %s' % (path, number, phoneme, mapping[phoneme]))
+                    mapping[phoneme] = viseme
+    if errors:
+        raise ValueError('\n'.join(errors))
+    if others is not None:
+        for phoneme in PHONEMES:
+            mapping.setdefault(phoneme, others)
+    return mapping
+
+
+def compile_table(name, mapping, source=None):
+    """VisemeTable of a {phoneme: viseme} mapping which has to cover every phoneme"""
+    source = source or name
+    unknown = sorted(set(mapping) - set(PHONEME_IDS))
+    missing = [phoneme for phoneme in PHONEMES if phoneme not in mapping]
+    errors = []
+    if unknown:
+        errors.append('%s: unknown phonemes %s' % (source, ' '.join(unknown)))
+    if missing:
+        errors.append('%s: no viseme for %s' % (source, ' '.join(missing)))
+    if errors:
+        raise ValueError('\n'.join(errors))
+    visemes = tuple(sorted(set(mapping.values())))
+    ids = {viseme: code for code, viseme in enumerate(visemes)}
+    index = bytes(ids[mapping[phoneme]] for phoneme in PHONEMES).ljust(256, b'\0')
+    return VisemeTable(name, visemes, index)
+
+
+def load_table(name):
+    """VisemeTable of a table shipped in TABLES_DIR, by name, or of a table file"""
+    table = _loaded.get(name)
+    if table is None:
+        if name == PRESTON_BLAIR:
+            table = compile_table(name, phoneme_conversion, 'Phoneme.phoneme_conversion')
+        else:
+            path = os.path.join(TABLES_DIR, name + TABLE_SUFFIX)
+            if not os.path.exists(path):
+                path = name
+            table = compile_table(os.path.splitext(os.path.basename(name))[0], read_table(path), path)
+        _loaded[name] = table
+    return table
+
+
+def load_tables(names=TARGETS):
+    """{name: VisemeTable} of table names or paths, in order"""
+    tables = OrderedDict()
+    for name in names:
+        table = name if isinstance(name, VisemeTable) else load_table(name)
+        tables[table.name] = table
+    return tables
+
+
+def _tables(tables):
+    if tables is None:
+        return load_tables()
+    if isinstance(tables, dict):
+        return tables
+    return load_tables(tables)
+
+
+def targetCodes(codes, tables=None):
+    """{name: viseme IDs} of phoneme IDs for every table
+
+    codes is an array('B'), bytes, bytearray or NumPy array and each target
+    comes back as the same kind of container.
+    """
+    tables = _tables(tables)
+    if numpy is not None and isinstance(codes, numpy.ndarray):
+        return OrderedDict((name, numpy.take(numpy.frombuffer(table.index, dtype=numpy.uint8), codes))
+                           for name, table in tables.items())
+    codes_bytes = bytes(codes)
+    targets = OrderedDict((name, codes_bytes.translate(table.index)) for name, table in tables.items())
+    if isinstance(codes, array):
+        return OrderedDict((name, array('B', target)) for name, target in targets.items())
+    if isinstance(codes, bytearray):
+        return OrderedDict((name, bytearray(target)) for name, target in targets.items())
+    return targets
+
+
+def convertTargets(word, tables=None):
+    """{name: visemes of word} for every table, word broken down once"""
+    tables = _tables(tables)
+    return OrderedDict((name, [tables[name].visemes[code] for code in target])
+                       for name, target in targetCodes(phonemeCodes(word), tables).items())
+
+
+def encodeTargets(words, tables=None):
+    """{name: CodedWords of the visemes of words} for every table, sharing the offsets"""
+    tables = _tables(tables)
+    batch = words if isinstance(words, CodedWords) else encodeWords(words)
+    return OrderedDict((name, CodedWords(target, batch.offsets, tables[name].visemes))
+                       for name, target in targetCodes(batch.codes, tables).items())
@@ -0,0 +1,65 @@
+"""accent folding benchmark: latin1_to_ascii and breakdownWord on accent-heavy text
+
+Compares the table based folding against the original per-character
+latin1_to_ascii loop (copied below), and breakdownWord against the
+recursive fallback of phoneme_reference.breakdownWord, which ran once for
+every accented letter.
+
+    python benchmarks/bench_accents.py
+"""
+import os
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import Phoneme  # noqa: E402
+import phoneme_reference  # noqa: E402
+from unicode_hammer import _xlate, fold_to_latin1, latin1_to_ascii  # noqa: E402
+
+WORDS = ('élève', 'château', 'forêt', 'noël', 'naïf', 'garçon', 'été',
+         'père', 'cœur', 'où', 'hôpital', 'fenêtre', 'répété',
+         'événement', 'déjà', 'bête', 'préféré', 'crème', 'gîte',
+         'maïs')
+TEXT = ' '.join(WORDS * 50)
+
+
+def latin1_to_ascii_loop(unicrap):
+    """the original latin1_to_ascii, as a baseline"""
+    r = ''
+    for i in unicrap:
+        if ord(i) in _xlate:
+            r += _xlate[ord(i)]
+        elif ord(i) >= 0x80:
+            pass
+        else:
+            r += str(i)
+    return r
+
+
+def best(function, number):
+    """best time of a few runs, in seconds per call"""
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+
+def main():
+    decomposed = [unicodedata.normalize('NFD', word) for word in WORDS]
+    rows = [
+        ('latin1_to_ascii, %d chars' % len(TEXT),
+         best(lambda: latin1_to_ascii_loop(TEXT), 20), best(lambda: latin1_to_ascii(TEXT), 20)),
+        ('breakdownWord, %d words' % len(WORDS),
+         best(lambda: [phoneme_reference.breakdownWord(word) for word in WORDS], 200),
+         best(lambda: [Phoneme.breakdownWord(word) for word in WORDS], 200)),
+        ('fold_to_latin1, %d NFD words' % len(WORDS), None,
+         best(lambda: [fold_to_latin1(word) for word in decomposed], 2000)),
+    ]
+    for name, before, after in rows:
+        if before is None:
+            print('%-32s %10s  %10.2fus' % (name, '', after * 1e6))
+        else:
+            print('%-32s %10.2fus  %10.2fus  x%.1f' % (name, before * 1e6, after * 1e6, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""phoneme_align on synthetic recordings: timing error against the true times, speed and memory
+
+    python benchmarks/bench_align.py
+    python benchmarks/bench_align.py --seconds 3600
+
+The recording is made up from corpus text: every viseme of every word
+gets a random length and a sound of its kind (a buzz with harmonics for
+the voiced ones, noise for FV, a burst for etc, a faint hum for MBP) and
+some words are followed by a pause, so the true start of every word and
+viseme is known. It is written to a 16 kHz WAV file a chunk at a time,
+--seconds long, then aligned; the errors of the aligned starts are
+compared with those of lipsync's evenly spread timing. The exit status
+is 1 if the median word start error of the alignment is above
+--tolerance seconds.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+from corpus import corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import numpy  # noqa: E402
+
+import phoneme_align  # noqa: E402
+from lipsync import iter_timed_words  # noqa: E402
+from Phoneme import iter_text  # noqa: E402
+from tokenizer import SPOKEN  # noqa: E402
+
+RATE = 16000
+VOICED = frozenset(('AI', 'E', 'O', 'U', 'WQ', 'L'))
+
+
+def sound(viseme, samples, rnd):
+    """samples of a viseme, as int16 values"""
+    time_ = numpy.arange(samples) / RATE
+    if viseme in VOICED:
+        pitch = rnd.uniform(100, 220)
+        wave_ = sum(numpy.sin(2 * numpy.pi * pitch * harmonic * time_) / harmonic for harmonic in range(1, 6))
+        signal = 0.25 * wave_ + 0.003 * numpy.random.randn(samples)
+    elif viseme == 'FV':
+        signal = 0.08 * numpy.random.randn(samples)
+    elif viseme == 'etc':
+        signal = 0.002 * numpy.random.randn(samples)
+        signal[samples // 2:] += 0.1 * numpy.random.randn(samples - samples // 2)
+    elif viseme == 'MBP':
+        signal = 0.02 * numpy.sin(2 * numpy.pi * 120 * time_) + 0.002 * numpy.random.randn(samples)
+    else:
+        signal = 0.002 * numpy.random.randn(samples)
+    return (signal * 32767).astype(numpy.int16)
+
+
+def make_recording(path, words, seconds, seed=1):
+    """write a WAV file of (word, visemes), at most seconds long, returning (word, visemes, viseme starts)"""
+    rnd = random.Random(seed)
+    numpy.random.seed(seed)
+    truth = []
+    clock = 0
+    limit = int(seconds * RATE)
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        chunk = [sound('rest', int(0.3 * RATE), rnd)]
+        clock = len(chunk[0])
+        for word, visemes in words:
+            lengths = [int(rnd.uniform(0.05, 0.14) * RATE) for _ in visemes]
+            if clock + sum(lengths) > limit:
+                break
+            starts = []
+            for viseme, length in zip(visemes, lengths):
+                starts.append(clock / RATE)
+                chunk.append(sound(viseme, length, rnd))
+                clock += length
+            truth.append((word, visemes, starts))
+            if rnd.random() < 0.2:
+                pause = sound('rest', int(rnd.uniform(0.1, 0.5) * RATE), rnd)
+                chunk.append(pause)
+                clock += len(pause)
+            if len(chunk) > 1000:
+                out.writeframes(numpy.concatenate(chunk).tobytes())
+                chunk = []
+        chunk.append(sound('rest', int(0.3 * RATE), rnd))
+        out.writeframes(numpy.concatenate(chunk).tobytes())
+    return truth
+
+
+def errors(truth, timed):
+    """absolute errors of the word starts and of the viseme starts"""
+    words = numpy.array([abs(starts[0] - word.start) for (_, _, starts), word in zip(truth, timed)])
+    visemes = numpy.array([abs(expected - found) for (_, _, starts), word in zip(truth, timed)
+                           for expected, found in zip(starts, word.starts or
+                                                      numpy.linspace(word.start, word.end, len(starts) + 1))])
+    return words, visemes
+
+
+def report(name, truth, timed):
+    words, visemes = errors(truth, timed)
+    print('%-8s word starts: median %5.0f ms, %5.1f%% within 50 ms; viseme starts: median %5.0f ms, %5.1f%% within 50 ms'
+          % (name, numpy.median(words) * 1e3, (words <= 0.05).mean() * 100,
+             numpy.median(visemes) * 1e3, (visemes <= 0.05).mean() * 100))
+    return numpy.median(words)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=120)
+    parser.add_argument('--beam', type=int, default=phoneme_align.BEAM)
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with open(corpus_path('1m'), encoding='utf-8') as source:
+        words = [(token.text, visemes) for token, visemes in iter_text(source, convert=True)
+                 if token.kind in SPOKEN and visemes]
+        words = words[:int(args.seconds * 4)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'speech.wav')
+        truth = make_recording(path, words, args.seconds, args.seed)
+        text = ' '.join(word for word, _, _ in truth)
+        with wave.open(path) as source:
+            duration = source.getnframes() / source.getframerate()
+        print('%d words, %.0f s of audio, %.1f MB' % (len(truth), duration, os.path.getsize(path) / 1e6))
+        started = time.perf_counter()
+        features = phoneme_align.read_features(path)
+        read = time.perf_counter() - started
+        timed = phoneme_align.align(text, features, args.beam)
+        seconds = time.perf_counter() - started
+        # again for the memory, tracemalloc slowing it down
+        tracemalloc.start()
+        phoneme_align.align(text, phoneme_align.read_features(path), args.beam)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print('aligned in %.2fs (features %.2fs), %.2f s a minute of audio, peak %.1f MB'
+          % (seconds, read, seconds / duration * 60, peak / 1e6))
+    report('even', truth, list(iter_timed_words(text)))
+    median = report('aligned', truth, timed)
+    return 1 if median > args.tolerance else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""NumPy batch path against breakdownWord: same phonemes, and from what batch size it is faster
+
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --corpus 1m --sizes 100 1000 10000 100000 1000000
+
+First every word of the corpus, plus generated words (accents, elisions,
+hyphens, letters outside Latin-1, long words), is broken down
+both ways and any difference is printed; the exit status is 1 if there is
+one. Then batches of each size, taken from the corpus, are timed both
+ways and the smallest size at which the batch path wins is reported.
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+from corpus import SIZES, load_corpus
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import phoneme_batch  # noqa: E402
+from phoneme_batch import breakdownBatch  # noqa: E402
+from phoneme_codes import encodeWords  # noqa: E402
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz' * 4 + "\xe9\xe8\xe0\xe7\xf4\xeeœ’'-_ \x85日"
+
+
+def generated_words(count, seed=1):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice(LETTERS) for _ in range(rnd.randint(0, 40)))
+            for _ in range(count)]
+
+
+def check(words):
+    """number of words whose phonemes differ, printing the first few"""
+    differences = 0
+    for word, batch, scalar in zip(words, breakdownBatch(words, min_batch=0), encodeWords(words)):
+        if batch != scalar:
+            differences += 1
+            if differences <= 10:
+                print('differs: %r batch %s breakdownWord %s' % (word, batch, scalar))
+    return differences
+
+
+def best(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--corpus', choices=sorted(SIZES), default='100k')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 300, 1000, 3000, 10000, 100000])
+    args = parser.parse_args(argv)
+    if phoneme_batch.numpy is None:
+        print('NumPy is not installed')
+        return 1
+    corpus = load_corpus(args.corpus)
+    words = corpus + generated_words(len(corpus))
+    differences = check(words)
+    print('%d words checked, %d differ' % (len(words), differences))
+
+    break_even = None
+    print('%8s %12s %12s %8s' % ('words', 'scalar', 'batch', 'speedup'))
+    for size in args.sizes:
+        batch = corpus[:size]
+        number = max(1, 10000 // size)
+        scalar = best(lambda: encodeWords(batch), number)
+        vector = best(lambda: breakdownBatch(batch, min_batch=0), number)
+        print('%8d %10.2fms %10.2fms %7.1fx' % (len(batch), scalar * 1e3, vector * 1e3, scalar / vector))
+        if break_even is None and vector < scalar:
+            break_even = len(batch)
+    if break_even is None:
+        print('batch path slower at every size tried')
+    else:
+        print('batch path faster from %d words' % break_even)
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""phoneme column files against JSON lines: size, write and reopen times, and the same tokens back
+
+    python benchmarks/bench_columns.py
+    python benchmarks/bench_columns.py --corpus 1m --copies 10
+
+The corpus text, --copies times over, is written to a column file by
+phoneme_columns and to JSON lines of [kind, text, start, end, phonemes]
+per token. Both are read back: the column file is reopened (only mapped),
+then a random token is looked up and a histogram of every phoneme taken,
+which the JSON lines need a full parse for. The tokens and phonemes of
+the column file are checked against Phoneme.iter_text on the text; the
+exit status is 1 if one differs.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from corpus import SIZES, corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import phoneme_columns  # noqa: E402
+from Phoneme import iter_text  # noqa: E402
+from tokenizer import tokenize  # noqa: E402
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def lines(path, copies):
+    """the lines of path, copies times over"""
+    for _ in range(copies):
+        with open(path, encoding='utf-8') as source:
+            yield from source
+
+
+def write_jsonl(path, pairs):
+    with open(path, 'w', encoding='utf-8', newline='\n') as out:
+        for token, phonemes in pairs:
+            out.write(json.dumps([token.kind, token.text, token.start, token.end, phonemes], ensure_ascii=False))
+            out.write('\n')
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as source:
+        return [json.loads(line) for line in source]
+
+
+def histogram(reader):
+    """count of every phoneme name in a column file"""
+    if numpy is not None:
+        counts = numpy.bincount(numpy.frombuffer(reader.phoneme_codes, numpy.uint8),
+                                minlength=len(reader.phoneme_names))
+    else:
+        counts = Counter(reader.phoneme_codes)
+        counts = [counts[code] for code in range(len(reader.phoneme_names))]
+    return {name: int(count) for name, count in zip(reader.phoneme_names, counts) if count}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--corpus', choices=sorted(SIZES, key=SIZES.get), default='100k')
+    parser.add_argument('--copies', type=int, default=1)
+    parser.add_argument('--no-jsonl', action='store_true', help='leave the JSON lines out')
+    args = parser.parse_args(argv)
+
+    source = corpus_path(args.corpus)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'corpus.phc')
+        count, seconds = timed(phoneme_columns.write_columns, path, tokenize(lines(source, args.copies)))
+        print('columns  %9d tokens written in %6.2fs, %7.1f MB' % (count, seconds, os.path.getsize(path) / 1e6))
+        reader, seconds = timed(phoneme_columns.ColumnReader, path)
+        print('columns  reopened in %.3f ms' % (seconds * 1e3))
+        _, seconds = timed(reader.__getitem__, count // 2)
+        print('columns  token %d looked up in %.3f ms' % (count // 2, seconds * 1e3))
+        counts, seconds = timed(histogram, reader)
+        print('columns  phoneme histogram in %.3f s' % seconds)
+
+        failed = 0
+        for index, (expected, found) in enumerate(zip(iter_text(lines(source, args.copies)), reader.iter_text())):
+            if expected != found:
+                failed += 1
+                if failed <= 5:
+                    print('token %d: %r, expected %r' % (index, found, expected))
+        if failed or len(reader) != count:
+            print('%d tokens differ from iter_text' % failed)
+        visemes = list(itertools.islice(reader.iter_text(convert=True), 1000))
+        if visemes != list(itertools.islice(iter_text(lines(source, args.copies), convert=True), 1000)):
+            failed += 1
+            print('visemes differ from iter_text')
+        reader.close()
+
+        if not args.no_jsonl:
+            path = os.path.join(directory, 'corpus.jsonl')
+            _, seconds = timed(write_jsonl, path, iter_text(lines(source, args.copies)))
+            print('jsonl    %9d tokens written in %6.2fs, %7.1f MB' % (count, seconds, os.path.getsize(path) / 1e6))
+            rows, seconds = timed(read_jsonl, path)
+            print('jsonl    read back in %.2fs' % seconds)
+            started = time.perf_counter()
+            jsonl_counts = Counter(phoneme for row in rows for phoneme in row[4])
+            print('jsonl    phoneme histogram in %.3f s' % (time.perf_counter() - started))
+            if jsonl_counts != Counter(counts):
+                failed += 1
+                print('the phoneme histograms differ')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""transcribe with and without --dedup: time, dedup ratio and identical output
+
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --corpus 1m --jobs 4 --vocabulary-cap 200
+
+The corpus is transcribed by transcribe.transcribe (a cache in every
+worker, a line formatted for every token) and by transcribe_dedup (each
+distinct word transcribed and formatted once), in both formats; the
+outputs have to be the same, the exit status is 1 if they are not.
+A small --vocabulary-cap makes the planner spill many times over, until
+it gives up on dedup and transcribes the rest as it comes.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from corpus import SIZES, corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import transcribe  # noqa: E402
+from phoneme_dedup import VOCABULARY_CAP  # noqa: E402
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--corpus', choices=sorted(SIZES, key=SIZES.get), default='1m')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--vocabulary-cap', type=int, default=VOCABULARY_CAP)
+    args = parser.parse_args(argv)
+
+    inputs = [corpus_path(args.corpus)]
+    failed = 0
+    for output_format in transcribe.FORMATS:
+        plain = io.StringIO()
+        count, plain_seconds = timed(transcribe.transcribe, inputs, plain, output_format, args.jobs)
+        deduplicated = io.StringIO()
+        stats, seconds = timed(transcribe.transcribe_dedup, inputs, deduplicated, output_format, args.jobs,
+                               5000, args.vocabulary_cap)
+        print('%-5s %d words: %.2fs, with --dedup %.2fs (%.1fx); %d distinct, %.1f tokens each, '
+              '%d spills%s, transcribed in %.2fs, about %.2fs saved'
+              % (output_format, count, plain_seconds, seconds, plain_seconds / seconds, stats['words'],
+                 stats['dedup'], stats['spills'], ' (then direct)' if stats['direct'] else '',
+                 stats['seconds'], stats['saved_seconds']))
+        if plain.getvalue() != deduplicated.getvalue() or stats['tokens'] != count:
+            failed += 1
+            print('%s output differs' % output_format)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
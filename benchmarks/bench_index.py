@@ -0,0 +1,116 @@
+"""PhonemeIndex over a large vocabulary: build, save and load times, query latency and answers
+
+    python benchmarks/bench_index.py
+    python benchmarks/bench_index.py --words 300000 --queries 200
+
+The vocabulary is the words of the corpus lists (see corpus.py) followed
+by made up French-looking words strung from SYLLABLES, up to --words in
+all. Every query kind is timed on --queries words of it, and its answers
+are checked against a scan of every word, then --removals words are
+taken out again; the exit status is 1 if an answer differs or a removed
+word is left in the index.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from corpus import load_words
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import phoneme_index  # noqa: E402
+from phoneme_codes import PHONEME_IDS, encodeWords  # noqa: E402
+
+SYLLABLES = ('ba', 'bon', 'cha', 'che', 'ci', 'dou', 'dé', 'fa', 'fin', 'gau', 'geon', 'jour', 'la', 'lè',
+             'lin', 'ma', 'mon', 'né', 'noi', 'pa', 'peu', 'pi', 'quin', 'ra', 'ré', 'rou', 'sa', 'son',
+             'ta', 'teau', 'ti', 'tion', 'train', 'vé', 'vi', 'vou', 'zo', 'ille', 'esse', 'ette', 'eur')
+
+
+def vocabulary(size, seed=1):
+    """size distinct words: the corpus lists, then generated ones"""
+    words = dict.fromkeys(load_words('frequent') + load_words('rare') + load_words('accented'))
+    rnd = random.Random(seed)
+    while len(words) < size:
+        words[''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, 4)))] = None
+    return list(words)[:size]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--words', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--removals', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    words = vocabulary(args.words, args.seed)
+    index, seconds = timed(phoneme_index.PhonemeIndex, words)
+    print('%d words indexed in %.2fs, %d postings' % (len(index), seconds, len(index.postings)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'words.phx')
+        _, seconds = timed(index.save, path)
+        print('saved in %.2fs, %.1f MB' % (seconds, os.path.getsize(path) / 1e6))
+        loaded, seconds = timed(phoneme_index.load, path)
+        print('loaded in %.2fs' % seconds)
+
+    # the answers a scan of every word gives
+    batch = encodeWords(words)
+    codes = {word: bytes(batch.word_codes(number)) for number, word in enumerate(words)}
+    sample = random.Random(args.seed).sample(words, min(args.queries, len(words)))
+    failed = 0
+    queries = {
+        'homophones': (lambda word: loaded.homophones(word),
+                       lambda word: [other for other in words if codes[other] == codes[word]]),
+        'starting_with': (lambda word: loaded.starting_with(loaded.phonemes(word)[:2]),
+                          lambda word: [other for other in words if codes[other].startswith(codes[word][:2])]),
+        'rhymes': (lambda word: loaded.rhymes(word),
+                   lambda word: [other for other in words if other != word
+                                 and codes[other].endswith(codes[word][-_rhyme(codes[word]):])]),
+        'containing': (lambda word: loaded.containing(loaded.phonemes(word)[1:5]),
+                       lambda word: [other for other in words if codes[word][1:5] in codes[other]]),
+    }
+    for name, (query, scan) in queries.items():
+        spent = 0.0
+        found = 0
+        for word in sample:
+            result, seconds = timed(query, word)
+            spent += seconds
+            found += len(result)
+            if sorted(result) != sorted(scan(word)):
+                failed += 1
+                print('%s(%r) differs from a scan' % (name, word))
+        print('%-14s %8.3f ms a query, %6.1f words found' % (name, spent / len(sample) * 1e3, found / len(sample)))
+
+    removed = random.Random(args.seed + 1).sample(words, min(args.removals, len(words)))
+    _, seconds = timed(index.remove, removed)
+    print('%d words removed, %.3f ms a word' % (len(removed), seconds / len(removed) * 1e3))
+    if any(word in index for word in removed) or any(index.words[number] is None
+                                                     for posting in index.postings.values() for number in posting):
+        failed += 1
+        print('removed words are still indexed')
+    return 1 if failed else 0
+
+
+_VOWELS = frozenset(code for phoneme, code in PHONEME_IDS.items() if phoneme[-1].isdigit())
+
+
+def _rhyme(codes):
+    """length of the end of codes from its last vowel, all of it without one"""
+    for position in range(len(codes) - 1, -1, -1):
+        if codes[position] in _VOWELS:
+            return len(codes) - position
+    return len(codes)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""SimilarityIndex over a large vocabulary: build, save and load times, query latency and answers
+
+    python benchmarks/bench_similarity.py
+    python benchmarks/bench_similarity.py --words 300000 --jobs 4 --queries 50
+
+The vocabulary is the one of bench_index.py. Queries are words of it with
+one letter changed, looked up with nearest() and within(); their answers
+are checked against the distances from the query to every pronunciation,
+and the exit status is 1 if one differs.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bench_index import timed, vocabulary
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import phoneme_similarity  # noqa: E402
+from phoneme_similarity import distance  # noqa: E402
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz\xe9\xe8'
+
+
+def misspelled(word, rnd):
+    position = rnd.randrange(len(word))
+    return word[:position] + rnd.choice(LETTERS) + word[position + 1:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--words', type=int, default=300000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queries', type=int, default=30)
+    parser.add_argument('--count', type=int, default=10, help='words nearest() asks for')
+    parser.add_argument('--radius', type=int, default=2, help='distance within() asks for')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    words = vocabulary(args.words, args.seed)
+    index, seconds = timed(phoneme_similarity.SimilarityIndex, words, args.jobs)
+    print('%d words, %d pronunciations indexed in %.2fs with %d jobs'
+          % (len(index), len(index.keys), seconds, args.jobs))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'words.phs')
+        _, seconds = timed(index.save, path)
+        print('saved in %.2fs, %.1f MB' % (seconds, os.path.getsize(path) / 1e6))
+        index, seconds = timed(phoneme_similarity.load, path)
+        print('loaded in %.2fs' % seconds)
+
+    rnd = random.Random(args.seed)
+    queries = [misspelled(word, rnd) for word in rnd.sample(words, args.queries)]
+    failed = 0
+    spent = {'nearest': 0.0, 'within': 0.0}
+    for query in queries:
+        codes = phoneme_similarity._codes(query)
+        # every word at its distance, the slow way
+        scan = sorted((distance(codes, key), word) for node, key in enumerate(index.keys)
+                      for word in index.words[index.first_word[node]:index.first_word[node + 1]])
+        nearest, seconds = timed(index.nearest, query, args.count)
+        spent['nearest'] += seconds
+        if [found for found, _ in nearest] != [found for found, _ in scan[:args.count]]:
+            failed += 1
+            print('nearest(%r) differs from a scan' % query)
+        within, seconds = timed(index.within, query, args.radius)
+        spent['within'] += seconds
+        if sorted(within) != [pair for pair in scan if pair[0] <= args.radius]:
+            failed += 1
+            print('within(%r) differs from a scan' % query)
+    for name, seconds in spent.items():
+        print('%-8s %8.2f ms a query' % (name, seconds / len(queries) * 1e3))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
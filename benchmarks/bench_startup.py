@@ -0,0 +1,90 @@
+"""import time and first call latency of Phoneme, each measured in a fresh interpreter
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 20 -o startup.json
+
+Three ways of starting are compared:
+
+    cold       import Phoneme, then the first breakdownWord call does the setup
+    warmup     import Phoneme, Phoneme.warmup(), then the first call
+    snapshot   like warmup, reading the rules from a phoneme_rules snapshot
+
+Each run reports the import, the warmup (none when cold), the first call
+and a second call, in milliseconds; the medians over --repeat runs are
+printed and optionally written as JSON. Modules are imported from byte
+code compiled beforehand, as they are on a device.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python')
+
+MODES = ('cold', 'warmup', 'snapshot')
+PHASES = ('import', 'warmup', 'first_call', 'second_call')
+
+_PROBE = '''
+import json, sys, time
+clock = time.perf_counter
+started = clock()
+import Phoneme
+imported = clock()
+if sys.argv[1] != 'cold':
+    Phoneme.warmup(sys.argv[2] if sys.argv[1] == 'snapshot' else None)
+warm = clock()
+Phoneme.breakdownWord('fen\\xeatre')
+first = clock()
+Phoneme.breakdownWord('maison')
+second = clock()
+print(json.dumps({'import': imported - started, 'warmup': warm - imported,
+                  'first_call': first - warm, 'second_call': second - first}))
+'''
+
+
+def probe(mode, snapshot, pycache):
+    """timings of one fresh interpreter started in mode, in milliseconds"""
+    env = dict(os.environ, PYTHONPATH=PYTHON_DIR, PYTHONPYCACHEPREFIX=pycache)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    output = subprocess.check_output([sys.executable, '-c', _PROBE, mode, snapshot], env=env, cwd=PYTHON_DIR)
+    return {phase: seconds * 1000 for phase, seconds in json.loads(output).items()}
+
+
+def run(repeat):
+    sys.path.insert(0, PYTHON_DIR)
+    import phoneme_rules
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = os.path.join(directory, 'rules.snapshot')
+        phoneme_rules.save_snapshot(snapshot)
+        # byte code goes to a cache of its own, written by a first run left out
+        pycache = os.path.join(directory, 'pycache')
+        probe('cold', snapshot, pycache)
+        for mode in MODES:
+            runs = [probe(mode, snapshot, pycache) for _ in range(repeat)]
+            report[mode] = {phase: statistics.median(timings[phase] for timings in runs) for phase in PHASES}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('-o', '--output', help='JSON file to write the medians to')
+    args = parser.parse_args(argv)
+    report = run(args.repeat)
+    print('%-9s %s' % ('mode', ' '.join('%11s' % phase for phase in PHASES)))
+    for mode in MODES:
+        print('%-9s %s' % (mode, ' '.join('%9.3fms' % report[mode][phase] for phase in PHASES)))
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+            out.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
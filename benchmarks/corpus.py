@@ -0,0 +1,116 @@
+"""benchmark corpora, generated reproducibly from the word lists in corpus/
+
+    frequent.txt   the most frequent French words, most frequent first
+    rare.txt       less common words, many of them ones the rules single out
+    accented.txt   accent heavy words
+
+A corpus of a given size draws 70% of its tokens from the frequent words
+with a Zipf distribution, 20% from the rare words and 10% from the
+accented ones, uniformly, with a fixed seed. The same size always gives
+the same text, byte for byte (checked against CHECKSUMS), so the corpora
+themselves are generated into corpus/generated/ on first use instead of
+being checked in.
+
+    python benchmarks/corpus.py 1k 100k 1m
+"""
+import bisect
+import hashlib
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(HERE, 'corpus')
+GENERATED_DIR = os.path.join(CORPUS_DIR, 'generated')
+
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+SEED = 20161
+WORDS_PER_LINE = 12
+MIX = (('frequent', 0.7), ('rare', 0.2), ('accented', 0.1))
+
+# sha256 of each generated corpus, to catch a word list or generator change
+CHECKSUMS = {
+    '1k': 'a4573e81e2fc7a0971a8942bdc514962122041aa28b9d292d01a6a0c7f9d0eed',
+    '100k': '5d39b5ba7061b455b6bae091d45ba42639acf01cfd8e474e4c291f96ee2dcd4f',
+    '1m': '8b6a0aaefc776057eff88704e68d833a3334afe4896938a4ec0a61ff8ccdbb8f',
+}
+
+
+def load_words(name):
+    """the words of corpus/<name>.txt in order, without comments or repeats"""
+    words = []
+    seen = set()
+    with open(os.path.join(CORPUS_DIR, name + '.txt'), encoding='utf-8') as source:
+        for line in source:
+            word = line.strip()
+            if word and not word.startswith('#') and word not in seen:
+                seen.add(word)
+                words.append(word)
+    return words
+
+
+def _cumulative(weights):
+    total = 0.0
+    cumulative = []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return [value / total for value in cumulative]
+
+
+def iter_tokens(count, seed=SEED):
+    """count tokens drawn from the word lists, see the module docstring"""
+    rng = random.Random(seed)
+    lists = []
+    for name, share in MIX:
+        words = load_words(name)
+        if name == 'frequent':
+            weights = [1.0 / rank for rank in range(1, len(words) + 1)]
+        else:
+            weights = [1.0] * len(words)
+        lists.append((words, _cumulative(weights)))
+    shares = _cumulative([share for _, share in MIX])
+    for _ in range(count):
+        words, cumulative = lists[bisect.bisect_left(shares, rng.random())]
+        yield words[min(bisect.bisect_left(cumulative, rng.random()), len(words) - 1)]
+
+
+def corpus_path(size):
+    """path of the corpus of the given size ('1k', '100k' or '1m'), generating it if needed"""
+    path = os.path.join(GENERATED_DIR, 'corpus_%s.txt' % size)
+    if not os.path.exists(path):
+        os.makedirs(GENERATED_DIR, exist_ok=True)
+        line = []
+        with open(path + '.tmp', 'w', encoding='utf-8', newline='\n') as out:
+            for token in iter_tokens(SIZES[size]):
+                line.append(token)
+                if len(line) == WORDS_PER_LINE:
+                    out.write(' '.join(line) + '\n')
+                    line = []
+            if line:
+                out.write(' '.join(line) + '\n')
+        os.replace(path + '.tmp', path)
+    expected = CHECKSUMS.get(size)
+    if expected is not None and checksum(path) != expected:
+        raise RuntimeError('%s does not match its checksum, delete it to regenerate' % path)
+    return path
+
+
+def checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_corpus(size):
+    """the tokens of a corpus, as a list"""
+    with open(corpus_path(size), encoding='utf-8') as source:
+        return source.read().split()
+
+
+if __name__ == '__main__':
+    for size in sys.argv[1:] or sorted(SIZES, key=SIZES.get):
+        path = corpus_path(size)
+        print('%s %s %s' % (size, checksum(path), path))
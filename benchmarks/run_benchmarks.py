@@ -0,0 +1,164 @@
+"""benchmark suite for the phoneme pipeline
+
+For every entry point and corpus size this measures throughput (words per
+second), per-word latency percentiles, and the peak memory allocated while
+keeping every result of the corpus, plus the import time of the modules
+in a fresh interpreter. Results are written as JSON so runs can be
+compared:
+
+    python benchmarks/run_benchmarks.py --sizes 1k 100k -o before.json
+    ... change something ...
+    python benchmarks/run_benchmarks.py --sizes 1k 100k -o after.json --compare before.json
+
+The corpora are described in corpus.py.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from corpus import SIZES, load_corpus
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python')
+sys.path.insert(0, PYTHON_DIR)
+
+import Phoneme  # noqa: E402
+from unicode_hammer import latin1_to_ascii  # noqa: E402
+
+ENTRY_POINTS = {
+    'breakdownWord': Phoneme.breakdownWord,
+    'convertPhonemes': Phoneme.convertPhonemes,
+    'latin1_to_ascii': latin1_to_ascii,
+}
+IMPORTED_MODULES = ('Phoneme', 'unicode_hammer')
+
+# per-call timings are taken on at most this many tokens
+LATENCY_SAMPLE = 100000
+
+
+def measure_throughput(function, tokens, repeat):
+    """best words per second over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for token in tokens:
+            function(token)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens) / best
+
+
+def measure_latency(function, tokens):
+    """per-call latency percentiles, in microseconds"""
+    clock = time.perf_counter_ns
+    timings = []
+    for token in tokens[:LATENCY_SAMPLE]:
+        started = clock()
+        function(token)
+        timings.append(clock() - started)
+    timings.sort()
+
+    def percentile(fraction):
+        return timings[min(int(fraction * len(timings)), len(timings) - 1)] / 1000.0
+
+    return {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+            'max': timings[-1] / 1000.0}
+
+
+def measure_peak_memory(function, tokens):
+    """peak memory allocated while keeping the result of every token, in KiB"""
+    tracemalloc.start()
+    try:
+        results = [function(token) for token in tokens]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del results
+    return peak / 1024.0
+
+
+def measure_import_time(module, repeat=5):
+    """median time to import module in a fresh interpreter, in milliseconds"""
+    code = ('import time; started = time.perf_counter(); import %s; '
+            'print(time.perf_counter() - started)' % module)
+    env = dict(os.environ, PYTHONPATH=PYTHON_DIR, PYTHONDONTWRITEBYTECODE='1')
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', code], env=env, cwd=PYTHON_DIR)
+        timings.append(float(output) * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes, entry_points):
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'import_ms': {module: measure_import_time(module) for module in IMPORTED_MODULES},
+        'results': [],
+    }
+    for size in sizes:
+        tokens = load_corpus(size)
+        repeat = 1 if len(tokens) >= 1000000 else 3
+        for name in entry_points:
+            function = ENTRY_POINTS[name]
+            function(tokens[0])  # warm up
+            result = {
+                'entry_point': name,
+                'corpus': size,
+                'tokens': len(tokens),
+                'words_per_second': measure_throughput(function, tokens, repeat),
+                'latency_us': measure_latency(function, tokens),
+                'peak_memory_kib': measure_peak_memory(function, tokens),
+            }
+            report['results'].append(result)
+            print('%-16s %5s %12.0f words/s  p50 %6.2fus  p99 %7.2fus  peak %9.0f KiB' % (
+                name, size, result['words_per_second'], result['latency_us']['p50'],
+                result['latency_us']['p99'], result['peak_memory_kib']), file=sys.stderr)
+    return report
+
+
+def compare(report, baseline):
+    """print how each result moved against the same one in baseline"""
+    previous = {(result['entry_point'], result['corpus']): result for result in baseline['results']}
+    for result in report['results']:
+        before = previous.get((result['entry_point'], result['corpus']))
+        if before is None:
+            continue
+        print('%-16s %5s  words/s %+6.1f%%  p50 %+6.1f%%' % (
+            result['entry_point'], result['corpus'],
+            100.0 * (result['words_per_second'] / before['words_per_second'] - 1),
+            100.0 * (result['latency_us']['p50'] / before['latency_us']['p50'] - 1)))
+    for module, milliseconds in report['import_ms'].items():
+        if module in baseline.get('import_ms', {}):
+            print('import %-16s %+6.1f%%' % (module, 100.0 * (milliseconds / baseline['import_ms'][module] - 1)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES, key=SIZES.get), default=['1k', '100k'])
+    parser.add_argument('--entry-points', nargs='+', choices=sorted(ENTRY_POINTS), default=sorted(ENTRY_POINTS))
+    parser.add_argument('-o', '--output', help='JSON file to write, standard output by default')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON file of an earlier run to compare with')
+    args = parser.parse_args(argv)
+    report = run(args.sizes, args.entry_points)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as source:
+            compare(report, json.load(source))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
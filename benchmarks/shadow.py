@@ -0,0 +1,290 @@
+"""shadow mode: a candidate engine against the reference breakdownWord, word for word
+
+    python benchmarks/shadow.py
+    python benchmarks/shadow.py --candidate current --candidate batch --corpus 1m --jobs 4
+    python benchmarks/shadow.py --convert --allow known.txt -o shadow.json
+
+Every word of the corpus (see corpus.py, or --words FILE), then --fuzz
+generated letter sequences and every sequence of up to --short letters
+taken from the letters the left context rules look at (the short words
+on which word[pos - 3] once ran off the start), goes through the
+reference engine and each candidate in a pool of worker processes.
+
+A difference is reported with both outputs, under the letter rule of the
+current tables that gave the first phoneme where the outputs part (see
+RuleStats.trace), so one faulty rule shows up as one group however many
+words it touches. The time each engine spent on the words is reported
+too, summed over the workers.
+
+Engines are the names in ENGINES or 'module:function' (a function taking
+a word), 'module:function:batch' (taking a list of words), giving
+phonemes either way. The exit
+status is 1 if any difference is neither allowed nor on a word the
+reference raised an error on: the frozen reference indexes past the
+start of some short words, which the rule tables fixed. The --allow
+file (shadow_allowed.txt by default) lists the words and rule groups,
+as printed, of the differences made on purpose since.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import SIZES, load_corpus
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+REFERENCE = 'reference'
+RAISED = '(reference raised)'
+
+# generated words draw from these, accents and word joiners included, and
+# one in ten starts with an elision
+FUZZ_LETTERS = 'abcdefghijklmnopqrstuvwxyz' * 3 + '\xe0\xe2\xe7\xe8\xe9\xea\xee\xef\xf4\xf9\xfb-_ '
+ELISIONS = ("c'", "d'", "j'", "l'", "m'", "n'", "qu'", "s'", "t'", 'c\u2019', 'l\u2019')
+
+# differences intended, see --allow
+ALLOWED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shadow_allowed.txt')
+
+# differences shown per group in the text report
+EXAMPLES = 5
+
+
+def _reference(words, convert):
+    import phoneme_reference
+    from Phoneme import phoneme_conversion
+    return _each(words, phoneme_reference.breakdownWord, phoneme_conversion if convert else None)
+
+
+def _current(words, convert):
+    import Phoneme
+    return _each(words, Phoneme.convertPhonemes if convert else Phoneme.breakdownWord)
+
+
+def _batch(words, convert):
+    from phoneme_batch import breakdownBatch
+    return list(breakdownBatch(words, convert=convert, min_batch=0))
+
+
+ENGINES = {
+    REFERENCE: _reference,
+    'current': _current,
+    'batch': _batch,
+}
+
+
+def _each(words, function, conversion=None):
+    """function of every word, or the name of the error it raised"""
+    results = []
+    for word in words:
+        try:
+            result = function(word)
+        except Exception as error:
+            results.append(type(error).__name__)
+            continue
+        results.append([conversion[phoneme] for phoneme in result] if conversion else list(result))
+    return results
+
+
+def _engine(name):
+    """function(words, convert) of an engine name or spec"""
+    if name in ENGINES:
+        return ENGINES[name]
+    module, _, rest = name.partition(':')
+    attribute, _, kind = rest.partition(':')
+    function = getattr(importlib.import_module(module), attribute)
+
+    def engine(words, convert):
+        from Phoneme import phoneme_conversion
+        conversion = phoneme_conversion if convert else None
+        if kind != 'batch':
+            return _each(words, function, conversion)
+        return [[conversion[phoneme] for phoneme in result] if conversion else list(result)
+                for result in function(words)]
+    return engine
+
+
+_tracer = None
+
+
+def blame(word, reference, candidate):
+    """'letter: rule label' of the rule behind the first phoneme where two outputs part"""
+    global _tracer
+    if isinstance(reference, str):
+        return RAISED
+    if isinstance(candidate, str):
+        return '(candidate raised %s)' % candidate
+    if _tracer is None:
+        from rule_stats import RuleStats
+        _tracer = RuleStats()
+    from unicode_hammer import fold_to_latin1
+    part = 0
+    while part < min(len(reference), len(candidate)) and reference[part] == candidate[part]:
+        part += 1
+    # which letter gave each phoneme (and so each viseme), repeats dropped
+    # like breakdownWord does
+    owners = []
+    last = None
+    for step in _tracer.trace(fold_to_latin1(word.lower())):
+        for phoneme in step[3]:
+            if phoneme != last:
+                owners.append(step)
+                last = phoneme
+    if not owners:
+        return '(no letter rule)'
+    _, letter, label, _ = owners[min(part, len(owners) - 1)]
+    return '%s: %s' % (letter, label)
+
+
+def shadow_chunk(words, engines, convert):
+    """({engine: seconds}, [(word, reference output, {candidate: output}, group)]) of a chunk"""
+    outputs = {}
+    seconds = {}
+    for name in engines:
+        started = time.perf_counter()
+        outputs[name] = _engine(name)(words, convert)
+        seconds[name] = time.perf_counter() - started
+    differences = []
+    reference = outputs[engines[0]]
+    for index, word in enumerate(words):
+        differing = {name: outputs[name][index] for name in engines[1:]
+                     if outputs[name][index] != reference[index]}
+        if differing:
+            first = next(iter(differing.values()))
+            differences.append((word, reference[index], differing, blame(word, reference[index], first)))
+    return seconds, differences
+
+
+def fuzz_words(count, seed=1, longest=12):
+    """count random letter sequences of 1 to longest letters"""
+    rnd = random.Random(seed)
+    words = []
+    for _ in range(count):
+        word = ''.join(rnd.choice(FUZZ_LETTERS) for _ in range(rnd.randint(1, longest)))
+        words.append(rnd.choice(ELISIONS) + word if rnd.random() < 0.1 else word)
+    return words
+
+
+def context_letters():
+    """the letters with rules looking two or more places left, and the letters those rules look for"""
+    from phoneme_rules import CLASSES, RULES
+    letters = set()
+    for letter, rules in RULES.items():
+        for condition, _ in rules:
+            for seen in re.findall(r'(?:-\d+|#-\d+)[:!](\S+)', condition):
+                letters.add(letter)
+                if seen not in CLASSES:
+                    letters.update(seen)
+    return ''.join(sorted(letters))
+
+
+def short_words(longest, letters=None):
+    """every sequence of 1 to longest letters"""
+    letters = letters or context_letters()
+    for length in range(1, longest + 1):
+        for letters_of in itertools.product(letters, repeat=length):
+            yield ''.join(letters_of)
+
+
+def run(words, candidates, convert=False, jobs=None, chunk_words=2000):
+    """report of the differences and timings over words, see main"""
+    engines = [REFERENCE] + [name for name in candidates if name != REFERENCE]
+    chunks = [words[start:start + chunk_words] for start in range(0, len(words), chunk_words)]
+    seconds = dict.fromkeys(engines, 0.0)
+    groups = {}
+    started = time.perf_counter()
+    if jobs == 1:
+        results = (shadow_chunk(chunk, engines, convert) for chunk in chunks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(jobs)
+        results = pool.map(shadow_chunk, chunks, itertools.repeat(engines), itertools.repeat(convert))
+    try:
+        for chunk_seconds, differences in results:
+            for name, spent in chunk_seconds.items():
+                seconds[name] += spent
+            for word, reference, differing, group in differences:
+                groups.setdefault(group, []).append(
+                    OrderedDict([('word', word), (REFERENCE, reference)] + sorted(differing.items())))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {
+        'words': len(words),
+        'wall_seconds': time.perf_counter() - started,
+        'engines': {name: {'seconds': seconds[name],
+                           'words_per_second': len(words) / seconds[name] if seconds[name] else None}
+                    for name in engines},
+        'differences': sum(len(group) for group in groups.values()),
+        'groups': OrderedDict(sorted(groups.items(), key=lambda item: -len(item[1]))),
+    }
+
+
+def read_allowed(path):
+    """the words and rule groups of an allow file, one per line, '#' starting a comment"""
+    with open(path, encoding='utf-8') as source:
+        return {line.split('#')[0].strip() for line in source} - {''}
+
+
+def unexpected(report, allowed=()):
+    """the differing words neither allowed (as words or as a group) nor raised on by the reference"""
+    allowed = set(allowed) | {RAISED}
+    return [difference['word'] for group, differences in report['groups'].items() if group not in allowed
+            for difference in differences if difference['word'] not in allowed]
+
+
+def format_report(report, examples=EXAMPLES):
+    lines = ['%d words, %.1fs' % (report['words'], report['wall_seconds'])]
+    for name, timing in report['engines'].items():
+        lines.append('  %-24s %8.3fs %12.0f words/s' % (name, timing['seconds'], timing['words_per_second'] or 0))
+    lines.append('%d differences' % report['differences'])
+    for group, differences in report['groups'].items():
+        lines.append('  %6d  %s' % (len(differences), group))
+        for difference in differences[:examples]:
+            outputs = ['%s %s' % (name, output if isinstance(output, str) else ' '.join(output) or '-')
+                       for name, output in list(difference.items())[1:]]
+            lines.append('            %r: %s' % (difference['word'], ' | '.join(outputs)))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--candidate', action='append', help="engine checked, repeatable (default 'current')")
+    parser.add_argument('--corpus', choices=sorted(SIZES), default='100k')
+    parser.add_argument('--words', metavar='FILE', help='one word per line, instead of the corpus')
+    parser.add_argument('--fuzz', type=int, default=100000, help='generated words added (default 100000)')
+    parser.add_argument('--short', type=int, default=4, help='longest exhaustive short word (default 4)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--convert', action='store_true', help='compare visemes, like convertPhonemes')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--allow', metavar='FILE', default=ALLOWED,
+                        help='words and rule groups whose differences are intended (default shadow_allowed.txt)')
+    parser.add_argument('-o', '--output', help='JSON file to write the whole report to')
+    args = parser.parse_args(argv)
+    if args.words:
+        with open(args.words, encoding='utf-8') as source:
+            words = [line.strip() for line in source if line.strip()]
+    else:
+        words = load_corpus(args.corpus)
+    words = list(OrderedDict.fromkeys(words + fuzz_words(args.fuzz, args.seed) + list(short_words(args.short))))
+    report = run(words, args.candidate or ['current'], args.convert, args.jobs)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(report, out, indent=1, ensure_ascii=False)
+            out.write('\n')
+    failed = unexpected(report, read_allowed(args.allow) if args.allow else ())
+    if failed:
+        print('%d unexpected differences' % len(failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""breakdownBatch against breakdownWord, word for word
+
+    python -m unittest discover -s benchmarks -p 'test_*.py'
+    python -m pytest benchmarks
+
+The words are those of the 1m corpus, the fuzzed ones and the short
+ones shadow.py generates, plus a few edge cases, each list checked for
+phonemes and for visemes, with and without a lexicon, in one batch and
+in chunks small enough for words to sit on both sides of a chunk
+boundary.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+from corpus import load_corpus
+from shadow import fuzz_words, short_words
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import lexicon  # noqa: E402
+import Phoneme  # noqa: E402
+import phoneme_batch  # noqa: E402
+
+# words the generated lists may miss: empty, a line break (the batch folds
+# words joined by newlines), controls and letters past Latin-1
+EDGE_WORDS = ['', 'a\nb', '\n', 'x\x85y', 'œuvre', 'ŒUVRE', 'ēté', 'été', 'Ǆ', '日本', 'ça-ira']
+
+
+def expected(words, convert):
+    word_phonemes = Phoneme.convertPhonemes if convert else Phoneme.breakdownWord
+    return [list(word_phonemes(word)) for word in words]
+
+
+@unittest.skipIf(phoneme_batch.numpy is None, 'breakdownBatch needs NumPy to batch')
+class BatchParityTest(unittest.TestCase):
+
+    def check(self, words, chunk_size=phoneme_batch.CHUNK_SIZE):
+        for convert in (False, True):
+            batch = phoneme_batch.breakdownBatch(words, convert=convert, min_batch=0, chunk_size=chunk_size)
+            self.assertEqual(len(batch), len(words))
+            for word, found, wanted in zip(words, batch, expected(words, convert)):
+                self.assertEqual(list(found), wanted, 'word %r, convert=%s' % (word, convert))
+
+    def test_corpus(self):
+        self.check(list(dict.fromkeys(load_corpus('1m'))))
+
+    def test_fuzzed(self):
+        self.check(fuzz_words(100000))
+
+    def test_short(self):
+        self.check(list(short_words(4)))
+
+    def test_edge_words(self):
+        self.check(EDGE_WORDS)
+
+    def test_chunks(self):
+        self.check(fuzz_words(3000, seed=2), chunk_size=97)
+
+    def test_lexicon(self):
+        words = fuzz_words(3000, seed=3) + ['Monsieur', 'wagon', 'Été', 'ete']
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'words.tsv')
+            with open(source, 'w', encoding='utf-8') as out:
+                out.write('monsieur\tM EH0 S IH0 EH0 UW0 R\nwagon\tV AE0 G AO0 NG\n\u0113t\xe9\tEH0 T EH0\n')
+                out.write(''.join('%s\tB AO0\n' % word.strip() for word in words[:3000:7] if word.strip()))
+            compiled = os.path.join(directory, 'words.lex')
+            lexicon.build(source, compiled)
+            with lexicon.Lexicon(compiled) as listed:
+                Phoneme.use_lexicon(listed)
+                try:
+                    self.check(words, chunk_size=211)
+                finally:
+                    Phoneme.use_lexicon(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
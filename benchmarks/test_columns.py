@@ -0,0 +1,75 @@
+"""phoneme_columns: a text written to a column file and read back
+
+    python -m unittest discover -s benchmarks -p 'test_*.py'
+    python -m pytest benchmarks
+
+The tokens, phonemes and visemes read back have to be those
+Phoneme.iter_text gives for the same text, token by token and through
+coded(), whose CodedWords have to convert to visemes like the viseme
+column. The 100k corpus is written in small chunks so that it spans
+several of them.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+from corpus import corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools'))
+
+import Phoneme  # noqa: E402
+import phoneme_columns  # noqa: E402
+from phoneme_codes import PHONEMES, VISEMES  # noqa: E402
+from tokenizer import tokenize  # noqa: E402
+
+TEXT = ("Bonjour, le chat dort. L'été, 12 œufs et c'est-à-dire: peut-être!\n"
+        "Ēté naïf — ÇA IRA, ça ira. Monsieur Wagon lit « Berlioz ».\n")
+
+
+class ColumnRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'text.phc')
+
+    def check(self, lines, chunk_tokens=phoneme_columns.CHUNK_TOKENS):
+        count = phoneme_columns.write_columns(self.path, tokenize(lines), chunk_tokens)
+        phonemes = list(Phoneme.iter_text(lines))
+        visemes = [converted for _, converted in Phoneme.iter_text(lines, convert=True)]
+        self.assertEqual(count, len(phonemes))
+        with phoneme_columns.ColumnReader(self.path) as columns:
+            self.assertEqual(len(columns), count)
+            self.assertEqual(list(columns), phonemes)
+            self.assertEqual([converted for _, converted in columns.iter_text(convert=True)], visemes)
+            for index in ((0, count // 2, count - 1, -1) if count else ()):
+                self.assertEqual(columns[index], phonemes[index])
+                self.assertEqual(columns.visemes(index), visemes[index])
+            coded = columns.coded()
+            self.assertIs(coded.names, PHONEMES)
+            self.assertEqual(list(coded), [found for _, found in phonemes])
+            self.assertEqual(list(coded.to_visemes()), visemes)
+            self.assertIs(columns.coded(convert=True).names, VISEMES)
+            self.assertEqual(list(columns.coded(convert=True)), visemes)
+
+    def test_text(self):
+        self.check(TEXT.splitlines(True))
+
+    def test_corpus(self):
+        with open(corpus_path('100k'), encoding='utf-8') as source:
+            self.check(source.readlines(), chunk_tokens=4099)
+
+    def test_empty(self):
+        self.check([])
+
+    def test_other_names(self):
+        phoneme_columns.write_columns(self.path, tokenize(TEXT))
+        with phoneme_columns.ColumnReader(self.path) as columns:
+            columns.phoneme_names = columns.phoneme_names[::-1]
+            self.assertRaises(ValueError, columns.coded)
+
+
+if __name__ == '__main__':
+    unittest.main()
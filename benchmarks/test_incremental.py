@@ -0,0 +1,109 @@
+"""incremental.TranscriptionSession against Phoneme.iter_text on the edited text
+
+    python -m unittest discover -s benchmarks -p 'test_*.py'
+    python -m pytest benchmarks
+
+Random edits (insertions, deletions and replacements, inside words, across
+whitespace and at both ends) are made to texts short and long enough for
+several chunks. After each one the session has to hold the text and the
+tokens iter_text gives for it, and the TokenDiff, applied to the tokens
+from before, has to give the tokens after.
+"""
+import os
+import random
+import sys
+import unittest
+
+from corpus import corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import Phoneme  # noqa: E402
+import incremental  # noqa: E402
+from incremental import TranscriptionSession  # noqa: E402
+from tokenizer import Token  # noqa: E402
+
+PIECES = ('chat', 'chien', ' ', '  ', '\n', "l'", "qu'", '-', 'été', ',', '.', '12', 'arc-en-ciel', 'e', 'ou', "'")
+
+
+class TranscriptionSessionTest(unittest.TestCase):
+
+    def check(self, session, text, convert=False):
+        self.assertEqual(session.text, text)
+        self.assertEqual(list(session), list(Phoneme.iter_text(text, convert=convert)))
+        self.assertEqual(len(session), len(list(session)))
+
+    def edit(self, session, text, offset, deleted, inserted, convert=False):
+        before = list(session)
+        diff = session.edit(offset, deleted, inserted)
+        text = text[:offset] + inserted + text[offset + deleted:]
+        self.check(session, text, convert)
+        self.assertEqual(diff.shift, len(inserted) - deleted)
+        self.assertEqual(diff.removed, before[diff.index:diff.index + len(diff.removed)])
+        moved = [(token._replace(start=token.start + diff.shift, end=token.end + diff.shift), phonemes)
+                 for token, phonemes in before[diff.index + len(diff.removed):]]
+        self.assertEqual(before[:diff.index] + diff.added + moved, list(session))
+        return text
+
+    def fuzz(self, text, edits, seed, convert=False):
+        rnd = random.Random(seed)
+        session = TranscriptionSession(text, convert=convert)
+        self.check(session, text, convert)
+        for _ in range(edits):
+            offset = rnd.randint(0, len(text))
+            deleted = rnd.randint(0, min(len(text) - offset, 12)) if rnd.random() < 0.6 else 0
+            inserted = ''.join(rnd.choice(PIECES) for _ in range(rnd.randint(0, 3)))
+            text = self.edit(session, text, offset, deleted, inserted, convert)
+
+    def test_docstring(self):
+        session = TranscriptionSession('le chat dort')
+        diff = session.edit(3, 4, 'chien')
+        self.assertEqual(session.text, 'le chien dort')
+        self.assertEqual(diff.index, 1)
+        self.assertEqual(diff.removed, [(Token('word', 'chat', 3, 7), ['SH', 'AE0'])])
+        self.assertEqual(diff.added, [(Token('word', 'chien', 3, 8), Phoneme.breakdownWord('chien'))])
+        self.assertEqual(diff.shift, 1)
+        self.assertEqual(session[-1], (Token('word', 'dort', 9, 13), Phoneme.breakdownWord('dort')))
+
+    def test_unchanged_tokens_left_out(self):
+        session = TranscriptionSession('le chat dort')
+        diff = session.edit(7, 0, ' ')
+        self.assertEqual((diff.removed, diff.added, diff.shift), ([], [], 1))
+        diff = session.edit(3, 4, 'chat')
+        self.assertEqual((diff.removed, diff.added, diff.shift), ([], [], 0))
+
+    def test_empty(self):
+        session = TranscriptionSession()
+        self.check(session, '')
+        text = self.edit(session, '', 0, 0, "L'été, le chat")
+        self.edit(session, text, 0, len(text), '')
+        self.assertRaises(IndexError, session.__getitem__, 0)
+
+    def test_outside(self):
+        session = TranscriptionSession('le chat')
+        for offset, deleted in ((-1, 0), (0, -1), (8, 0), (5, 3)):
+            self.assertRaises(ValueError, session.edit, offset, deleted, 'x')
+        self.check(session, 'le chat')
+
+    def test_short(self):
+        self.fuzz("L'arc-en-ciel, c'est beau.", 500, seed=1)
+
+    def test_convert(self):
+        self.fuzz('le chat dort, le chien aussi', 200, seed=2, convert=True)
+
+    def test_chunks(self):
+        with open(corpus_path('1k'), encoding='utf-8') as source:
+            text = source.read() * 4
+        self.assertGreater(len(text), 2 * incremental.CHUNK_SIZE)
+        self.fuzz(text, 80, seed=3)
+
+    def test_long_insert(self):
+        # one edit bigger than a chunk, then edits across the chunks it was cut into
+        session = TranscriptionSession('début fin')
+        text = self.edit(session, 'début fin', 6, 0, 'le chat dort ' * 1000)
+        for offset in range(5, len(text), incremental.CHUNK_SIZE - 3):
+            text = self.edit(session, text, offset, 4, 'x y')
+
+
+if __name__ == '__main__':
+    unittest.main()
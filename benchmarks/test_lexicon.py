@@ -0,0 +1,129 @@
+"""lexicon: build, lookups, bad source lines, folding and Phoneme.use_lexicon
+
+    python -m unittest discover -s benchmarks -p 'test_*.py'
+    python -m pytest benchmarks
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import lexicon  # noqa: E402
+import Phoneme  # noqa: E402
+
+SOURCE = ('# a comment, then a blank line\n'
+          '\n'
+          'monsieur\tM EH0 S IH0 EH0 UW0 R\n'
+          'Wagon\tV AE0 G AO0 NG\n'
+          'ēt\xe9\tEH0 T EH0\n'
+          'crème\tK R EH0 M\n'
+          'lis\tL IH0\n'
+          'lis\tL IH0 S\n')
+
+
+class LexiconTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = self.build(SOURCE)
+        self.lexicon = lexicon.Lexicon(self.path)
+        self.addCleanup(self.lexicon.close)
+
+    def build(self, text, name='words'):
+        source = os.path.join(self.directory, name + '.tsv')
+        with open(source, 'w', encoding='utf-8') as out:
+            out.write(text)
+        path = os.path.join(self.directory, name + '.lex')
+        lexicon.build(source, path)
+        return path
+
+    def test_entries(self):
+        self.assertEqual(len(self.lexicon), 5)
+        self.assertEqual(list(self.lexicon), sorted(self.lexicon))
+        self.assertEqual(dict(self.lexicon)['lis'], ('L', 'IH0', 'S'))
+
+    def test_listed(self):
+        self.assertEqual(self.lexicon.lookup('monsieur'), ('M', 'EH0', 'S', 'IH0', 'EH0', 'UW0', 'R'))
+        self.assertEqual(self.lexicon.lookup('wagon'), ('V', 'AE0', 'G', 'AO0', 'NG'))
+
+    def test_unlisted(self):
+        for word in ('chat', '', 'monsieu', 'monsieurs', 'Monsieur'):
+            self.assertIsNone(self.lexicon.lookup(word), word)
+        self.assertNotIn('chat', self.lexicon)
+
+    def test_empty(self):
+        with lexicon.Lexicon(self.build('# nothing\n', 'empty')) as empty:
+            self.assertEqual(len(empty), 0)
+            self.assertIsNone(empty.lookup('monsieur'))
+
+    def test_folding(self):
+        # entries are lowered and folded when built, `in` folds its word,
+        # lookup() takes it as breakdownWord passes it
+        self.assertEqual(self.lexicon.lookup('\xe8t\xe9'), ('EH0', 'T', 'EH0'))
+        self.assertEqual(self.lexicon.lookup('cr\xe8me'), ('K', 'R', 'EH0', 'M'))
+        self.assertIsNone(self.lexicon.lookup('ēt\xe9'))
+        for word in ('MONSIEUR', 'ĒT\xc9', '\xe8t\xe9', 'crème', 'CR\xc8ME'):
+            self.assertIn(word, self.lexicon)
+
+    def test_malformed(self):
+        for line in ('monsieur M EH0 S\n', 'monsieur\t\n', '\tM EH0\n', ' \tM EH0\n', 'monsieur\tM XX0\n'):
+            with self.assertRaises(ValueError, msg=repr(line)) as raised:
+                self.build('wagon\tV AE0 G AO0 NG\n' + line, 'bad')
+            self.assertIn('bad.tsv:2:', str(raised.exception))
+
+    def test_too_long(self):
+        with self.assertRaises(ValueError):
+            self.build('%s\tB AO0\n' % ('a' * 256), 'long')
+
+    def test_not_a_lexicon(self):
+        path = os.path.join(self.directory, 'other.lex')
+        with open(path, 'wb') as out:
+            out.write(b'\0' * 64)
+        self.assertRaises(ValueError, lexicon.Lexicon, path)
+
+
+class UseLexiconTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, 'words.tsv')
+        with open(source, 'w', encoding='utf-8') as out:
+            out.write(SOURCE)
+        self.path = os.path.join(directory.name, 'words.lex')
+        lexicon.build(source, self.path)
+        self.addCleanup(Phoneme.use_lexicon, None)
+
+    def test_breakdown(self):
+        rules = Phoneme.breakdownWord('wagon')
+        Phoneme.use_lexicon(self.path)
+        self.assertEqual(Phoneme.breakdownWord('Wagon'), ['V', 'AE0', 'G', 'AO0', 'NG'])
+        self.assertEqual(Phoneme.breakdownWord('Ēt\xe9'), ['EH0', 'T', 'EH0'])
+        self.assertEqual(Phoneme.breakdownWord('été'), Phoneme.breakdownWord('\xe9t\xe9'))
+        self.assertEqual(Phoneme.convertPhonemes('lis'), [Phoneme.phoneme_conversion[phoneme]
+                                                         for phoneme in ('L', 'IH0', 'S')])
+        self.assertEqual(Phoneme.breakdownWord('chat'), ['SH', 'AE0'])
+        Phoneme.use_lexicon(None)
+        self.assertEqual(Phoneme.breakdownWord('wagon'), rules)
+
+    def test_opened_from_path_closed(self):
+        Phoneme.use_lexicon(self.path)
+        opened = Phoneme._lexicon
+        Phoneme.use_lexicon(self.path)
+        self.assertIsNot(Phoneme._lexicon, opened)
+        self.assertRaises(ValueError, opened.lookup, 'wagon')
+        self.assertEqual(Phoneme.breakdownWord('wagon'), ['V', 'AE0', 'G', 'AO0', 'NG'])
+
+    def test_passed_in_left_open(self):
+        with lexicon.Lexicon(self.path) as listed:
+            Phoneme.use_lexicon(listed)
+            Phoneme.use_lexicon(None)
+            self.assertEqual(listed.lookup('wagon'), ('V', 'AE0', 'G', 'AO0', 'NG'))
+
+
+if __name__ == '__main__':
+    unittest.main()
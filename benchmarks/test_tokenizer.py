@@ -0,0 +1,92 @@
+"""tokenizer: token kinds, elisions, compounds, offsets and streamed input
+
+    python -m unittest discover -s benchmarks -p 'test_*.py'
+    python -m pytest benchmarks
+"""
+import io
+import os
+import sys
+import unittest
+
+from corpus import corpus_path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from tokenizer import COMPOUND, ELISION, NUMBER, PUNCTUATION, WORD, Token, tokenize  # noqa: E402
+
+TEXT = ("L'arc-en-ciel, c'est beau. Jusqu\N{RIGHT SINGLE QUOTATION MARK}ici, qu'il "
+        "vienne aujourd'hui\N{HYPHEN}même : 3,5 km, 1.000 ans, _x_!\n"
+        "Le cha\u0302teau (cafe\u0301) d'O'Neill…")
+
+
+def kinds_and_texts(text):
+    return [(token.kind, token.text) for token in tokenize(text)]
+
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_docstring(self):
+        self.assertEqual(list(tokenize("L'arc-en-ciel, c'est beau.")), [
+            Token(ELISION, "L'", 0, 2),
+            Token(COMPOUND, 'arc-en-ciel', 2, 13),
+            Token(PUNCTUATION, ',', 13, 14),
+            Token(ELISION, "c'", 15, 17),
+            Token(WORD, 'est', 17, 20),
+            Token(WORD, 'beau', 21, 25),
+            Token(PUNCTUATION, '.', 25, 26),
+        ])
+
+    def test_elisions(self):
+        self.assertEqual(kinds_and_texts("qu'il jusqu'ici lorsqu'on d\N{RIGHT SINGLE QUOTATION MARK}abord "
+                                         "QU'IL s'l'm'"), [
+            (ELISION, "qu'"), (WORD, 'il'),
+            (ELISION, "jusqu'"), (WORD, 'ici'),
+            (ELISION, "lorsqu'"), (WORD, 'on'),
+            (ELISION, 'd\N{RIGHT SINGLE QUOTATION MARK}'), (WORD, 'abord'),
+            (ELISION, "QU'"), (WORD, 'IL'),
+            # an apostrophe at the end is not joined to the word
+            (ELISION, "s'"), (ELISION, "l'"), (WORD, 'm'), (PUNCTUATION, "'"),
+        ])
+
+    def test_kept_whole(self):
+        self.assertEqual(kinds_and_texts("aujourd'hui prud'homme"), [(WORD, "aujourd'hui"), (WORD, "prud'homme")])
+        self.assertEqual(kinds_and_texts("l'arc-en-ciel"), [(ELISION, "l'"), (COMPOUND, 'arc-en-ciel')])
+        self.assertEqual(kinds_and_texts('peut\N{HYPHEN}être'), [(COMPOUND, 'peut\N{HYPHEN}être')])
+
+    def test_numbers_and_punctuation(self):
+        self.assertEqual(kinds_and_texts('3,5 km, 1.000 ans _x_ -'), [
+            (NUMBER, '3,5'), (WORD, 'km'), (PUNCTUATION, ','), (NUMBER, '1.000'), (WORD, 'ans'),
+            (PUNCTUATION, '_'), (WORD, 'x'), (PUNCTUATION, '_'), (PUNCTUATION, '-'),
+        ])
+
+    def test_decomposed_accents(self):
+        self.assertEqual(kinds_and_texts('cafe\u0301 e\u0301te\u0301'),
+                         [(WORD, 'cafe\u0301'), (WORD, 'e\u0301te\u0301')])
+
+    def test_offsets(self):
+        for token in tokenize(TEXT):
+            self.assertEqual(TEXT[token.start:token.end], token.text)
+
+    def test_empty(self):
+        for text in ('', '   \n\t', io.StringIO(''), []):
+            self.assertEqual(list(tokenize(text)), [])
+
+    def test_streams(self):
+        # the same tokens however the text is cut, offsets counting from its start
+        whole = list(tokenize(TEXT))
+        self.assertEqual(list(tokenize(io.StringIO(TEXT))), whole)
+        for size in (1, 2, 3, 7, 64):
+            self.assertEqual(list(tokenize(io.StringIO(TEXT), chunk_size=size)), whole, size)
+            self.assertEqual(list(tokenize([TEXT[start:start + size] for start in range(0, len(TEXT), size)])),
+                             whole, size)
+        self.assertEqual(list(tokenize(TEXT.splitlines(True))), whole)
+
+    def test_corpus_stream(self):
+        with open(corpus_path('100k'), encoding='utf-8') as source:
+            text = source.read()
+        with open(corpus_path('100k'), encoding='utf-8') as source:
+            self.assertEqual(list(tokenize(source, chunk_size=4099)), list(tokenize(text)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,272 @@
+"""visemes timed against a recording, by aligning them to its energy and voicing
+
+    words = align_wav('line.wav', 'Bonjour, le monde.')
+    words[0]        # TimedWord('Bonjour', 0.36, 0.89, ['MBP', 'O', 'etc', 'etc', 'U'], [0.36, 0.37, ...])
+    write_pgo('line.pgo', words, sound_path='line.wav')     # see lipsync
+
+    python tools/phoneme_align.py line.wav line.txt      # 'word start end' lines
+    python app/src/main/python/lipsync.py line.txt line.pgo --sound line.wav --align
+
+The WAV file (PCM, any sample width and channel count the wave module
+reads) is read CHUNK_SECONDS at a time and cut into frames of
+FRAME_SECONDS, of which only two features are kept: the energy in dB and
+the zero crossings a second. Over the whole file those give every frame
+a share of silent, voiced and noisy (high energy with many crossings,
+as in a fricative), and every viseme a score from how its sounds are
+made up of those (VISEME_SOUNDS): a vowel wants voicing, FV noise,
+MBP a closure close to silence.
+
+The visemes of the transcript, like convertPhonemes gives them word by
+word, are strung together with an optional rest before, between and
+after the words, and the most likely way to go through them in order,
+one frame after the other, is found by a Viterbi search: every frame
+either stays on its viseme or moves to the next one (or over an optional
+rest), moving costing as much as a viseme lasting its average length. The
+search keeps only the BEAM visemes around the best one of the frame
+before, so both its time and the memory it needs to trace the way back
+grow with the length of the audio only, BEAM bytes a frame.
+
+Needs NumPy.
+"""
+import os
+import sys
+import wave
+from collections import namedtuple
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from lipsync import TimedWord  # noqa: E402
+from Phoneme import iter_text  # noqa: E402
+from phoneme_codes import VISEME_IDS, VISEMES  # noqa: E402
+from tokenizer import SPOKEN  # noqa: E402
+
+FRAME_SECONDS = 0.01
+CHUNK_SECONDS = 10.0
+# visemes the search keeps at every frame
+BEAM = 128
+# share of what moving costs given back to the ways ahead when centring the beam, see _search
+PROGRESS = 0.5
+
+# energy percentiles taken for silence and for full voice
+FLOOR_PERCENTILE = 10
+LEVEL_PERCENTILE = 95
+# zero crossings a second below which a frame is all voiced, above which all noisy
+VOICED_CROSSINGS = 1500.0
+NOISY_CROSSINGS = 4000.0
+
+# how much of each viseme is silent, voiced and noisy
+VISEME_SOUNDS = {
+    'rest': (0.90, 0.05, 0.05),
+    'MBP': (0.55, 0.40, 0.05),
+    'AI': (0.04, 0.92, 0.04),
+    'E': (0.04, 0.92, 0.04),
+    'O': (0.04, 0.92, 0.04),
+    'U': (0.04, 0.92, 0.04),
+    'WQ': (0.08, 0.86, 0.06),
+    'L': (0.08, 0.86, 0.06),
+    'FV': (0.25, 0.15, 0.60),
+    'etc': (0.30, 0.35, 0.35),
+}
+
+# energy in dB and zero crossings a second of every frame
+Features = namedtuple('Features', 'frame_seconds energy crossings')
+
+_REST = VISEME_IDS['rest']
+_SOUNDS = numpy.array([VISEME_SOUNDS[viseme] for viseme in VISEMES], numpy.float32)
+
+
+def _samples(data, width, channels):
+    """mono float32 samples in [-1, 1] of raw wave frames"""
+    if width == 1:
+        samples = (numpy.frombuffer(data, numpy.uint8).astype(numpy.float32) - 128) / 128
+    elif width == 3:
+        octets = numpy.frombuffer(data, numpy.uint8).reshape(-1, 3).astype(numpy.int32)
+        values = octets[:, 0] | octets[:, 1] << 8 | octets[:, 2] << 16
+        samples = numpy.where(values & 0x800000, values - 0x1000000, values).astype(numpy.float32) / 0x800000
+    else:
+        kind = {2: numpy.int16, 4: numpy.int32}.get(width)
+        if kind is None:
+            raise ValueError('%d byte samples are not supported' % width)
+        samples = numpy.frombuffer(data, kind).astype(numpy.float32) / (1 << (8 * width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _frame_features(frames, rate):
+    centred = frames - frames.mean(axis=1, keepdims=True)
+    energy = 10 * numpy.log10((centred * centred).mean(axis=1) + 1e-10)
+    signs = centred >= 0
+    crossings = (signs[:, 1:] != signs[:, :-1]).sum(axis=1) * (rate / frames.shape[1])
+    return energy.astype(numpy.float32), crossings.astype(numpy.float32)
+
+
+def iter_features(path, frame_seconds=FRAME_SECONDS, chunk_seconds=CHUNK_SECONDS):
+    """yield (energy, crossings) arrays for the frames of a WAV file, chunk_seconds of them at a time
+
+    The last frame is left out when the file ends part way through it.
+    """
+    with wave.open(path, 'rb') as source:
+        rate = source.getframerate()
+        width = source.getsampwidth()
+        channels = source.getnchannels()
+        hop = max(int(round(rate * frame_seconds)), 1)
+        chunk = hop * max(int(round(chunk_seconds / frame_seconds)), 1)
+        left = numpy.zeros(0, numpy.float32)
+        while True:
+            data = source.readframes(chunk)
+            if not data:
+                break
+            samples = _samples(data, width, channels)
+            if len(left):
+                samples = numpy.concatenate((left, samples))
+            usable = len(samples) // hop * hop
+            left = samples[usable:]
+            if usable:
+                yield _frame_features(samples[:usable].reshape(-1, hop), rate)
+
+
+def read_features(path, frame_seconds=FRAME_SECONDS, chunk_seconds=CHUNK_SECONDS):
+    """the Features of a WAV file, read chunk_seconds at a time"""
+    energy = []
+    crossings = []
+    for chunk_energy, chunk_crossings in iter_features(path, frame_seconds, chunk_seconds):
+        energy.append(chunk_energy)
+        crossings.append(chunk_crossings)
+    if not energy:
+        return Features(frame_seconds, numpy.zeros(0, numpy.float32), numpy.zeros(0, numpy.float32))
+    return Features(frame_seconds, numpy.concatenate(energy), numpy.concatenate(crossings))
+
+
+def sound_shares(features):
+    """(frames, 3) array of how silent, voiced and noisy every frame is, each row summing to 1"""
+    energy = features.energy
+    shares = numpy.empty((len(energy), 3), numpy.float32)
+    if not len(energy):
+        return shares
+    floor, level = numpy.percentile(energy, (FLOOR_PERCENTILE, LEVEL_PERCENTILE))
+    loud = numpy.clip((energy - floor) / max(level - floor, 1.0), 0, 1)
+    noisy = numpy.clip((features.crossings - VOICED_CROSSINGS) / (NOISY_CROSSINGS - VOICED_CROSSINGS), 0, 1)
+    shares[:, 0] = 1 - loud
+    shares[:, 1] = loud * (1 - noisy)
+    shares[:, 2] = loud * noisy
+    return shares
+
+
+def _states(transcript):
+    """the visemes to go through, which of them may be skipped, and (text, visemes, first state) of every word"""
+    pairs = transcript.iter_text(convert=True) if hasattr(transcript, 'iter_text') else iter_text(transcript, True)
+    states = [_REST]
+    words = []
+    for token, visemes in pairs:
+        if token.kind not in SPOKEN:
+            continue
+        words.append((token.text, visemes, len(states)))
+        states.extend(VISEME_IDS[viseme] for viseme in visemes)
+        states.append(_REST)
+    optional = numpy.zeros(len(states) + 1, bool)
+    optional[[state for state in range(len(states)) if states[state] == _REST]] = True
+    return numpy.array(states, numpy.intp), optional, words
+
+
+def _search(scores, states, optional, advance, beam):
+    """first frame of every state, plus the frame count, on the best way through states"""
+    frames = len(scores)
+    count = len(states)
+    width = min(beam, count)
+    stay_cost = numpy.log1p(-advance)
+    move_cost = numpy.log(advance)
+    # 0 where a state may be entered from two states back, over the optional one in between
+    jump_cost = numpy.full(count, -numpy.inf)
+    jump_cost[2:][optional[1:count - 1]] = 0
+    lows = numpy.zeros(frames, numpy.int64)
+    moves = numpy.zeros((frames, width), numpy.uint8)
+    score = numpy.full(width, -numpy.inf)
+    score[0] = scores[0, states[0]]
+    if width > 1 and optional[0]:
+        score[1] = scores[0, states[1]] + move_cost
+    # every way through pays about the same for its moves and stays in all, so a way that is
+    # ahead has paid more of it already; the beam follows the best score with PROGRESS of
+    # that given back, or it lags behind the best way and loses it
+    progress = numpy.arange(width) * (stay_cost - move_cost) * PROGRESS
+    low = 0
+    padded = numpy.full(2 * width + 2, -numpy.inf)
+    jumped = numpy.empty(width, bool)
+    moved = numpy.empty(width, bool)
+    for frame in range(1, frames):
+        shift = min(max(int((score + progress).argmax()) - width // 2, 0), count - width - low)
+        low += shift
+        lows[frame] = low
+        padded[2:width + 2] = score
+        stay = padded[2 + shift:2 + shift + width] + (stay_cost - move_cost)
+        step = padded[1 + shift:1 + shift + width]
+        jump = padded[shift:shift + width] + jump_cost[low:low + width]
+        numpy.greater(jump, step, out=jumped)
+        step = numpy.maximum(step, jump)
+        numpy.greater(step, stay, out=moved)
+        moves[frame] = moved
+        moves[frame] += moved & jumped
+        score = numpy.maximum(step, stay)
+        score += move_cost
+        score += scores[frame, states[low:low + width]]
+    # end on the last state, or on the one before when the last is an optional rest
+    ends = [state - low for state in (count - 1, count - 2 if optional[count - 1] else count - 1)
+            if 0 <= state - low < width]
+    state = low + (max(ends, key=score.__getitem__) if ends else int(score.argmax()))
+    starts = numpy.full(count + 1, frames, numpy.int64)
+    for frame in range(frames - 1, 0, -1):
+        move = int(moves[frame, state - lows[frame]])
+        if move:
+            starts[state - move + 1:state + 1] = frame
+            state -= move
+    starts[:state + 1] = 0
+    return starts
+
+
+def align(transcript, features, beam=BEAM):
+    """a lipsync.TimedWord, visemes timed, for every word of transcript against the Features of its recording
+
+    transcript is what Phoneme.iter_text takes, or has an iter_text()
+    of its own like a phoneme_columns.ColumnReader.
+    """
+    states, optional, words = _states(transcript)
+    frames = len(features.energy)
+    seconds = features.frame_seconds
+    if not frames:
+        return [TimedWord(text, 0.0, 0.0, visemes, [0.0] * len(visemes)) for text, visemes, _ in words]
+    shares = sound_shares(features)
+    scores = numpy.log(shares @ _SOUNDS.T + 1e-6)
+    # a viseme lasts the voiced frames shared out between the visemes, on average
+    visemes = max(int((states != _REST).sum()), 1)
+    advance = 1.0 / max(float((shares[:, 0] < 0.5).sum()) / visemes, 2.0)
+    starts = _search(scores, states, optional, advance, beam) * seconds
+    return [TimedWord(text, float(starts[first]), float(starts[first + len(visemes)]), visemes,
+                      [float(start) for start in starts[first:first + len(visemes)]])
+            for text, visemes, first in words]
+
+
+def align_wav(path, transcript, beam=BEAM, frame_seconds=FRAME_SECONDS, chunk_seconds=CHUNK_SECONDS):
+    """align(transcript, read_features(path)), for a WAV file at path"""
+    return align(transcript, read_features(path, frame_seconds, chunk_seconds), beam)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='time the words of a transcript against its recording')
+    parser.add_argument('sound', help='PCM WAV file')
+    parser.add_argument('transcript', help='text of the recording')
+    parser.add_argument('--beam', type=int, default=BEAM)
+    args = parser.parse_args(argv)
+    with open(args.transcript, encoding='utf-8') as source:
+        for word in align_wav(args.sound, source, args.beam):
+            print('%s %.3f %.3f' % (word.text, word.start, word.end))
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""transcribed corpora stored column by column, read back through mmap
+
+    with ColumnWriter('corpus.phc') as writer:
+        writer.write(tokenize(open('corpus.txt', encoding='utf-8')))
+
+    with ColumnReader('corpus.phc') as corpus:
+        len(corpus)                 # tokens
+        corpus.token(3)             # Token('word', 'chat', 12, 16) in 'Bonjour, le chat dort.'
+        corpus.phonemes(3)          # ['SH', 'AE0']
+        corpus.phoneme_codes        # memoryview of every phoneme ID, no copy
+        for token, visemes in corpus.iter_text(convert=True):
+            ...                     # like Phoneme.iter_text, without the rules
+
+    python tools/phoneme_columns.py script.txt script.phc
+
+A token is a row of the token table: its start in the source text, its
+length, its kind (an index in transcription.KINDS) and the number of its
+text in the word dictionary. Each distinct text is stored, and broken
+down, once. The phoneme IDs (see phoneme_codes) of every token follow
+each other in one column, their Preston Blair viseme IDs in another, and
+phoneme_offsets holds where those of each token start, one more entry
+than there are tokens.
+
+The writer appends the columns of every CHUNK_TOKENS tokens to temporary
+files, so a corpus of any size is written in bounded memory; close()
+puts them one after the other into the file. The reader maps the file
+and gives each column as a memoryview cast to its type, which slicing and
+numpy.frombuffer() use without copying, so reopening a file costs the
+same whatever its size.
+
+File layout (little endian):
+
+    header    magic b'PHCO', version (u16), section count (u16), token
+              count (u64), phoneme count (u64), word count (u32), unused (u32)
+    sections  (offset u64, length u64) of each section of SECTIONS, each
+              starting at a multiple of 8 bytes
+    starts u64, lengths u32, kinds u8, word_ids u32   one per token
+    phoneme_offsets u64                               one per token, plus one
+    phoneme_codes u8, viseme_codes u8                 one per phoneme
+    word_offsets u32, word_text                       the words, utf-8 one after the other
+    names     the phonemes, visemes and kinds the IDs stand for, utf-8,
+              space separated, one line each
+"""
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from Phoneme import breakdownWord  # noqa: E402
+from phoneme_codes import PHONEME_IDS, PHONEMES, VISEME_OF, VISEMES, CodedWords  # noqa: E402
+from tokenizer import SPOKEN, Token  # noqa: E402
+from transcription import KINDS  # noqa: E402
+
+CHUNK_TOKENS = 65536
+
+# the sections in file order, with the type of their items
+SECTIONS = (
+    ('starts', 'Q'),
+    ('lengths', 'I'),
+    ('kinds', 'B'),
+    ('word_ids', 'I'),
+    ('phoneme_offsets', 'Q'),
+    ('phoneme_codes', 'B'),
+    ('viseme_codes', 'B'),
+    ('word_offsets', 'I'),
+    ('word_text', 'B'),
+    ('names', 'B'),
+)
+# the sections written a chunk at a time
+_TOKEN_SECTIONS = SECTIONS[:7]
+
+_MAGIC = b'PHCO'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHQQII')
+_SECTION = struct.Struct('<QQ')
+_ALIGN = 8
+_KIND_IDS = {kind: code for code, kind in enumerate(KINDS)}
+
+
+class ColumnWriter(object):
+    """writes tokens and their phonemes to a column file, see the module docstring"""
+
+    def __init__(self, path, chunk_tokens=CHUNK_TOKENS):
+        self.path = path
+        self.chunk_tokens = chunk_tokens
+        self.tokens = 0
+        self.phonemes = 0
+        self._spools = {name: tempfile.TemporaryFile() for name, _ in _TOKEN_SECTIONS}
+        self._columns = {name: array(typecode) for name, typecode in _TOKEN_SECTIONS}
+        self._columns['phoneme_offsets'].append(0)
+        # the word dictionary: the number, text and phoneme IDs of every distinct text
+        self._ids = {}
+        self._words = []
+        self._codes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, tokens):
+        """add tokenizer.Tokens, their offsets counting from the start of the whole source"""
+        columns = self._columns
+        starts = columns['starts']
+        lengths = columns['lengths']
+        kinds = columns['kinds']
+        word_ids = columns['word_ids']
+        offsets = columns['phoneme_offsets']
+        codes = columns['phoneme_codes']
+        ids = self._ids
+        for token in tokens:
+            number = ids.get(token.text)
+            if number is None:
+                number = ids[token.text] = len(self._words)
+                self._words.append(token.text.encode('utf-8'))
+                self._codes.append(bytes(PHONEME_IDS[phoneme] for phoneme in breakdownWord(token.text))
+                                   if token.kind in SPOKEN else b'')
+            starts.append(token.start)
+            lengths.append(token.end - token.start)
+            kinds.append(_KIND_IDS[token.kind])
+            word_ids.append(number)
+            codes.frombytes(self._codes[number])
+            self.phonemes += len(self._codes[number])
+            offsets.append(self.phonemes)
+            if len(starts) >= self.chunk_tokens:
+                self._flush()
+
+    def _flush(self):
+        columns = self._columns
+        self.tokens += len(columns['starts'])
+        columns['viseme_codes'].frombytes(columns['phoneme_codes'].tobytes().translate(VISEME_OF))
+        for name, _ in _TOKEN_SECTIONS:
+            columns[name].tofile(self._spools[name])
+            del columns[name][:]
+
+    def close(self):
+        """write the file, replacing any at path"""
+        self._flush()
+        word_offsets = array('I', [0])
+        for word in self._words:
+            word_offsets.append(word_offsets[-1] + len(word))
+        names = '\n'.join(' '.join(names) for names in (PHONEMES, VISEMES, KINDS)).encode('utf-8')
+        tail = {'word_offsets': word_offsets.tobytes(), 'word_text': b''.join(self._words), 'names': names}
+        sizes = [self._spools[name].tell() if name in self._spools else len(tail[name]) for name, _ in SECTIONS]
+        table = []
+        offset = _HEADER.size + _SECTION.size * len(SECTIONS)
+        for size in sizes:
+            offset += -offset % _ALIGN
+            table.append((offset, size))
+            offset += size
+        with open(self.path + '.tmp', 'wb') as out:
+            out.write(_HEADER.pack(_MAGIC, _VERSION, len(SECTIONS), self.tokens, self.phonemes, len(self._words), 0))
+            for entry in table:
+                out.write(_SECTION.pack(*entry))
+            for (name, _), (offset, _) in zip(SECTIONS, table):
+                out.write(b'\0' * (offset - out.tell()))
+                if name in self._spools:
+                    spool = self._spools[name]
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, out)
+                else:
+                    out.write(tail[name])
+        os.replace(self.path + '.tmp', self.path)
+        self.discard()
+
+    def discard(self):
+        """drop what was written without writing the file"""
+        for spool in self._spools.values():
+            spool.close()
+
+
+def write_columns(path, tokens, chunk_tokens=CHUNK_TOKENS):
+    """write tokens to a column file at path, returning the token count"""
+    with ColumnWriter(path, chunk_tokens) as writer:
+        writer.write(tokens)
+    return writer.tokens
+
+
+class ColumnReader(object):
+    """read-only view of a column file, mapped into memory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as source:
+            self._data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self._tokens, self._phonemes, self._word_count, _ = _HEADER.unpack_from(self._data, 0)
+        if magic != _MAGIC or version != _VERSION or count != len(SECTIONS):
+            self._data.close()
+            raise ValueError('%s is not a version %d column file' % (path, _VERSION))
+        view = memoryview(self._data)
+        self._views = [view]
+        for number, (name, typecode) in enumerate(SECTIONS):
+            offset, size = _SECTION.unpack_from(self._data, _HEADER.size + _SECTION.size * number)
+            column = view[offset:offset + size].cast(typecode)
+            self._views.append(column)
+            setattr(self, name, column)
+        phonemes, visemes, kinds = bytes(self.names).decode('utf-8').split('\n')
+        self.phoneme_names = tuple(phonemes.split())
+        self.viseme_names = tuple(visemes.split())
+        self.kind_names = tuple(kinds.split())
+        self._word_cache = {}
+
+    def __len__(self):
+        return self._tokens
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """unmap the file; slices taken from the columns have to be released first"""
+        for view in reversed(self._views):
+            view.release()
+        self._data.close()
+
+    def word(self, number):
+        """text of word number of the dictionary"""
+        word = self._word_cache.get(number)
+        if word is None:
+            word = self._word_cache[number] = bytes(
+                self.word_text[self.word_offsets[number]:self.word_offsets[number + 1]]).decode('utf-8')
+        return word
+
+    def token(self, index):
+        """the tokenizer.Token of token index"""
+        if index < 0:
+            index += self._tokens
+        start = self.starts[index]
+        return Token(self.kind_names[self.kinds[index]], self.word(self.word_ids[index]),
+                     start, start + self.lengths[index])
+
+    def token_codes(self, index, visemes=False):
+        """the phoneme (or viseme) IDs of token index, as a slice of their column"""
+        if index < 0:
+            index += self._tokens
+        column = self.viseme_codes if visemes else self.phoneme_codes
+        return column[self.phoneme_offsets[index]:self.phoneme_offsets[index + 1]]
+
+    def phonemes(self, index):
+        names = self.phoneme_names
+        return [names[code] for code in self.token_codes(index)]
+
+    def visemes(self, index):
+        names = self.viseme_names
+        return [names[code] for code in self.token_codes(index, visemes=True)]
+
+    def __getitem__(self, index):
+        """(Token, phonemes) of token index"""
+        return self.token(index), self.phonemes(index)
+
+    def __iter__(self):
+        return self.iter_text()
+
+    def iter_text(self, convert=False):
+        """yield (token, phonemes) for every token, like Phoneme.iter_text
+
+        With convert set the visemes come instead of the phonemes.
+        """
+        names = self.viseme_names if convert else self.phoneme_names
+        column = self.viseme_codes if convert else self.phoneme_codes
+        offsets = self.phoneme_offsets
+        kind_names = self.kind_names
+        starts, lengths, kinds, word_ids = self.starts, self.lengths, self.kinds, self.word_ids
+        word = self.word
+        for index in range(self._tokens):
+            start = starts[index]
+            yield (Token(kind_names[kinds[index]], word(word_ids[index]), start, start + lengths[index]),
+                   [names[code] for code in column[offsets[index]:offsets[index + 1]]])
+
+    def coded(self, convert=False):
+        """phoneme_codes.CodedWords of every token, over the mapped columns
+
+        They are read-only and name the IDs with phoneme_codes.PHONEMES or
+        VISEMES, so that to_visemes() works; a file written with other
+        names raises ValueError.
+        """
+        if self.phoneme_names != PHONEMES or self.viseme_names != VISEMES:
+            raise ValueError('%s does not number phonemes and visemes like phoneme_codes' % self.path)
+        if convert:
+            return CodedWords(self.viseme_codes, self.phoneme_offsets, VISEMES)
+        return CodedWords(self.phoneme_codes, self.phoneme_offsets, PHONEMES)
+
+
+def main(argv=None):
+    import argparse
+
+    from tokenizer import tokenize
+
+    parser = argparse.ArgumentParser(description='transcribe texts into a phoneme column file (.phc)')
+    parser.add_argument('inputs', nargs='+', help='texts, read one after the other as one source')
+    parser.add_argument('output', help='column file to write')
+    args = parser.parse_args(argv)
+    sources = [open(path, encoding='utf-8') for path in args.inputs]
+    try:
+        count = write_columns(args.output, tokenize(line for source in sources for line in source))
+    finally:
+        for source in sources:
+            source.close()
+    print('%d tokens written to %s' % (count, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""batch transcription of each distinct word once, expanded back to every token
+
+    with DedupPlanner(format_line, jobs=4) as planner:
+        planner.add(words)          # any number of times, words in order
+        planner.write(out)          # format_line(word, phonemes) + '\\n' for every word added
+    planner.stats()                 # {'tokens': 1000965, 'words': 420, 'dedup': 2383.2, ...}
+
+A corpus of millions of tokens is made of a few tens of thousands of
+distinct words. The planner reads the tokens as they come and interns
+them: every distinct spelling gets a number, and the tokens are kept as
+an array of those numbers only, spooled to a temporary file every
+chunk_words tokens. The spellings are transcribed by their normalized
+form (lower cased and folded like breakdownWord does), so 'Les' and 'les'
+are worked out once, by phoneme_batch.breakdownBatch in chunk_words long
+batches, spread over jobs worker processes when there are more than one.
+
+At most vocabulary_cap spellings are held in memory: past that the ones
+held so far are spilled, transcribed and their output lines written to
+a second temporary file, then forgotten, so a spelling met again after a
+spill is transcribed again. The end offset of every line is spooled to
+a third temporary file. write() spills what is left and expands the token
+numbers back to output lines, in token order, through those offsets, both
+files mapped into memory.
+
+A cap too low for the vocabulary makes the planner spill over and over,
+transcribing small batches of words it has seen a moment before. When,
+from the second spill on, fewer than MIN_DEDUP tokens came for each word
+transcribed so far, the planner stops interning: the rest of the tokens
+are transcribed as they come, chunk_words at a time (a word repeated
+within a chunk still once), and stats() says so under 'direct'.
+
+stats() tells how many tokens there were for each word transcribed (the
+dedup ratio), how long the transcription took and about how much longer
+breakdownWord on every token would have taken, from its time on a sample
+of SAMPLE_WORDS words.
+"""
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import Phoneme  # noqa: E402
+from Phoneme import breakdownWord  # noqa: E402
+from phoneme_batch import breakdownBatch  # noqa: E402
+from phoneme_codes import PHONEMES  # noqa: E402
+from unicode_hammer import fold_to_latin1  # noqa: E402
+
+# distinct spellings held in memory before they are spilled
+VOCABULARY_CAP = 1 << 18
+# tokens spooled, and words sent to a worker, at a time
+CHUNK_WORDS = 5000
+# words timed through breakdownWord one by one, to tell the time saved
+SAMPLE_WORDS = 256
+# tokens per word transcribed below which spilling shows dedup is not paying off
+MIN_DEDUP = 2.0
+
+
+def normalize(word):
+    """the form of word its phonemes depend on"""
+    return fold_to_latin1(word.lower())
+
+
+def breakdown_words(words):
+    """phoneme IDs (bytes) of every word, in a worker process"""
+    batch = breakdownBatch(words)
+    codes = bytes(batch.codes)
+    offsets = [int(offset) for offset in batch.offsets]
+    return [codes[offsets[index]:offsets[index + 1]] for index in range(len(words))]
+
+
+class DedupPlanner(object):
+    """transcribes each distinct word of a token stream once, see the module docstring"""
+
+    def __init__(self, format_line, jobs=1, vocabulary_cap=VOCABULARY_CAP, chunk_words=CHUNK_WORDS):
+        if vocabulary_cap < 1:
+            raise ValueError('vocabulary cap must be at least 1, got %r' % (vocabulary_cap,))
+        self.format_line = format_line
+        self.jobs = jobs
+        self.vocabulary_cap = vocabulary_cap
+        self.chunk_words = chunk_words
+        self.tokens = 0
+        self.words = 0
+        self.spills = 0
+        self.seconds = 0.0
+        # set once a spill showed dedup not paying off, see _add_direct
+        self.direct = False
+        # seconds breakdownWord takes for a word, timed on the first spill
+        self.word_seconds = None
+        self._pool = None
+        self._numbers = {}
+        self._spellings = []
+        self._chunk = array('Q')
+        self._token_file = tempfile.TemporaryFile()
+        self._line_file = tempfile.TemporaryFile()
+        self._offset_file = tempfile.TemporaryFile()
+        array('Q', [0]).tofile(self._offset_file)
+        # lines written to _line_file, and where the last one ends
+        self._lines = 0
+        self._line_end = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """shut down the workers and drop the temporary files"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._token_file.close()
+        self._line_file.close()
+        self._offset_file.close()
+
+    def add(self, words):
+        """take in the next words of the stream"""
+        if self.direct:
+            self._add_direct(words)
+            return
+        numbers = self._numbers
+        spellings = self._spellings
+        chunk = self._chunk
+        words = iter(words)
+        for word in words:
+            number = numbers.get(word)
+            if number is None:
+                if len(numbers) >= self.vocabulary_cap:
+                    self._spill()
+                    if self.spills > 1 and self.tokens + len(chunk) < MIN_DEDUP * self.words:
+                        self.direct = True
+                        self._add_direct(chain([word], words))
+                        return
+                number = numbers[word] = self._lines + len(spellings)
+                spellings.append(word)
+            chunk.append(number)
+            if len(chunk) >= self.chunk_words:
+                self.tokens += len(chunk)
+                chunk.tofile(self._token_file)
+                del chunk[:]
+
+    def _add_direct(self, words):
+        """take in words without interning them, a line for every token"""
+        spellings = self._spellings
+        chunk = self._chunk
+        for word in words:
+            chunk.append(self._lines + len(spellings))
+            spellings.append(word)
+            if len(spellings) >= self.chunk_words:
+                self._spill()
+            if len(chunk) >= self.chunk_words:
+                self.tokens += len(chunk)
+                chunk.tofile(self._token_file)
+                del chunk[:]
+
+    def _transcribe(self, words):
+        """phoneme IDs of words, by chunk_words long batches"""
+        batches = [words[first:first + self.chunk_words] for first in range(0, len(words), self.chunk_words)]
+        if self.jobs > 1 and len(batches) > 1:
+            if self._pool is None:
+                # the workers look words up in the same lexicon, opened again by path
+                self._pool = ProcessPoolExecutor(self.jobs, initializer=Phoneme.use_lexicon,
+                                                 initargs=(getattr(Phoneme._lexicon, 'path', None),))
+            results = self._pool.map(breakdown_words, batches)
+        else:
+            results = map(breakdown_words, batches)
+        return [codes for result in results for codes in result]
+
+    def _spill(self):
+        """transcribe the spellings held, write their lines and forget them"""
+        spellings = self._spellings
+        if not spellings:
+            return
+        started = time.perf_counter()
+        forms = list(dict.fromkeys(map(normalize, spellings)))
+        phonemes = dict(zip(forms, self._transcribe(forms)))
+        self.seconds += time.perf_counter() - started
+        if self.word_seconds is None:
+            sample = forms[:SAMPLE_WORDS]
+            # the first call may load the rules
+            breakdownWord(sample[0])
+            started = time.perf_counter()
+            for form in sample:
+                breakdownWord(form)
+            self.word_seconds = (time.perf_counter() - started) / len(sample)
+        self.words += len(forms)
+        self.spills += 1
+        format_line = self.format_line
+        offsets = array('Q')
+        end = self._line_end
+        lines = []
+        for word in spellings:
+            line = (format_line(word, [PHONEMES[code] for code in phonemes[normalize(word)]]) + '\n').encode('utf-8')
+            end += len(line)
+            offsets.append(end)
+            lines.append(line)
+        self._line_file.write(b''.join(lines))
+        offsets.tofile(self._offset_file)
+        self._lines += len(spellings)
+        self._line_end = end
+        self._numbers.clear()
+        del spellings[:]
+
+    def write(self, out):
+        """write the line of every word added, in order, to a text stream out"""
+        self._spill()
+        self.tokens += len(self._chunk)
+        self._chunk.tofile(self._token_file)
+        del self._chunk[:]
+        self._line_file.flush()
+        self._offset_file.flush()
+        if not self.tokens:
+            return
+        self._token_file.seek(0)
+        with mmap.mmap(self._line_file.fileno(), 0, access=mmap.ACCESS_READ) as lines, \
+                mmap.mmap(self._offset_file.fileno(), 0, access=mmap.ACCESS_READ) as offset_data:
+            offsets = memoryview(offset_data).cast('Q')
+            try:
+                while True:
+                    numbers = array('Q')
+                    numbers.frombytes(self._token_file.read(self.chunk_words * numbers.itemsize))
+                    if not numbers:
+                        break
+                    out.write(b''.join([lines[offsets[number]:offsets[number + 1]]
+                                        for number in numbers]).decode('utf-8'))
+            finally:
+                offsets.release()
+
+    def stats(self):
+        """token and word counts, dedup ratio, seconds spent and saved, and whether it went direct"""
+        every_token = (self.word_seconds or 0.0) * self.tokens
+        return {
+            'tokens': self.tokens,
+            'spellings': self._lines,
+            'words': self.words,
+            'spills': self.spills,
+            'dedup': self.tokens / self.words if self.words else 0.0,
+            'seconds': self.seconds,
+            'saved_seconds': every_token - self.seconds,
+            'direct': self.direct,
+        }
+
+
+def write_deduplicated(words, out, format_line, jobs=1, vocabulary_cap=VOCABULARY_CAP, chunk_words=CHUNK_WORDS):
+    """write format_line(word, phonemes) of every word to out, transcribing each distinct one once
+
+    Returns the planner's stats().
+    """
+    with DedupPlanner(format_line, jobs, vocabulary_cap, chunk_words) as planner:
+        planner.add(words)
+        planner.write(out)
+    return planner.stats()
@@ -0,0 +1,272 @@
+"""words found by their pronunciation: homophones, rhymes, phoneme prefixes and runs
+
+    index = PhonemeIndex(vocabulary)    # every word broken down once
+    index.homophones('vert')            # ['vert', 'verre', 'vers']
+    index.rhymes('bonjour')             # words ending like it from its last vowel
+    index.starting_with(['B', 'AO0'])   # words whose phonemes start so
+    index.containing(['S', 'IH0'])      # words whose phonemes hold that run
+    index.add(['toujours']); index.remove(['vers'])
+    index.save('words.phx'); index = load('words.phx')
+
+Every word gets a number, its position in words, and its phonemes are
+kept as a bytes string of phoneme IDs (see phoneme_codes), one byte a
+phoneme. On top of those:
+
+- by_phonemes lists the word numbers sorted by their phonemes: the words
+  pronounced exactly so, or starting so, are a range of it, found by
+  bisection;
+- by_ending lists them sorted by their phonemes read backwards, which
+  makes it a suffix trie laid flat: the words ending with some phonemes,
+  the rhymes, are a range of it too;
+- postings holds, for every run of 1 to NGRAM phonemes, an array of the
+  numbers of the words holding it, in increasing order; the run of a
+  query is looked for in the words of its rarest NGRAM long run only.
+
+Adding a word appends it and inserts its number in both sorted arrays and
+its runs' postings; removing one takes its number out of them, found by
+bisection, and blanks its place until save(), which writes the index
+without the gaps, sorted arrays and postings included, so that load()
+has no sorting to do.
+"""
+import marshal
+import os
+import sys
+from array import array
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from phoneme_batch import breakdownBatch  # noqa: E402
+from phoneme_codes import PHONEME_IDS, PHONEMES  # noqa: E402
+
+# longest run of phonemes with postings of its own
+NGRAM = 3
+
+# part of the header of a saved index, bump it when the layout changes
+_VERSION = 1
+_MAGIC = 'PHIX'
+# above every phoneme ID, so prefix + _TOP is past every sequence starting with prefix
+_TOP = b'\xff'
+_VOWELS = frozenset(code for code, phoneme in enumerate(PHONEMES) if phoneme[-1].isdigit())
+
+
+def _codes(phonemes):
+    """bytes of the IDs of phonemes"""
+    return bytes(PHONEME_IDS[phoneme] for phoneme in phonemes)
+
+
+def _grams(codes):
+    """the distinct runs of 1 to NGRAM phonemes in codes"""
+    return {codes[start:start + size] for size in range(1, NGRAM + 1)
+            for start in range(len(codes) - size + 1)}
+
+
+def _first(order, key_of, target):
+    """position in order of the first number whose key_of is not below target"""
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        if key_of(order[middle]) < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class PhonemeIndex(object):
+    """the words of a vocabulary by pronunciation, see the module docstring"""
+
+    def __init__(self, words=()):
+        self.words = []
+        self.codes = []
+        self.by_phonemes = array('I')
+        self.by_ending = array('I')
+        self.postings = {}
+        self._numbers = {}
+        self._removed = 0
+        self.add(words)
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __contains__(self, word):
+        return word in self._numbers
+
+    def __iter__(self):
+        return iter(self._numbers)
+
+    def _ending(self, number):
+        return self.codes[number][::-1]
+
+    def add(self, words):
+        """index the words not in it yet, returning how many there were"""
+        words = [word for word in dict.fromkeys(words) if word not in self._numbers]
+        if not words:
+            return 0
+        batch = breakdownBatch(words)
+        codes = bytes(batch.codes)
+        offsets = batch.offsets
+        first = len(self.words)
+        self.words.extend(words)
+        self.codes.extend(codes[offsets[index]:offsets[index + 1]] for index in range(len(words)))
+        numbers = range(first, len(self.words))
+        for number in numbers:
+            self._numbers[self.words[number]] = number
+            for gram in _grams(self.codes[number]):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(number)
+        if len(words) > len(self.by_phonemes) // 16:
+            # many words at once: sorting again beats inserting them one by one
+            live = [number for number in range(len(self.words)) if self.words[number] is not None]
+            self.by_phonemes = array('I', sorted(live, key=self.codes.__getitem__))
+            self.by_ending = array('I', sorted(live, key=self._ending))
+        else:
+            for number in numbers:
+                self.by_phonemes.insert(_first(self.by_phonemes, self.codes.__getitem__, self.codes[number]), number)
+                self.by_ending.insert(_first(self.by_ending, self._ending, self._ending(number)), number)
+        return len(words)
+
+    def remove(self, words):
+        """take words out of the index, returning how many were in it"""
+        removed = 0
+        for word in words:
+            number = self._numbers.pop(word, None)
+            if number is None:
+                continue
+            codes = self.codes[number]
+            for order, key_of, key in ((self.by_phonemes, self.codes.__getitem__, codes),
+                                       (self.by_ending, self._ending, codes[::-1])):
+                position = _first(order, key_of, key)
+                while order[position] != number:
+                    position += 1
+                del order[position]
+            for gram in _grams(codes):
+                posting = self.postings[gram]
+                # postings are in word number order, see add() and compact()
+                del posting[bisect_left(posting, number)]
+                if not posting:
+                    del self.postings[gram]
+            self.words[number] = None
+            self.codes[number] = None
+            removed += 1
+        self._removed += removed
+        return removed
+
+    def phonemes(self, word):
+        """the phonemes of an indexed word, or None"""
+        number = self._numbers.get(word)
+        if number is None:
+            return None
+        return [PHONEMES[code] for code in self.codes[number]]
+
+    def _range(self, order, key_of, prefix, exact=False):
+        low = _first(order, key_of, prefix)
+        high = _first(order, key_of, prefix + _TOP) if not exact else _first(order, key_of, prefix + b'\0')
+        words = self.words
+        return [words[number] for number in order[low:high]]
+
+    def lookup(self, phonemes):
+        """the words pronounced exactly phonemes"""
+        return self._range(self.by_phonemes, self.codes.__getitem__, _codes(phonemes), exact=True)
+
+    def homophones(self, word):
+        """the words pronounced like word (itself included when indexed)"""
+        number = self._numbers.get(word)
+        if number is not None:
+            codes = self.codes[number]
+        else:
+            batch = breakdownBatch([word])
+            codes = bytes(batch.codes)
+        return self._range(self.by_phonemes, self.codes.__getitem__, codes, exact=True)
+
+    def starting_with(self, phonemes):
+        """the words whose phonemes start with phonemes"""
+        return self._range(self.by_phonemes, self.codes.__getitem__, _codes(phonemes))
+
+    def ending_with(self, phonemes):
+        """the words whose phonemes end with phonemes, sorted by their phonemes read backwards"""
+        return self._range(self.by_ending, self._ending, _codes(phonemes)[::-1])
+
+    def rhymes(self, word, vowels=1):
+        """the words ending like word from its vowels-th last vowel (word left out)
+
+        With fewer vowels in word than that, all of its phonemes have to match.
+        """
+        number = self._numbers.get(word)
+        codes = self.codes[number] if number is not None else bytes(breakdownBatch([word]).codes)
+        start = len(codes)
+        while vowels and start:
+            start -= 1
+            if codes[start] in _VOWELS:
+                vowels -= 1
+        if vowels:
+            start = 0
+        return [other for other in self._range(self.by_ending, self._ending, codes[start:][::-1]) if other != word]
+
+    def containing(self, phonemes):
+        """the words whose phonemes hold phonemes as a run, in the order they were added"""
+        codes = _codes(phonemes)
+        if len(codes) <= NGRAM:
+            posting = self.postings.get(codes, ())
+            return [self.words[number] for number in posting]
+        postings = []
+        for start in range(len(codes) - NGRAM + 1):
+            posting = self.postings.get(codes[start:start + NGRAM])
+            if posting is None:
+                return []
+            postings.append(posting)
+        words = self.words
+        all_codes = self.codes
+        return [words[number] for number in min(postings, key=len) if codes in all_codes[number]]
+
+    def compact(self):
+        """renumber the words to close the gaps removals left"""
+        if not self._removed:
+            return
+        live = [number for number in range(len(self.words)) if self.words[number] is not None]
+        renumber = {old: new for new, old in enumerate(live)}
+        self.words = [self.words[number] for number in live]
+        self.codes = [self.codes[number] for number in live]
+        self._numbers = {word: number for number, word in enumerate(self.words)}
+        self.by_phonemes = array('I', [renumber[number] for number in self.by_phonemes])
+        self.by_ending = array('I', [renumber[number] for number in self.by_ending])
+        self.postings = {gram: array('I', [renumber[number] for number in posting])
+                         for gram, posting in self.postings.items()}
+        self._removed = 0
+
+    def save(self, path):
+        """write the index to path, for load() to read back"""
+        self.compact()
+        data = marshal.dumps(((_MAGIC, _VERSION, PHONEMES), self.words, self.codes,
+                              self.by_phonemes.tobytes(), self.by_ending.tobytes(),
+                              {gram: posting.tobytes() for gram, posting in self.postings.items()}))
+        with open(path + '.tmp', 'wb') as out:
+            out.write(data)
+        os.replace(path + '.tmp', path)
+
+
+def _array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    return values
+
+
+def load(path):
+    """the PhonemeIndex save() wrote to path"""
+    with open(path, 'rb') as source:
+        try:
+            key, words, codes, by_phonemes, by_ending, postings = marshal.loads(source.read())
+        except (EOFError, ValueError, TypeError):
+            raise ValueError('%s is not a phoneme index' % path)
+    if key != (_MAGIC, _VERSION, PHONEMES):
+        raise ValueError('%s is not a version %d phoneme index of these phonemes' % (path, _VERSION))
+    index = PhonemeIndex()
+    index.words = words
+    index.codes = codes
+    index._numbers = {word: number for number, word in enumerate(words)}
+    index.by_phonemes = _array('I', by_phonemes)
+    index.by_ending = _array('I', by_ending)
+    index.postings = {gram: _array('I', posting) for gram, posting in postings.items()}
+    return index
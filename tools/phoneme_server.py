@@ -0,0 +1,330 @@
+"""local transcription service speaking line-delimited JSON over TCP or a Unix socket
+
+    python tools/phoneme_server.py --port 8765
+    python tools/phoneme_server.py --unix /tmp/phoneme.sock --batch-size 512 --max-wait-ms 5
+
+Each request is one JSON object on a line, each response is one line too,
+in the order the requests came in on that connection:
+
+    {"id": 1, "op": "breakdown", "word": "bonjour"}
+    {"id": 1, "result": ["B", "AO0", "NG", "JH", "UW0"]}
+    {"id": 2, "op": "convert", "words": ["le", "monde"]}
+    {"id": 2, "result": [["L", "E"], ["MBP", "O", "etc", "etc"]]}
+    {"id": 3, "op": "stats"}
+    {"id": 3, "result": {"queue_depth": 0, "batches": 2, ...}}
+
+"id" is optional and echoed back; a bad request gets {"id": ..., "error":
+...}, and so does a line longer than LINE_LIMIT bytes or a "words" list
+longer than max_words, which is skipped. Words from every connection go
+through one MicroBatcher: they wait in a bounded queue and are
+transcribed together, up to batch_size words or max_wait seconds after
+the first one, whichever comes first. When the queue is full, reading
+from the connections stops until it drains, so a flood of requests slows
+its senders down instead of growing memory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from phoneme_cache import PhonemeCache  # noqa: E402
+
+BREAKDOWN = 'breakdown'
+CONVERT = 'convert'
+STATS = 'stats'
+
+# latencies kept for the percentiles of stats()
+LATENCY_WINDOW = 10000
+# longest request line read, in bytes
+LINE_LIMIT = 1 << 20
+# most words in one request
+MAX_WORDS = 1024
+# requests of a connection in flight at once
+PIPELINE = 128
+
+
+class MicroBatcher(object):
+    """gathers single items into batches for a function taking a list
+
+    function(items) must return one result per item; it runs in the event
+    loop's default executor so the loop stays responsive meanwhile.
+    """
+
+    def __init__(self, function, batch_size=256, max_wait=0.002, queue_size=4096):
+        if batch_size < 1 or queue_size < 1:
+            raise ValueError('batch_size and queue_size must be at least 1')
+        self.function = function
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(queue_size)
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        """result of function for item, waiting for room in the queue first"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(None, self.function, [item for item, _, _ in batch])
+            except Exception as error:
+                self.errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            finished = time.perf_counter()
+            for (_, future, submitted), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+                self._latencies.append(finished - submitted)
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self):
+        """queue depth, batch counts and latency percentiles in milliseconds"""
+        latencies = sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return 1000.0 * latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'batches': self.batches,
+            'items': self.items,
+            'errors': self.errors,
+            'mean_batch': self.items / self.batches if self.batches else 0.0,
+            'latency_ms': {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99)},
+        }
+
+
+class PhonemeServer(object):
+    """breakdown and convert requests from any number of connections, micro-batched"""
+
+    def __init__(self, batch_size=256, max_wait=0.002, queue_size=4096, cache_size=65536, max_words=MAX_WORDS):
+        self.cache = PhonemeCache(cache_size)
+        self.max_words = max_words
+        self.batcher = MicroBatcher(self._transcribe, batch_size, max_wait, queue_size)
+        self.connections = 0
+        self._server = None
+        self._handlers = set()
+
+    def _transcribe(self, items):
+        breakdown = self.cache.breakdownWord
+        convert = self.cache.convertPhonemes
+        return [list(convert(word) if op == CONVERT else breakdown(word)) for op, word in items]
+
+    def stats(self):
+        stats = self.batcher.stats()
+        stats['connections'] = self.connections
+        stats['cache'] = self.cache.stats()
+        return stats
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        self.batcher.start()
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._connected, unix_path, limit=LINE_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._connected, host, port, limit=LINE_LIMIT)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        handlers = list(self._handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self.batcher.stop()
+
+    async def _answer(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+            request_id = request.get('id')
+            op = request.get('op')
+            if op == STATS:
+                result = self.stats()
+            elif op in (BREAKDOWN, CONVERT):
+                if 'words' in request:
+                    words = request['words']
+                    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+                        raise ValueError('"words" must be a list of strings')
+                    if len(words) > self.max_words:
+                        raise ValueError('at most %d words a request, got %d' % (self.max_words, len(words)))
+                    result = await asyncio.gather(*[self.batcher.submit((op, word)) for word in words])
+                else:
+                    word = request.get('word')
+                    if not isinstance(word, str):
+                        raise ValueError('"word" must be a string')
+                    result = await self.batcher.submit((op, word))
+            else:
+                raise ValueError('unknown op %r' % (op,))
+        except Exception as error:
+            return {'id': request_id, 'error': str(error)}
+        return {'id': request_id, 'result': result}
+
+    def _connected(self, reader, writer):
+        # a task of our own rather than a coroutine for asyncio to run, so that
+        # close() can cancel it and collect the CancelledError itself
+        handler = asyncio.ensure_future(self._handle(reader, writer))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        # answers in request order; bounded so a client that never reads stalls itself
+        answers = asyncio.Queue(PIPELINE)
+
+        async def respond():
+            while True:
+                answer = await answers.get()
+                if answer is None:
+                    return
+                writer.write(json.dumps(await answer, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        responder = asyncio.ensure_future(respond())
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as error:
+                    line = error.partial
+                except asyncio.LimitOverrunError:
+                    await _skip_line(reader)
+                    answer = _answered({'id': None, 'error': 'request longer than %d bytes' % LINE_LIMIT})
+                    if not await _put(answers, answer, responder):
+                        break
+                    continue
+                if not line:
+                    break
+                if line.strip():
+                    answer = asyncio.ensure_future(self._answer(line))
+                    if not await _put(answers, answer, responder):
+                        answer.cancel()
+                        break
+                if not line.endswith(b'\n'):
+                    break
+            if await _put(answers, None, responder):
+                await responder
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            responder.cancel()
+            self.connections -= 1
+            writer.close()
+
+
+def _answered(response):
+    """a future already holding response, to queue with the others"""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(response)
+    return future
+
+
+async def _put(answers, answer, responder):
+    """queue answer, unless the responder stops first; whether it was queued"""
+    if not answers.full():
+        answers.put_nowait(answer)
+        return True
+    put = asyncio.ensure_future(answers.put(answer))
+    await asyncio.wait((put, responder), return_when=asyncio.FIRST_COMPLETED)
+    if put.done():
+        return True
+    put.cancel()
+    return False
+
+
+async def _skip_line(reader):
+    """read past the end of a line too long for the reader's limit"""
+    while True:
+        try:
+            await reader.readuntil(b'\n')
+            return
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)
+
+
+async def serve(host='127.0.0.1', port=8765, unix_path=None, **options):
+    """run a PhonemeServer until cancelled"""
+    server = PhonemeServer(**options)
+    listening = await server.start(host, port, unix_path)
+    where = unix_path or '%s:%d' % (host, port)
+    sys.stderr.write('listening on %s\n' % where)
+    try:
+        await listening.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--batch-size', type=int, default=256, help='most words per batch (default 256)')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help='longest a word waits for its batch to fill (default 2)')
+    parser.add_argument('--queue-size', type=int, default=4096,
+                        help='words waiting at most before connections are throttled (default 4096)')
+    parser.add_argument('--max-words', type=int, default=MAX_WORDS,
+                        help='most words in one request (default %d)' % MAX_WORDS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, batch_size=args.batch_size,
+                          max_wait=args.max_wait_ms / 1000.0, queue_size=args.queue_size,
+                          max_words=args.max_words))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
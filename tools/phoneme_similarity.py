@@ -0,0 +1,379 @@
+"""closest words by pronunciation: a weighted phoneme edit distance and a BK-tree over it
+
+    index = SimilarityIndex(vocabulary, jobs=4)     # every word broken down once
+    index.nearest('bonjourr', 5)                    # [(2, 'bonjour'), (5, 'bonsoir'), ...]
+    index.within('chapo', 2)                        # every word at distance 2 or less
+    phonemeDistance(['B', 'AO0'], ['P', 'AO0'])     # 1
+    index.save('words.phs'); index = load('words.phs')
+
+The distance between two phoneme sequences is the cheapest way to edit
+one into the other: SAME_VISEME to change a phoneme for another of the
+same Preston Blair viseme (Phoneme.phoneme_conversion), which looks and
+sounds close, SUBSTITUTE for any other, INDEL to add or drop one. These
+costs make it a metric, so the BK-tree holds: every distinct pronunciation
+is a node, the children of a node are keyed by their distance to it, and
+a query at distance d from a node only needs the children keyed d -
+radius to d + radius. A query is a word, broken down, or a list of
+phonemes.
+
+The tree is built in bulk: the first pronunciation of a group is its
+node and the others are split by their distance to it into the groups of
+its children, so each pronunciation is compared once per level. With
+NumPy the distances from a node to a large group are worked out for the
+whole group at once, one phoneme position at a time; queries likewise
+take all the nodes of a level of the tree together. With jobs above 1 the
+groups under the root are built in as many processes.
+
+The tree is kept as flat arrays: the pronunciations in node order, the
+children of node i at children[first_child[i]:first_child[i + 1]] with
+their keys in child_distance, and its words at
+words[first_word[i]:first_word[i + 1]]. save() writes those with
+marshal.
+"""
+import heapq
+import marshal
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from Phoneme import phoneme_conversion  # noqa: E402
+from phoneme_batch import breakdownBatch  # noqa: E402
+from phoneme_codes import PHONEME_IDS, PHONEMES  # noqa: E402
+from phoneme_index import _array  # noqa: E402
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INDEL = 2
+SUBSTITUTE = 2
+SAME_VISEME = 1
+
+# groups smaller than this are compared one pronunciation at a time
+VECTOR_MIN = 8
+
+_VERSION = 1
+_MAGIC = 'PHSI'
+_FAR = 1 << 30
+
+# _COSTS[a][b] is the cost of changing phoneme ID a for b
+_COSTS = [bytes(0 if first == second
+                else SAME_VISEME if phoneme_conversion[first] == phoneme_conversion[second]
+                else SUBSTITUTE
+                for second in PHONEMES).ljust(256, bytes((SUBSTITUTE,)))
+          for first in PHONEMES]
+_COSTS += [bytes((SUBSTITUTE,)) * 256] * (256 - len(_COSTS))
+_COST_ARRAY = (numpy.frombuffer(b''.join(_COSTS), dtype=numpy.uint8).reshape(256, 256).astype(numpy.int16)
+               if numpy is not None else None)
+
+
+def distance(first, second):
+    """weighted edit distance between two bytes strings of phoneme IDs"""
+    # what both start or end with costs nothing
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    first_end, second_end = len(first), len(second)
+    while first_end > start and second_end > start and first[first_end - 1] == second[second_end - 1]:
+        first_end -= 1
+        second_end -= 1
+    first = first[start:first_end]
+    second = second[start:second_end]
+    if not first or not second:
+        return INDEL * (len(first) + len(second))
+    previous = list(range(0, INDEL * (len(second) + 1), INDEL))
+    for row, code in enumerate(first, 1):
+        costs = _COSTS[code]
+        current = [INDEL * row]
+        left = current[0]
+        for column, other in enumerate(second):
+            left = min(previous[column + 1] + INDEL, left + INDEL, previous[column] + costs[other])
+            current.append(left)
+        previous = current
+    return previous[-1]
+
+
+def _distances(query, matrix, lengths):
+    """numpy array of the distances from query to every row of matrix, lengths[i] IDs long
+
+    The table is filled a column (a phoneme of the rows) at a time, for all
+    the rows at once. The cost of reaching query[:i] through an insertion
+    is the best of the cells above it plus INDEL per step, a running
+    minimum of the cells less INDEL times their position.
+    """
+    count, width = matrix.shape
+    size = len(query)
+    costs = _COST_ARRAY[numpy.frombuffer(query, dtype=numpy.uint8)]
+    steps = numpy.arange(0, INDEL * (size + 1), INDEL, dtype=numpy.int16)
+    previous = numpy.tile(steps, (count, 1))
+    result = numpy.full(count, INDEL * size, dtype=numpy.int16)
+    for column in range(width):
+        current = numpy.empty_like(previous)
+        current[:, 0] = INDEL * (column + 1)
+        numpy.minimum(previous[:, 1:] + INDEL, previous[:, :-1] + costs[:, matrix[:, column]].T, out=current[:, 1:])
+        current -= steps
+        numpy.minimum.accumulate(current, axis=1, out=current)
+        current += steps
+        previous = current
+        done = lengths == column + 1
+        result[done] = current[done, size]
+    return result
+
+
+def _padded(keys):
+    """(matrix, lengths) of keys, one row each padded with zeros"""
+    lengths = numpy.fromiter((len(key) for key in keys), dtype=numpy.int32, count=len(keys))
+    width = int(lengths.max()) if len(keys) else 0
+    matrix = numpy.zeros((len(keys), width), dtype=numpy.uint8)
+    if width:
+        flat = numpy.frombuffer(b''.join(keys), dtype=numpy.uint8)
+        rows = numpy.repeat(numpy.arange(len(keys)), lengths)
+        columns = numpy.arange(len(flat)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        matrix[rows, columns] = flat
+    return matrix, lengths
+
+
+def _split(keys, pivot, rest, padded):
+    """[(distance, group)] of the key numbers in rest by their distance to keys[pivot], closest first"""
+    if padded is not None and len(rest) >= VECTOR_MIN:
+        rest = numpy.asarray(rest)
+        matrix, lengths = padded
+        widest = int(lengths[rest].max())
+        found = _distances(keys[pivot], matrix[rest, :widest], lengths[rest])
+        order = numpy.argsort(found, kind='stable')
+        found = found[order]
+        rest = rest[order]
+        bounds = numpy.flatnonzero(numpy.diff(found)) + 1
+        return [(int(found[start]), group.tolist())
+                for start, group in zip(numpy.concatenate(([0], bounds)), numpy.split(rest, bounds))]
+    groups = {}
+    key = keys[pivot]
+    for number in rest:
+        groups.setdefault(distance(key, keys[number]), []).append(number)
+    return sorted(groups.items())
+
+
+def build_tree(keys, padded=None):
+    """(order, edges) of a BK-tree over keys, a list of bytes strings of phoneme IDs
+
+    order lists the key number of every node, the root first; edges lists
+    (parent, distance, child) node numbers.
+    """
+    if padded is None and numpy is not None and len(keys) >= VECTOR_MIN:
+        padded = _padded(keys)
+    order = []
+    edges = []
+    pending = [(None, 0, list(range(len(keys))))] if keys else []
+    while pending:
+        parent, key, numbers = pending.pop()
+        node = len(order)
+        order.append(numbers[0])
+        if parent is not None:
+            edges.append((parent, key, node))
+        if len(numbers) > 1:
+            for distance_key, group in _split(keys, numbers[0], numbers[1:], padded):
+                pending.append((node, distance_key, group))
+    return order, edges
+
+
+def _codes(query):
+    """bytes of the phoneme IDs of a word or a list of phonemes"""
+    if isinstance(query, str):
+        return bytes(breakdownBatch([query]).codes)
+    return bytes(PHONEME_IDS[phoneme] for phoneme in query)
+
+
+def phonemeDistance(first, second):
+    """distance between two lists of phonemes, see the module docstring"""
+    return distance(_codes(first), _codes(second))
+
+
+class SimilarityIndex(object):
+    """a vocabulary in a BK-tree by pronunciation, see the module docstring"""
+
+    def __init__(self, words=(), jobs=1):
+        words = list(dict.fromkeys(words))
+        batch = breakdownBatch(words)
+        codes = bytes(batch.codes)
+        offsets = batch.offsets
+        # the words of every distinct pronunciation
+        homophones = {}
+        for number, word in enumerate(words):
+            homophones.setdefault(codes[offsets[number]:offsets[number + 1]], []).append(word)
+        keys = list(homophones)
+        order, edges = self._build(keys, jobs)
+        self.keys = [keys[number] for number in order]
+        self.words = []
+        self.first_word = array('I', [0])
+        for key in self.keys:
+            self.words.extend(homophones[key])
+            self.first_word.append(len(self.words))
+        edges.sort()
+        self.first_child = array('I', [0]) * (len(self.keys) + 1)
+        for parent, _, _ in edges:
+            self.first_child[parent + 1] += 1
+        for node in range(len(self.keys)):
+            self.first_child[node + 1] += self.first_child[node]
+        self.child_distance = array('H', [key for _, key, _ in edges])
+        self.children = array('I', [child for _, _, child in edges])
+        self._matrix = None
+        self._tree = None
+
+    @staticmethod
+    def _build(keys, jobs):
+        if jobs <= 1 or len(keys) < VECTOR_MIN:
+            return build_tree(keys)
+        padded = _padded(keys) if numpy is not None else None
+        order = [0]
+        edges = []
+        with ProcessPoolExecutor(jobs) as pool:
+            groups = _split(keys, 0, list(range(1, len(keys))), padded)
+            trees = pool.map(build_tree, ([keys[number] for number in group] for _, group in groups))
+            for (key, group), (group_order, group_edges) in zip(groups, trees):
+                base = len(order)
+                order.extend(group[number] for number in group_order)
+                edges.append((0, key, base))
+                edges.extend((parent + base, child_key, child + base) for parent, child_key, child in group_edges)
+        return order, edges
+
+    def __len__(self):
+        return len(self.words)
+
+    def _distances_to(self, query, nodes):
+        if numpy is not None and len(nodes) >= VECTOR_MIN:
+            if self._matrix is None:
+                self._matrix = _padded(self.keys)
+            matrix, lengths = self._matrix
+            nodes = numpy.asarray(nodes)
+            widest = int(lengths[nodes].max())
+            return _distances(query, matrix[nodes, :widest], lengths[nodes]).tolist()
+        keys = self.keys
+        return [distance(query, keys[node]) for node in nodes]
+
+    def _search(self, query, limit, count=None):
+        """[(distance, node)] of the nodes within limit of query, closest first
+
+        With count only the count closest nodes are kept, and limit comes
+        down to just below the farthest of them once there are that many.
+        """
+        if not self.keys:
+            return []
+        found = []
+        first_child = self.first_child
+        child_distance = self.child_distance
+        children = self.children
+        # the nodes to look at by the least distance anything under them can
+        # be at, the closest looked at first, all of them together
+        pending = {0: [0]}
+        while pending:
+            bound = min(pending)
+            if bound > limit:
+                break
+            nodes = pending.pop(bound)
+            distances = self._distances_to(query, nodes)
+            if count is None:
+                found.extend((node_distance, node) for node, node_distance in zip(nodes, distances)
+                             if node_distance <= limit)
+            else:
+                for node, node_distance in zip(nodes, distances):
+                    if len(found) < count:
+                        heapq.heappush(found, (-node_distance, node))
+                    elif node_distance < -found[0][0]:
+                        heapq.heapreplace(found, (-node_distance, node))
+                if len(found) == count:
+                    limit = min(limit, -found[0][0] - 1)
+            if numpy is not None and len(nodes) >= VECTOR_MIN:
+                self._expand(nodes, distances, bound, limit, pending)
+                continue
+            for node, node_distance in zip(nodes, distances):
+                start, end = first_child[node], first_child[node + 1]
+                if start == end:
+                    continue
+                low = bisect_left(child_distance, node_distance - limit, start, end)
+                high = bisect_right(child_distance, node_distance + limit, low, end)
+                for position in range(low, high):
+                    child_bound = max(bound, abs(node_distance - child_distance[position]))
+                    pending.setdefault(child_bound, []).append(children[position])
+        if count is not None:
+            found = [(-negated, node) for negated, node in found]
+        return sorted(found)
+
+    def _expand(self, nodes, distances, bound, limit, pending):
+        """_search putting the children of many nodes in pending at once"""
+        if self._tree is None:
+            self._tree = (numpy.frombuffer(self.first_child, dtype=numpy.uint32),
+                          numpy.frombuffer(self.child_distance, dtype=numpy.uint16).astype(numpy.int32),
+                          numpy.frombuffer(self.children, dtype=numpy.uint32))
+        first_child, child_distance, children = self._tree
+        nodes = numpy.asarray(nodes)
+        starts = first_child[nodes].astype(numpy.int64)
+        counts = first_child[nodes + 1] - starts
+        ends = numpy.cumsum(counts)
+        if not len(ends) or not ends[-1]:
+            return
+        positions = numpy.arange(ends[-1]) + numpy.repeat(starts - (ends - counts), counts)
+        bounds = numpy.abs(numpy.repeat(numpy.asarray(distances, dtype=numpy.int32), counts)
+                           - child_distance[positions])
+        numpy.maximum(bounds, bound, out=bounds)
+        kept = bounds <= limit
+        bounds = bounds[kept]
+        if not len(bounds):
+            return
+        below = children[positions[kept]]
+        order = numpy.argsort(bounds, kind='stable')
+        bounds = bounds[order]
+        below = below[order]
+        splits = numpy.flatnonzero(numpy.diff(bounds)) + 1
+        for start, group in zip(numpy.concatenate(([0], splits)), numpy.split(below, splits)):
+            pending.setdefault(int(bounds[start]), []).extend(group.tolist())
+
+    def _words(self, found):
+        words = self.words
+        first_word = self.first_word
+        return [(node_distance, word) for node_distance, node in found
+                for word in words[first_word[node]:first_word[node + 1]]]
+
+    def within(self, query, radius):
+        """[(distance, word)] of every word within radius of a word or list of phonemes, closest first"""
+        return self._words(self._search(_codes(query), radius))
+
+    def nearest(self, query, count=10):
+        """[(distance, word)] of the count words closest to a word or list of phonemes
+
+        Words pronounced alike come together, so the last distance may have
+        more of them than fit; those beyond count are left out.
+        """
+        return self._words(self._search(_codes(query), _FAR, count))[:count]
+
+    def save(self, path):
+        """write the index to path, for load() to read back"""
+        data = marshal.dumps(((_MAGIC, _VERSION, PHONEMES, INDEL, SUBSTITUTE, SAME_VISEME),
+                              self.keys, self.words, self.first_word.tobytes(), self.first_child.tobytes(),
+                              self.child_distance.tobytes(), self.children.tobytes()))
+        with open(path + '.tmp', 'wb') as out:
+            out.write(data)
+        os.replace(path + '.tmp', path)
+
+
+def load(path):
+    """the SimilarityIndex save() wrote to path"""
+    with open(path, 'rb') as source:
+        try:
+            key, keys, words, first_word, first_child, child_distance, children = marshal.loads(source.read())
+        except (EOFError, ValueError, TypeError):
+            raise ValueError('%s is not a similarity index' % path)
+    if key != (_MAGIC, _VERSION, PHONEMES, INDEL, SUBSTITUTE, SAME_VISEME):
+        raise ValueError('%s is not a version %d similarity index of these phonemes and costs' % (path, _VERSION))
+    index = SimilarityIndex()
+    index.keys = keys
+    index.words = words
+    index.first_word = _array('I', first_word)
+    index.first_child = _array('I', first_child)
+    index.child_distance = _array('H', child_distance)
+    index.children = _array('I', children)
+    return index
@@ -0,0 +1,144 @@
+"""count which letter rules of Phoneme.breakdownWord fire, and time them
+
+    stats = RuleStats(sample_every=100)
+    stats.breakdownWords(words)     # like Phoneme.breakdownWords, counting
+    print(stats.report(top=20))
+    stats.snapshot()    # {'e': {'end len>2 -> (silent)': {'hits': ..., ...}}}
+    stats.trace('chat') # [(0, 'c', '(always) -> (silent)', ()), (1, 'h', 'prev:c +1!r -> SH', ('SH',)), ...]
+
+A RuleStats runs breakdownWord on a copy of the compiled rules of its own,
+in which every rule counts its hits; with sample_every set, one call in
+that many is also timed and the time added to the rule that fired. The
+rules of Phoneme.breakdownWord are never touched, so it costs nothing
+and other threads calling it are not affected, and a lock keeps the
+counts right when several threads share one RuleStats.
+"""
+import os
+import sys
+from threading import Lock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+from Phoneme import apply_rules, phoneme_conversion  # noqa: E402
+from phoneme_rules import accented_rules, compile_rules, grapheme_splitter, word_rules  # noqa: E402
+
+try:
+    from time import perf_counter_ns
+except ImportError:
+    # Python 3.6
+    from time import perf_counter
+
+    def perf_counter_ns():
+        return int(perf_counter() * 1e9)
+
+
+class RuleStats(object):
+    """hit counts (and sampled timings) of every letter rule"""
+
+    def __init__(self, sample_every=0):
+        self.sample_every = sample_every
+        # (letter, rule label) of each rule, hits and times indexed the same way
+        self.labels = []
+        self.hits = []
+        self.last = [0]
+        # rule number of each (letter, rule index), graphemes share them
+        self.numbers = {}
+        rules = compile_rules(instrument=self)
+        rules.update(accented_rules(compile_rules(), instrument=self))
+        rules.update(word_rules(rules, instrument=self))
+        self.sampled = [0] * len(self.labels)
+        self.nanoseconds = [0] * len(self.labels)
+        self._counted = rules
+        if sample_every:
+            rules = {letter: self._timed(rule) for letter, rule in rules.items()}
+        self._rules = rules
+        self._split_graphemes = grapheme_splitter()
+        self._lock = Lock()
+
+    def _timed(self, rule):
+        every = self.sample_every
+        calls = [0]
+        last = self.last
+        sampled = self.sampled
+        nanoseconds = self.nanoseconds
+
+        def timed(word, pos, n, previous):
+            calls[0] += 1
+            if calls[0] % every:
+                return rule(word, pos, n, previous)
+            started = perf_counter_ns()
+            result = rule(word, pos, n, previous)
+            nanoseconds[last[0]] += perf_counter_ns() - started
+            sampled[last[0]] += 1
+            return result
+        return timed
+
+    def breakdownWord(self, word):
+        """Phoneme.breakdownWord of word, counting the rules that fire"""
+        with self._lock:
+            return apply_rules(word, self._rules, self._split_graphemes)
+
+    def breakdownWords(self, words, convert=False):
+        """breakdownWord for every word of an iterable, like Phoneme.breakdownWords"""
+        with self._lock:
+            results = [apply_rules(word, self._rules, self._split_graphemes) for word in words]
+        if not convert:
+            return results
+        conversion = phoneme_conversion
+        return [[conversion[phoneme] for phoneme in phonemes] for phonemes in results]
+
+    def reset(self):
+        """set every counter back to zero"""
+        for counters in (self.hits, self.sampled, self.nanoseconds):
+            counters[:] = [0] * len(counters)
+
+    def snapshot(self):
+        """{letter: {rule label: {'hits', 'sampled', 'mean_ns'}}} of the rules hit so far"""
+        letters = {}
+        for rule, (letter, label) in enumerate(self.labels):
+            if not self.hits[rule]:
+                continue
+            sampled = self.sampled[rule]
+            letters.setdefault(letter, {})[label] = {
+                'hits': self.hits[rule],
+                'sampled': sampled,
+                'mean_ns': self.nanoseconds[rule] / sampled if sampled else None,
+            }
+        return letters
+
+    def trace(self, word):
+        """[(pos, letter, rule label, phonemes)] of the rule every letter of word fires
+
+        word is used as it is, already lowered and folded like breakdownWord
+        does it; letters without rules get None for a label. Tracing a word
+        does not count as hits.
+        """
+        steps = []
+        n = len(word)
+        previous = ' '
+        with self._lock:
+            for pos, letter in enumerate(word):
+                rule = self._counted.get(letter)
+                if rule is None:
+                    steps.append((pos, letter, None, ()))
+                else:
+                    phonemes = rule(word, pos, n, previous)
+                    fired = self.last[0]
+                    self.hits[fired] -= 1
+                    steps.append((pos, letter, self.labels[fired][1], phonemes))
+                previous = letter
+        return steps
+
+    def report(self, top=None):
+        """text table of the rules hit so far, most hit first"""
+        total = sum(self.hits) or 1
+        order = sorted((rule for rule, hits in enumerate(self.hits) if hits),
+                       key=lambda rule: -self.hits[rule])
+        lines = ['%-6s %10s %6s %9s  %s' % ('letter', 'hits', '%', 'mean ns', 'rule')]
+        for rule in order[:top]:
+            letter, label = self.labels[rule]
+            sampled = self.sampled[rule]
+            mean = '%9.0f' % (self.nanoseconds[rule] / sampled) if sampled else '%9s' % '-'
+            lines.append('%-6r %10d %6.2f %s  %s' % (
+                letter, self.hits[rule], 100.0 * self.hits[rule] / total, mean, label))
+        return '\n'.join(lines)
@@ -0,0 +1,201 @@
+"""transcribe text files to CMU phonemes and Preston Blair visemes, one word per line
+
+    python -m Phoneme transcribe dialogue/ -o dialogue.jsonl
+    python tools/transcribe.py --format tsv --jobs 4 script.txt > script.tsv
+
+Inputs are files or directories (every file below them, in sorted order),
+'-' being standard input. They are read as a stream, split into words by
+the tokenizer (punctuation and numbers are left out) and cut into chunks
+which a pool of worker processes transcribes; at most a few chunks per
+worker are in flight at any time, so memory use does not depend on the
+size of the input, and results are written in input order whatever order
+the workers finish in. Throughput is reported on standard error.
+
+With --dedup every distinct word is transcribed (and its line formatted)
+only once, then the lines are repeated for every occurrence, see
+phoneme_dedup; the dedup ratio and the time it saved are reported too.
+
+A lexicon given with --lexicon, or set with Phoneme.use_lexicon before
+calling transcribe(), is opened again by path in every worker.
+
+Each output line holds a word, its CMU phonemes and their visemes, either
+as JSON ({"word": ..., "cmu": [...], "visemes": [...]}) or tab separated
+with the phonemes separated by spaces.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'python'))
+
+import Phoneme  # noqa: E402
+from phoneme_cache import PhonemeCache  # noqa: E402
+from phoneme_dedup import VOCABULARY_CAP, DedupPlanner  # noqa: E402
+from tokenizer import SPOKEN, tokenize  # noqa: E402
+
+FORMATS = ('jsonl', 'tsv')
+
+# each worker keeps its own cache, most words of a corpus repeat
+_cache = None
+
+
+def _format_jsonl(word, cmu, visemes):
+    return json.dumps({'word': word, 'cmu': cmu, 'visemes': visemes}, ensure_ascii=False)
+
+
+def _format_tsv(word, cmu, visemes):
+    return '%s\t%s\t%s' % (word, ' '.join(cmu), ' '.join(visemes))
+
+
+_formatters = {'jsonl': _format_jsonl, 'tsv': _format_tsv}
+
+
+def transcribe_chunk(words, output_format='jsonl'):
+    """output text (newline terminated lines) for a list of words"""
+    global _cache
+    if _cache is None:
+        _cache = PhonemeCache(65536)
+    formatter = _formatters[output_format]
+    conversion = Phoneme.phoneme_conversion
+    lines = []
+    for word in words:
+        cmu = list(_cache.breakdownWord(word))
+        lines.append(formatter(word, cmu, [conversion[phoneme] for phoneme in cmu]))
+        lines.append('\n')
+    return ''.join(lines)
+
+
+def lexicon_path():
+    """path of the lexicon Phoneme.breakdownWord consults, for the workers to open, or None"""
+    return getattr(Phoneme._lexicon, 'path', None)
+
+
+def iter_input_paths(inputs):
+    """the files to read for the given files and directories, in a stable order"""
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                for name in sorted(files):
+                    yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def iter_chunks(inputs, chunk_words):
+    """lists of at most chunk_words words read from all inputs in turn"""
+    chunk = []
+    for path in iter_input_paths(inputs):
+        if path == '-':
+            stream = sys.stdin
+        else:
+            stream = open(path, encoding='utf-8', errors='replace')
+        try:
+            for token in tokenize(stream):
+                if token.kind not in SPOKEN:
+                    continue
+                chunk.append(token.text)
+                if len(chunk) == chunk_words:
+                    yield chunk
+                    chunk = []
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    if chunk:
+        yield chunk
+
+
+def transcribe(inputs, out, output_format='jsonl', jobs=None, chunk_words=5000):
+    """transcribe inputs to the out stream, returning the number of words"""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    count = 0
+    chunks = iter_chunks(inputs, chunk_words)
+    if jobs == 1:
+        for chunk in chunks:
+            out.write(transcribe_chunk(chunk, output_format))
+            count += len(chunk)
+        return count
+    with ProcessPoolExecutor(jobs, initializer=Phoneme.use_lexicon, initargs=(lexicon_path(),)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(transcribe_chunk, chunk, output_format)))
+            if len(pending) >= 2 * jobs:
+                size, future = pending.popleft()
+                out.write(future.result())
+                count += size
+        while pending:
+            size, future = pending.popleft()
+            out.write(future.result())
+            count += size
+    return count
+
+
+def transcribe_dedup(inputs, out, output_format='jsonl', jobs=None, chunk_words=5000,
+                     vocabulary_cap=VOCABULARY_CAP):
+    """transcribe inputs to the out stream, each distinct word once, returning the DedupPlanner stats()"""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    formatter = _formatters[output_format]
+    conversion = Phoneme.phoneme_conversion
+
+    def format_line(word, cmu):
+        return formatter(word, cmu, [conversion[phoneme] for phoneme in cmu])
+
+    with DedupPlanner(format_line, jobs, vocabulary_cap, chunk_words) as planner:
+        for chunk in iter_chunks(inputs, chunk_words):
+            planner.add(chunk)
+        planner.write(out)
+    return planner.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='transcribe', description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='+', metavar='INPUT', help="text file, directory or '-'")
+    parser.add_argument('-o', '--output', help='output file, standard output by default')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes, one per core by default')
+    parser.add_argument('--chunk-words', type=int, default=5000,
+                        help='words sent to a worker at a time (default 5000)')
+    parser.add_argument('--dedup', action='store_true', help='transcribe each distinct word once')
+    parser.add_argument('--vocabulary-cap', type=int, default=VOCABULARY_CAP,
+                        help='distinct words held in memory with --dedup (default %d)' % VOCABULARY_CAP)
+    parser.add_argument('--lexicon', metavar='PATH',
+                        help='compiled lexicon (see lexicon.py) to look words up in before the rules')
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.vocabulary_cap < 1:
+        parser.error('--vocabulary-cap must be at least 1')
+    if args.lexicon is not None:
+        Phoneme.use_lexicon(args.lexicon)
+    out = sys.stdout if args.output is None else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    stats = None
+    try:
+        if args.dedup:
+            stats = transcribe_dedup(args.inputs, out, args.format, args.jobs, args.chunk_words, args.vocabulary_cap)
+            count = stats['tokens']
+        else:
+            count = transcribe(args.inputs, out, args.format, args.jobs, args.chunk_words)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    sys.stderr.write('%d words in %.2fs, %.0f words/s\n' % (count, elapsed, count / elapsed if elapsed else 0))
+    if stats is not None:
+        sys.stderr.write('%d distinct words, %.1f tokens each, transcribed in %.2fs (%d spills), about %.2fs saved\n'
+                         % (stats['words'], stats['dedup'], stats['seconds'], stats['spills'], stats['saved_seconds']))
+        if stats['direct']:
+            sys.stderr.write('--vocabulary-cap %d is too low for dedup to pay off, '
+                             'the later words were transcribed as they came\n' % args.vocabulary_cap)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())